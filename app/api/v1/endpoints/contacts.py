@@ -1,41 +1,107 @@
 # app/api/v1/endpoints/contacts.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.api import deps
 from app.models.user import User
 from app.models.contact import Contact, ContactDialog, DialogMessage
 from app.schemas.contact import ContactCreate, ContactUpdate, Contact as ContactSchema
-from app.schemas.contact import ContactDialog as ContactDialogSchema
+from app.schemas.contact import ContactDialog as ContactDialogSchema, ContactDialogSummary
+from app.schemas.contact import DialogMessage as DialogMessageSchema, ContactImportReport, ContactSearchHit, TagCount
 from app.crud.contact import (
-    get_contact, get_contacts, create_contact, 
-    update_contact, delete_contact
+    get_contact, get_contacts, create_contact, contact_exists,
+    update_contact, delete_contact, import_contacts, DuplicatePhone, DynamicGroupMembers, search_contacts,
+    iter_contacts_for_export, EXPORT_COLUMNS as CONTACT_EXPORT_COLUMNS
 )
+from app.crud import dialog as crud_dialog
+from app.crud.tag import get_contacts_by_tags, get_tag_counts, get_tag_names, TAG_MATCHES, MATCH_ANY
+from app.crud.pagination import InvalidCursor, NEXT_CURSOR_HEADER, next_cursor
+from app.services.contact_import import detect_format, iter_records
+from app.services.export import FORMAT_CSV, FORMATS, MEDIA_TYPES, serialize
 import json
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+def contact_response(contact: Contact) -> dict:
+    """Поля контакта для ответа; script — отложенная колонка, поэтому читается атрибутом, а не из __dict__"""
+    contact_dict = contact.__dict__.copy()
+    contact_dict['script'] = contact.script
+    contact_dict['tags'] = contact.get_tags()
+    return contact_dict
+
 @router.get("/", response_model=List[ContactSchema])
 def read_contacts(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None),
+    tag_match: str = MATCH_ANY,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Получение списка контактов пользователя"""
-    contacts = get_contacts(db, user_id=current_user.id, skip=skip, limit=limit)
+    """
+    Получение списка контактов пользователя (курсор следующей страницы — в X-Next-Cursor).
+    ?tag=VIP&tag=Bratislava — только контакты с любым (tag_match=any) или всеми (all) тегами.
+    """
+    if tag_match not in TAG_MATCHES:
+        raise HTTPException(status_code=400, detail=f"tag_match must be one of: {', '.join(TAG_MATCHES)}")
+    try:
+        if tag:
+            contacts = get_contacts_by_tags(
+                db, user_id=current_user.id, names=tag, match=tag_match, skip=skip, limit=limit, cursor=cursor
+            )
+        else:
+            contacts = get_contacts(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(contacts, limit, "id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     
     # Преобразуем теги для ответа
+    return [contact_response(contact) for contact in contacts]
+
+@router.get("/search", response_model=List[ContactSearchHit])
+def search_contacts_endpoint(
+    response: Response,
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Поиск контактов по префиксам слов (typeahead); курсор следующей страницы — в X-Next-Cursor"""
+    try:
+        hits = search_contacts(db, user_id=current_user.id, q=q, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(hits, limit, "rank", "id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+    tag_names = get_tag_names(db, [hit.id for hit in hits])
     result = []
-    for contact in contacts:
-        contact_dict = contact.__dict__.copy()
-        contact_dict['tags'] = contact.get_tags()
-        result.append(contact_dict)
-    
+    for hit in hits:
+        hit_dict = hit._asdict()
+        hit_dict['tags'] = tag_names[hit.id]
+        result.append(hit_dict)
     return result
 
+@router.get("/tags", response_model=List[TagCount])
+def read_tag_counts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Теги пользователя с числом активных контактов"""
+    return get_tag_counts(db, user_id=current_user.id)
+
 @router.post("/", response_model=ContactSchema, status_code=status.HTTP_201_CREATED)
 def create_contact_endpoint(
     contact: ContactCreate,
@@ -43,13 +109,98 @@ def create_contact_endpoint(
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """Создание нового контакта"""
-    db_contact = create_contact(db=db, contact=contact, user_id=current_user.id)
+    try:
+        db_contact = create_contact(db=db, contact=contact, user_id=current_user.id)
+    except DuplicatePhone as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     # Преобразуем теги для ответа
-    contact_dict = db_contact.__dict__.copy()
-    contact_dict['tags'] = db_contact.get_tags()
-    
-    return contact_dict
+    return contact_response(db_contact)
+
+@router.post("/import", response_model=ContactImportReport)
+def import_contacts_endpoint(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    group_id: Optional[int] = None,
+    chunk_size: int = 5000,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Массовый импорт контактов из CSV (колонки name, phone, email, company, timezone,
+    script, tags через ";") или NDJSON. Файл разбирается потоком и вставляется пачками;
+    в ответе — итог и ошибки по номерам строк. С group_id новые контакты добавляются в группу.
+    """
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 1 <= chunk_size <= 50000:
+        raise HTTPException(status_code=400, detail="chunk_size must be between 1 and 50000")
+
+    def progress(report):
+        logger.info(f"Contact import for user {current_user.id}: {report.processed} rows, "
+                    f"{report.inserted} inserted, {report.duplicates} duplicates, {report.failed} failed")
+
+    try:
+        report = import_contacts(
+            db, iter_records(file.file, fmt), user_id=current_user.id, group_id=group_id,
+            chunk_size=chunk_size, on_progress=progress
+        )
+    except UnicodeDecodeError:  # Подкласс ValueError — ловится раньше
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    except DynamicGroupMembers as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    logger.info(f"Contact import for user {current_user.id} finished: {report.inserted} inserted "
+                f"in {report.seconds:.1f}s ({report.rows_per_second:.0f} rows/s)")
+    return report.as_dict()
+
+def export_response(fmt: str, filename: str, columns, make_rows) -> StreamingResponse:
+    """Потоковый ответ выгрузки; make_rows(db) вызывается уже внутри генератора со своей сессией"""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+
+    def generate():
+        # Своя сессия: ответ отдаётся уже после выхода из эндпоинта
+        with SessionLocal() as stream_db:
+            yield from serialize(fmt, columns, make_rows(stream_db))
+
+    return StreamingResponse(
+        generate(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+@router.get("/export")
+def export_contacts(
+    format: str = FORMAT_CSV,
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Выгрузка всех контактов с тегами и группами в CSV или NDJSON, потоком"""
+    user_id = current_user.id
+    return export_response(
+        format, "contacts", CONTACT_EXPORT_COLUMNS,
+        lambda stream_db: iter_contacts_for_export(stream_db, user_id)
+    )
+
+@router.get("/dialogs/export")
+def export_dialogs(
+    format: str = FORMAT_CSV,
+    contact_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Выгрузка сообщений всех диалогов (или диалогов одного контакта), строка на сообщение"""
+    if contact_id is not None and not contact_exists(db, contact_id=contact_id, user_id=current_user.id):
+        raise HTTPException(status_code=404, detail="Contact not found")
+    user_id = current_user.id
+    return export_response(
+        format, "dialogs", crud_dialog.EXPORT_COLUMNS,
+        lambda stream_db: crud_dialog.iter_dialogs_for_export(stream_db, user_id, contact_id=contact_id)
+    )
 
 @router.get("/{contact_id}", response_model=ContactSchema)
 def read_contact(
@@ -63,40 +214,10 @@ def read_contact(
         raise HTTPException(status_code=404, detail="Contact not found")
     
     # Преобразуем теги и диалоги для ответа
-    contact_dict = db_contact.__dict__.copy()
-    contact_dict['tags'] = db_contact.get_tags()
+    contact_dict = contact_response(db_contact)
     
-    # Получаем диалоги контакта
-    dialogs = db.query(ContactDialog).filter(
-        ContactDialog.contact_id == contact_id
-    ).all()
-    
-    # Преобразуем диалоги и сообщения
-    dialogs_list = []
-    for dialog in dialogs:
-        # Получаем сообщения диалога
-        messages = db.query(DialogMessage).filter(
-            DialogMessage.dialog_id == dialog.id
-        ).order_by(DialogMessage.timestamp.asc()).all()
-        
-        # Преобразуем сообщения
-        messages_list = [
-            {
-                "role": msg.role,
-                "text": msg.text,
-                "timestamp": msg.timestamp
-            } for msg in messages
-        ]
-        
-        dialogs_list.append({
-            "id": dialog.id,
-            "contact_id": dialog.contact_id,
-            "date": dialog.date,
-            "transcript": dialog.transcript,
-            "messages": messages_list
-        })
-    
-    contact_dict['dialogs'] = dialogs_list
+    # Диалоги с сообщениями двумя запросами
+    contact_dict['dialogs'] = crud_dialog.get_dialogs(db, contact_id=contact_id)
     
     return contact_dict
 
@@ -108,20 +229,20 @@ def update_contact_endpoint(
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """Обновление контакта"""
-    db_contact = update_contact(
-        db=db, 
-        contact_id=contact_id, 
-        contact_update=contact, 
-        user_id=current_user.id
-    )
+    try:
+        db_contact = update_contact(
+            db=db, 
+            contact_id=contact_id, 
+            contact_update=contact, 
+            user_id=current_user.id
+        )
+    except DuplicatePhone as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     
     # Преобразуем теги для ответа
-    contact_dict = db_contact.__dict__.copy()
-    contact_dict['tags'] = db_contact.get_tags()
-    
-    return contact_dict
+    return contact_response(db_contact)
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_contact_endpoint(
@@ -150,8 +271,7 @@ def add_dialog(
 ):
     """Добавление диалога к контакту"""
     # Проверяем существование контакта
-    contact = get_contact(db, contact_id=contact_id, user_id=current_user.id)
-    if not contact:
+    if not contact_exists(db, contact_id=contact_id, user_id=current_user.id):
         raise HTTPException(status_code=404, detail="Contact not found")
     
     try:
@@ -205,43 +325,104 @@ def add_dialog(
 @router.get("/{contact_id}/dialogs", response_model=List[ContactDialogSchema])
 def get_dialogs(
     contact_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Получение всех диалогов контакта"""
+    """Получение диалогов контакта, новые сверху; с limit — страницами по курсору"""
     # Проверяем существование контакта
-    contact = get_contact(db, contact_id=contact_id, user_id=current_user.id)
-    if not contact:
+    if not contact_exists(db, contact_id=contact_id, user_id=current_user.id):
         raise HTTPException(status_code=404, detail="Contact not found")
     
     # Получаем диалоги
-    dialogs = db.query(ContactDialog).filter(
-        ContactDialog.contact_id == contact_id
-    ).order_by(ContactDialog.date.desc()).all()
+    try:
+        dialogs = crud_dialog.get_dialogs(db, contact_id=contact_id, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(dialogs, limit, "date", "id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     
-    # Преобразуем диалоги и сообщения для ответа
-    result = []
-    for dialog in dialogs:
-        # Получаем сообщения диалога
-        messages = db.query(DialogMessage).filter(
-            DialogMessage.dialog_id == dialog.id
-        ).order_by(DialogMessage.timestamp.asc()).all()
-        
-        # Преобразуем сообщения
-        messages_list = [
-            {
-                "role": msg.role,
-                "text": msg.text,
-                "timestamp": msg.timestamp
-            } for msg in messages
-        ]
-        
-        result.append({
-            "id": dialog.id,
-            "contact_id": dialog.contact_id,
-            "date": dialog.date,
-            "transcript": dialog.transcript,
-            "messages": messages_list
-        })
+    return dialogs
+
+@router.get("/{contact_id}/dialogs/summary", response_model=List[ContactDialogSummary])
+def get_dialog_summaries_endpoint(
+    contact_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Облегчённый список диалогов: без транскриптов и сообщений, только их число и время последнего"""
+    if not contact_exists(db, contact_id=contact_id, user_id=current_user.id):
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    try:
+        summaries = crud_dialog.get_dialog_summaries(db, contact_id=contact_id, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(summaries, limit, "date", "id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    
+    return summaries
+
+
+def ensure_contact_dialog(db: Session, contact_id: int, dialog_id: int, user_id: int):
+    """404, если у пользователя нет такого контакта или у контакта — диалога"""
+    if not contact_exists(db, contact_id=contact_id, user_id=user_id):
+        raise HTTPException(status_code=404, detail="Contact not found")
+    if not crud_dialog.dialog_exists(db, dialog_id=dialog_id, contact_id=contact_id):
+        raise HTTPException(status_code=404, detail="Dialog not found")
+
+@router.get("/{contact_id}/dialogs/{dialog_id}/messages", response_model=List[DialogMessageSchema])
+def get_dialog_messages_endpoint(
+    contact_id: int,
+    dialog_id: int,
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    newest_first: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Сообщения диалога страницами по (timestamp, id); newest_first — от новых к старым"""
+    ensure_contact_dialog(db, contact_id, dialog_id, current_user.id)
+    
+    try:
+        messages = crud_dialog.get_dialog_messages(
+            db, dialog_id=dialog_id, limit=limit, cursor=cursor, newest_first=newest_first
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(messages, limit, "timestamp", "id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     
-    return result
\ No newline at end of file
+    return messages
+
+@router.get("/{contact_id}/dialogs/{dialog_id}/messages/stream")
+def stream_dialog_messages(
+    contact_id: int,
+    dialog_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Все сообщения диалога в NDJSON, по одной строке на сообщение, без загрузки диалога в память"""
+    ensure_contact_dialog(db, contact_id, dialog_id, current_user.id)
+
+    def generate():
+        # Своя сессия: ответ отдаётся уже после выхода из эндпоинта
+        with SessionLocal() as stream_db:
+            for row in crud_dialog.iter_dialog_messages(stream_db, dialog_id):
+                yield json.dumps({
+                    "id": row.id,
+                    "role": row.role,
+                    "text": row.text,
+                    "timestamp": row.timestamp.isoformat() if row.timestamp else None
+                }, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
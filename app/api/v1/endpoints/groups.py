@@ -1,7 +1,9 @@
 # app/api/v1/endpoints/groups.py
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from dataclasses import asdict
+from types import SimpleNamespace
+from typing import List, Literal, Optional
 from app.database import get_db
 from app.api import deps
 from app.models.user import User
@@ -9,15 +11,21 @@ from app.models.contact import Contact
 from app.models.group import Group, GroupMember
 from app.schemas.group import (
     Group, GroupCreate, GroupUpdate, GroupResponse,
-    GroupMember, GroupMemberCreate,
-    ScheduledGroupCall, ScheduledGroupCallCreate, ScheduledGroupCallUpdate
+    GroupMember, GroupMemberCreate, GroupMembersBulk, GroupMembershipChange,
+    GroupSetOperation, GroupSetResult,
+    ScheduledGroupCall, ScheduledGroupCallCreate, ScheduledGroupCallUpdate,
+    GroupCallPlanResponse
 )
 from app.crud.group import (
     get_group, get_groups, create_group, update_group, delete_group,
     add_group_member, remove_group_member, get_group_members,
+    add_group_members, remove_group_members, replace_group_members, sync_dynamic_groups,
+    combine_groups,
     get_scheduled_group_call, get_scheduled_group_calls, create_scheduled_group_call,
-    update_scheduled_group_call, delete_scheduled_group_call
+    update_scheduled_group_call, delete_scheduled_group_call, plan_group_call, NoTimeWindow,
+    load_group_details
 )
+from app.crud.pagination import InvalidCursor, NEXT_CURSOR_HEADER, next_cursor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,53 +34,70 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/groups", tags=["groups"])
 scheduled_calls_router = APIRouter(prefix="/scheduled-group-calls", tags=["scheduled_group_calls"])  # ← Новый роутер
 
+def ensure_static_group(group: Group):
+    """Состав динамической группы задают правила, вручную его не меняют"""
+    if group.rules is not None:
+        raise HTTPException(status_code=409, detail="Members of a dynamic group are defined by its rules")
+
+def build_group_responses(
+    db: Session, groups: List[Group], user_id: int, include_members: bool = True
+) -> List[GroupResponse]:
+    """
+    GroupResponse для списка групп. Счётчики — из колонок группы; участники и
+    контакты (include_members) — за фиксированное число запросов на весь список
+    """
+    if any(group.rules is not None for group in groups):
+        sync_dynamic_groups(db, user_id)
+    details = load_group_details(db, [group.id for group in groups], user_id) if include_members else {}
+    empty = SimpleNamespace(members=[], contacts=[])
+    return [
+        GroupResponse(
+            id=group.id,
+            user_id=group.user_id,
+            name=group.name,
+            description=group.description,
+            is_active=group.is_active,
+            rules=group.rules,
+            created_at=group.created_at,
+            updated_at=group.updated_at,
+            members=details.get(group.id, empty).members,
+            contacts=details.get(group.id, empty).contacts,
+            member_count=group.member_count or 0,
+            active_member_count=group.active_member_count or 0,
+            scheduled_calls_count=group.scheduled_calls_count or 0,
+            completed_calls_count=group.completed_calls_count or 0
+        )
+        for group in groups
+    ]
+
 # Groups endpoints
 @router.get("/", response_model=List[GroupResponse])
 def read_groups(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_members: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Получение списка групп пользователя с участниками"""
+    """
+    Получение списка групп пользователя (курсор следующей страницы — в X-Next-Cursor).
+    include_members=false — только группы со счётчиками, без чтения group_members
+    """
     try:
         logger.info(f"Fetching groups for user {current_user.id}")
-        groups = get_groups(db, user_id=current_user.id, skip=skip, limit=limit)
+        groups = get_groups(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+        next_page = next_cursor(groups, limit, "id")
+        if next_page:
+            response.headers[NEXT_CURSOR_HEADER] = next_page
         
-        # Добавляем информацию об участниках и контактах для каждой группы
-        groups_with_details = []
-        for group in groups:
-            members = get_group_members(db, group_id=group.id, user_id=current_user.id)
-            
-            # Получаем контакты участников
-            contacts = []
-            for member in members:
-                contact = db.query(Contact).filter(
-                    Contact.id == member.contact_id,
-                    Contact.user_id == current_user.id,
-                    Contact.is_active == True
-                ).first()
-                if contact:
-                    contacts.append(contact)
-            
-            # Создаем GroupResponse с деталями
-            group_response = GroupResponse(
-                id=group.id,
-                user_id=group.user_id,
-                name=group.name,
-                description=group.description,
-                is_active=group.is_active,
-                created_at=group.created_at,
-                updated_at=group.updated_at,
-                members=members,
-                contacts=contacts,
-                member_count=len(members),
-                scheduled_calls_count=0  # Пока не реализовано
-            )
-            groups_with_details.append(group_response)
+        groups_with_details = build_group_responses(db, groups, current_user.id, include_members)
         
         logger.info(f"Found {len(groups_with_details)} groups")
         return groups_with_details
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching groups: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -88,42 +113,8 @@ def create_group_endpoint(
         logger.info(f"Creating group for user {current_user.id}: {group.name}")
         new_group = create_group(db=db, group=group, user_id=current_user.id)
         
-        # Если указаны участники, добавляем их
-        if group.contact_ids:
-            for contact_id in group.contact_ids:
-                try:
-                    add_group_member(db, new_group.id, contact_id)
-                except Exception as e:
-                    logger.warning(f"Failed to add member {contact_id} to group {new_group.id}: {e}")
-        
-        # Получаем участников группы
-        members = get_group_members(db, group_id=group.id, user_id=current_user.id)
-        
-        # Получаем контакты участников
-        contacts = []
-        for member in members:
-            contact = db.query(Contact).filter(
-                Contact.id == member.contact_id,
-                Contact.user_id == current_user.id,
-                Contact.is_active == True
-            ).first()
-            if contact:
-                contacts.append(contact)
-        
-        # Создаем GroupResponse с деталями
-        group_response = GroupResponse(
-            id=new_group.id,
-            user_id=new_group.user_id,
-            name=new_group.name,
-            description=new_group.description,
-            is_active=new_group.is_active,
-            created_at=new_group.created_at,
-            updated_at=new_group.updated_at,
-            members=members,
-            contacts=contacts,
-            member_count=len(members),
-            scheduled_calls_count=0
-        )
+        # Участники из contact_ids добавлены в create_group
+        group_response = build_group_responses(db, [new_group], current_user.id)[0]
         
         logger.info(f"Group created successfully: {new_group.id}")
         return group_response
@@ -131,6 +122,31 @@ def create_group_endpoint(
         logger.error(f"Error creating group: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/sets/{operation}", response_model=GroupSetResult)
+def combine_groups_endpoint(
+    operation: Literal["union", "intersection", "difference"],
+    groups: GroupSetOperation,
+    count_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Объединение, пересечение или разность участников групп (разность: первая группа минус остальные)"""
+    try:
+        result = combine_groups(db, current_user.id, operation, groups.group_ids)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return GroupSetResult(
+            operation=operation,
+            group_ids=groups.group_ids,
+            count=len(result),
+            contact_ids=None if count_only else list(result)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error combining groups {groups.group_ids}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{group_id}", response_model=GroupResponse)
 def read_group(
     group_id: int,
@@ -145,34 +161,7 @@ def read_group(
             logger.warning(f"Group {group_id} not found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="Group not found")
         
-        # Получаем участников группы
-        members = get_group_members(db, group_id=db_group.id, user_id=current_user.id)
-        
-        # Получаем контакты участников
-        contacts = []
-        for member in members:
-            contact = db.query(Contact).filter(
-                Contact.id == member.contact_id,
-                Contact.user_id == current_user.id,
-                Contact.is_active == True
-            ).first()
-            if contact:
-                contacts.append(contact)
-        
-        # Создаем GroupResponse с деталями
-        group_response = GroupResponse(
-            id=db_group.id,
-            user_id=db_group.user_id,
-            name=db_group.name,
-            description=db_group.description,
-            is_active=db_group.is_active,
-            created_at=db_group.created_at,
-            updated_at=db_group.updated_at,
-            members=members,
-            contacts=contacts,
-            member_count=len(members),
-            scheduled_calls_count=0
-        )
+        group_response = build_group_responses(db, [db_group], current_user.id)[0]
         
         logger.info(f"Group found: {db_group.name}")
         return group_response
@@ -202,34 +191,7 @@ def update_group_endpoint(
             logger.warning(f"Group {group_id} not found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="Group not found")
         
-        # Получаем участников группы
-        members = get_group_members(db, group_id=db_group.id, user_id=current_user.id)
-        
-        # Получаем контакты участников
-        contacts = []
-        for member in members:
-            contact = db.query(Contact).filter(
-                Contact.id == member.contact_id,
-                Contact.user_id == current_user.id,
-                Contact.is_active == True
-            ).first()
-            if contact:
-                contacts.append(contact)
-        
-        # Создаем GroupResponse с деталями
-        group_response = GroupResponse(
-            id=db_group.id,
-            user_id=db_group.user_id,
-            name=db_group.name,
-            description=db_group.description,
-            is_active=db_group.is_active,
-            created_at=db_group.created_at,
-            updated_at=db_group.updated_at,
-            members=members,
-            contacts=contacts,
-            member_count=len(members),
-            scheduled_calls_count=0
-        )
+        group_response = build_group_responses(db, [db_group], current_user.id)[0]
         
         logger.info(f"Group updated successfully: {db_group.name}")
         return group_response
@@ -281,6 +243,7 @@ def add_group_member_endpoint(
         if not group:
             logger.warning(f"Group {group_id} not found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="Group not found")
+        ensure_static_group(group)
         
         # Проверяем, что контакт принадлежит пользователю
         contact = db.query(Contact).filter(
@@ -294,9 +257,9 @@ def add_group_member_endpoint(
             raise HTTPException(status_code=404, detail="Contact not found")
         
         new_member = add_group_member(
-            db=db, 
-            group_id=group_id, 
-            contact_id=member_data.get('contact_id')
+            db=db,
+            member=GroupMemberCreate(group_id=group_id, contact_id=contact.id),
+            user_id=current_user.id
         )
         
         if not new_member:
@@ -311,6 +274,66 @@ def add_group_member_endpoint(
         logger.error(f"Error adding group member: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _change_members(db: Session, group_id: int, user_id: int, operation, *args) -> GroupMembershipChange:
+    group = get_group(db, group_id=group_id, user_id=user_id)
+    if not group:
+        logger.warning(f"Group {group_id} not found for user {user_id}")
+        raise HTTPException(status_code=404, detail="Group not found")
+    ensure_static_group(group)
+    change = operation(db, group_id, *args)
+    logger.info(
+        f"Group {group_id} members: {change.added} added, {change.removed} removed, {change.skipped} skipped"
+    )
+    return GroupMembershipChange(group_id=group_id, **asdict(change))
+
+@router.post("/{group_id}/members/bulk", response_model=GroupMembershipChange)
+def add_group_members_endpoint(
+    group_id: int,
+    members: GroupMembersBulk,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Массовое добавление участников: чужие и уже добавленные контакты пропускаются"""
+    try:
+        return _change_members(db, group_id, current_user.id, add_group_members, members.contact_ids, current_user.id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error adding group members: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{group_id}/members/bulk-remove", response_model=GroupMembershipChange)
+def remove_group_members_endpoint(
+    group_id: int,
+    members: GroupMembersBulk,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Массовое удаление участников; контакты не из группы пропускаются"""
+    try:
+        return _change_members(db, group_id, current_user.id, remove_group_members, members.contact_ids)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error removing group members: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/{group_id}/members", response_model=GroupMembershipChange)
+def replace_group_members_endpoint(
+    group_id: int,
+    members: GroupMembersBulk,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Замена состава группы списком контактов: меняется только разница"""
+    try:
+        return _change_members(db, group_id, current_user.id, replace_group_members, members.contact_ids, current_user.id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error replacing group members: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.delete("/{group_id}/members/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 def remove_group_member_endpoint(
     group_id: int,
@@ -327,11 +350,13 @@ def remove_group_member_endpoint(
         if not group:
             logger.warning(f"Group {group_id} not found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="Group not found")
+        ensure_static_group(group)
         
         success = remove_group_member(
-            db=db, 
-            group_id=group_id, 
-            contact_id=contact_id
+            db=db,
+            group_id=group_id,
+            contact_id=contact_id,
+            user_id=current_user.id
         )
         
         if not success:
@@ -361,6 +386,8 @@ def get_group_members_endpoint(
         if not group:
             logger.warning(f"Group {group_id} not found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="Group not found")
+        if group.rules is not None:
+            sync_dynamic_groups(db, current_user.id)
         
         members = get_group_members(db, group_id=group_id, user_id=current_user.id)
         logger.info(f"Found {len(members)} members")
@@ -374,17 +401,24 @@ def get_group_members_endpoint(
 # 🔥 Scheduled Group Calls endpoints (новый роутер)
 @scheduled_calls_router.get("/", response_model=List[ScheduledGroupCall])
 def read_scheduled_group_calls(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Получение списка запланированных звонков для групп"""
+    """Получение списка запланированных звонков для групп (курсор следующей страницы — в X-Next-Cursor)"""
     try:
         logger.info(f"Fetching scheduled group calls for user {current_user.id}")
-        calls = get_scheduled_group_calls(db, user_id=current_user.id, skip=skip, limit=limit)
+        calls = get_scheduled_group_calls(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+        next_page = next_cursor(calls, limit, "id")
+        if next_page:
+            response.headers[NEXT_CURSOR_HEADER] = next_page
         logger.info(f"Found {len(calls)} scheduled group calls")
         return calls
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching scheduled group calls: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -483,4 +517,37 @@ def delete_scheduled_group_call_endpoint(
         raise
     except Exception as e:
         logger.error(f"Error deleting scheduled group call {call_id}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@scheduled_calls_router.post("/{call_id}/plan", response_model=GroupCallPlanResponse)
+def plan_scheduled_group_call_endpoint(
+    call_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Распределение звонков участников по временному окну (повторный вызов перепланирует оставшиеся)"""
+    try:
+        logger.info(f"Planning scheduled group call {call_id} for user {current_user.id}")
+        plan = plan_group_call(db, call_id=call_id, user_id=current_user.id)
+        if plan is None:
+            logger.warning(f"Scheduled group call {call_id} not found for user {current_user.id}")
+            raise HTTPException(status_code=404, detail="Scheduled group call not found")
+
+        times = [planned_at for _, planned_at in plan.slots]
+        logger.info(f"Planned {len(plan.slots)} calls, {len(plan.unplaced)} did not fit the window")
+        return GroupCallPlanResponse(
+            group_call_id=call_id,
+            planned=len(plan.slots),
+            unplaced=len(plan.unplaced),
+            capacity=round(plan.capacity, 2),
+            peak_concurrency=round(plan.peak_concurrency, 2),
+            first_call_at=min(times) if times else None,
+            last_call_at=max(times) if times else None
+        )
+    except NoTimeWindow as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error planning scheduled group call {call_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,23 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.api import deps
 from app.models.user import User
 from app.schemas.prompt_template import PromptTemplate, PromptTemplateCreate, PromptTemplateUpdate
 from app.crud import prompt_template as crud_template
+from app.crud.pagination import InvalidCursor, NEXT_CURSOR_HEADER, next_cursor
 
 router = APIRouter(prefix="/prompt-templates", tags=["prompt_templates"])
 
 @router.get("/", response_model=List[PromptTemplate])
 def read_prompt_templates(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Получение списка шаблонов промптов пользователя"""
-    templates = crud_template.get_prompt_templates(db, user_id=current_user.id, skip=skip, limit=limit)
+    """Получение списка шаблонов промптов пользователя (курсор следующей страницы — в X-Next-Cursor)"""
+    try:
+        templates = crud_template.get_prompt_templates(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(templates, limit, "id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     return templates
 
 @router.post("/", response_model=PromptTemplate, status_code=status.HTTP_201_CREATED)
@@ -1,86 +1,58 @@
 # app/api/v1/endpoints/scheduled_calls.py
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.api import deps
 from app.models.user import User
 from app.models.contact import Contact
-from app.models.scheduled_call import ScheduledCall
 from app.schemas.scheduled_call import (
     ScheduledCallCreate, 
+    ScheduledCallBulkCreate,
+    ScheduledCallBulkResult,
     ScheduledCallUpdate, 
-    ScheduledCallResponse
+    ScheduledCallResponse,
+    DispatchQueueItem
 )
 from app.crud.scheduled_call import (
-    get_scheduled_call, 
-    get_scheduled_calls, 
+    get_scheduled_call_response,
+    get_scheduled_call_responses,
+    get_upcoming_call_responses,
+    get_contact_call_responses,
     create_scheduled_call, 
+    create_scheduled_calls,
+    get_call_targets,
     update_scheduled_call, 
     delete_scheduled_call,
-    get_upcoming_calls
+    get_shared_dispatch_queue,
+    ContactNotFound
 )
+from app.crud.group import count_group_members, get_group_call_targets, get_rule_call_targets
+from app.crud.pagination import InvalidCursor, NEXT_CURSOR_HEADER, next_cursor
+from dataclasses import asdict
 
 router = APIRouter(prefix="/scheduled-calls", tags=["scheduled_calls"])
 
 @router.get("/", response_model=List[ScheduledCallResponse])
 def read_scheduled_calls(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Получение списка запланированных звонков"""
-    calls = get_scheduled_calls(db, user_id=current_user.id, skip=skip, limit=limit)
-    
-    # Добавляем информацию о контакте
-    calls_with_contact_info = []
-    for call in calls:
-        contact = db.query(Contact).filter(Contact.id == call.contact_id).first()
-        if contact:
-            calls_with_contact_info.append(ScheduledCallResponse(
-                id=call.id,
-                user_id=call.user_id,
-                contact_id=call.contact_id,
-                scheduled_time=call.scheduled_time,
-                start_time_window=call.start_time_window,
-                end_time_window=call.end_time_window,
-                retry_until_success=call.retry_until_success,
-                script=call.script,
-                notes=call.notes,
-                status=call.status,
-                call_attempts=call.call_attempts,
-                last_attempt_at=call.last_attempt_at,
-                next_retry_at=call.next_retry_at,
-                created_at=call.created_at,
-                updated_at=call.updated_at,
-                contact_name=contact.name,
-                contact_phone=contact.phone,
-                contact_company=contact.company
-            ))
-        else:
-            calls_with_contact_info.append(ScheduledCallResponse(
-                id=call.id,
-                user_id=call.user_id,
-                contact_id=call.contact_id,
-                scheduled_time=call.scheduled_time,
-                start_time_window=call.start_time_window,
-                end_time_window=call.end_time_window,
-                retry_until_success=call.retry_until_success,
-                script=call.script,
-                notes=call.notes,
-                status=call.status,
-                call_attempts=call.call_attempts,
-                last_attempt_at=call.last_attempt_at,
-                next_retry_at=call.next_retry_at,
-                created_at=call.created_at,
-                updated_at=call.updated_at,
-                contact_name="Unknown",
-                contact_phone="",
-                contact_company=""
-            ))
+    """Получение списка запланированных звонков (курсор следующей страницы — в X-Next-Cursor)"""
+    try:
+        rows = get_scheduled_call_responses(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(rows, limit, "id")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     
-    return calls_with_contact_info
+    return [ScheduledCallResponse.model_validate(row) for row in rows]
 
 @router.post("/", response_model=ScheduledCallResponse, status_code=status.HTTP_201_CREATED)
 def create_scheduled_call_endpoint(
@@ -92,56 +64,43 @@ def create_scheduled_call_endpoint(
     try:
         new_call = create_scheduled_call(db=db, call=call_data, user_id=current_user.id)
         
-        # Получаем информацию о контакте
-        contact = db.query(Contact).filter(Contact.id == new_call.contact_id).first()
-        
-        if contact:
-            return ScheduledCallResponse(
-                id=new_call.id,
-                user_id=new_call.user_id,
-                contact_id=new_call.contact_id,
-                scheduled_time=new_call.scheduled_time,
-                start_time_window=new_call.start_time_window,
-                end_time_window=new_call.end_time_window,
-                retry_until_success=new_call.retry_until_success,
-                script=new_call.script,
-                notes=new_call.notes,
-                status=new_call.status,
-                call_attempts=new_call.call_attempts,
-                last_attempt_at=new_call.last_attempt_at,
-                next_retry_at=new_call.next_retry_at,
-                created_at=new_call.created_at,
-                updated_at=new_call.updated_at,
-                contact_name=contact.name,
-                contact_phone=contact.phone,
-                contact_company=contact.company
-            )
-        else:
-            return ScheduledCallResponse(
-                id=new_call.id,
-                user_id=new_call.user_id,
-                contact_id=new_call.contact_id,
-                scheduled_time=new_call.scheduled_time,
-                start_time_window=new_call.start_time_window,
-                end_time_window=new_call.end_time_window,
-                retry_until_success=new_call.retry_until_success,
-                script=new_call.script,
-                notes=new_call.notes,
-                status=new_call.status,
-                call_attempts=new_call.call_attempts,
-                last_attempt_at=new_call.last_attempt_at,
-                next_retry_at=new_call.next_retry_at,
-                created_at=new_call.created_at,
-                updated_at=new_call.updated_at,
-                contact_name="Unknown",
-                contact_phone="",
-                contact_company=""
-            )
+        # Звонок вместе с данными контакта одним запросом
+        return ScheduledCallResponse.model_validate(
+            get_scheduled_call_response(db, call_id=new_call.id, user_id=current_user.id)
+        )
             
-    except ValueError as e:
+    except ContactNotFound as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Scheduled call conflicts with existing data")
+
+@router.post("/bulk", response_model=ScheduledCallBulkResult, status_code=status.HTTP_201_CREATED)
+def create_scheduled_calls_endpoint(
+    call_data: ScheduledCallBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Массовое планирование: один звонок каждому контакту из списка, группы или фильтра; в ответе — только итог.
+    requested — id в списке, участники группы или контакты под фильтром; not_found — те из них,
+    кому звонок не назначить (чужие и удалённые контакты, для фильтра их нет).
+    """
+    if call_data.contact_ids is not None:
+        targets = get_call_targets(db, current_user.id, call_data.contact_ids)
+        requested = len(set(call_data.contact_ids))
+    elif call_data.group_id is not None:
+        targets = get_group_call_targets(db, current_user.id, call_data.group_id)
+        if targets is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        requested = count_group_members(db, call_data.group_id)
+    else:
+        targets = get_rule_call_targets(db, current_user.id, call_data.filter.model_dump())
+        requested = len(targets)
+    result = create_scheduled_calls(db, current_user.id, targets, call_data, requested=requested)
+    return ScheduledCallBulkResult(**asdict(result))
 
 @router.get("/upcoming", response_model=List[ScheduledCallResponse])
 def read_upcoming_calls(
@@ -150,56 +109,34 @@ def read_upcoming_calls(
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """Получение предстоящих звонков"""
-    calls = get_upcoming_calls(db, user_id=current_user.id, limit=limit)
-    
-    # Добавляем информацию о контакте
-    calls_with_contact_info = []
-    for call in calls:
-        contact = db.query(Contact).filter(Contact.id == call.contact_id).first()
-        if contact:
-            calls_with_contact_info.append(ScheduledCallResponse(
-                id=call.id,
-                user_id=call.user_id,
-                contact_id=call.contact_id,
-                scheduled_time=call.scheduled_time,
-                start_time_window=call.start_time_window,
-                end_time_window=call.end_time_window,
-                retry_until_success=call.retry_until_success,
-                script=call.script,
-                notes=call.notes,
-                status=call.status,
-                call_attempts=call.call_attempts,
-                last_attempt_at=call.last_attempt_at,
-                next_retry_at=call.next_retry_at,
-                created_at=call.created_at,
-                updated_at=call.updated_at,
-                contact_name=contact.name,
-                contact_phone=contact.phone,
-                contact_company=contact.company
-            ))
-        else:
-            calls_with_contact_info.append(ScheduledCallResponse(
-                id=call.id,
-                user_id=call.user_id,
-                contact_id=call.contact_id,
-                scheduled_time=call.scheduled_time,
-                start_time_window=call.start_time_window,
-                end_time_window=call.end_time_window,
-                retry_until_success=call.retry_until_success,
-                script=call.script,
-                notes=call.notes,
-                status=call.status,
-                call_attempts=call.call_attempts,
-                last_attempt_at=call.last_attempt_at,
-                next_retry_at=call.next_retry_at,
-                created_at=call.created_at,
-                updated_at=call.updated_at,
-                contact_name="Unknown",
-                contact_phone="",
-                contact_company=""
-            ))
-    
-    return calls_with_contact_info
+    rows = get_upcoming_call_responses(db, user_id=current_user.id, limit=limit)
+    return [ScheduledCallResponse.model_validate(row) for row in rows]
+
+@router.get("/dispatch-queue", response_model=List[DispatchQueueItem])
+def read_dispatch_queue(
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Очередь готовых к набору звонков (EDF) с проверкой, успевают ли они в своё окно.
+    Нагрузка считается по звонкам всех пользователей (дозвонщик общий), в ответе — только свои.
+    """
+    queue = get_shared_dispatch_queue(db, user_id=current_user.id)
+    admission = queue.admission_check()
+    own = [entry for entry in queue.ordered() if entry.call.user_id == current_user.id]
+
+    return [
+        DispatchQueueItem(
+            call_id=entry.call.id,
+            contact_id=entry.call.contact_id,
+            priority=entry.call.priority or 0,
+            deadline=entry.deadline,
+            planned_start=admission.planned_starts[entry.call.id],
+            at_risk=entry.call.id in admission.at_risk
+        )
+        for entry in own[:limit]
+    ]
 
 @router.get("/{call_id}", response_model=ScheduledCallResponse)
 def read_scheduled_call(
@@ -208,55 +145,11 @@ def read_scheduled_call(
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """Получение конкретного запланированного звонка"""
-    db_call = get_scheduled_call(db, call_id=call_id, user_id=current_user.id)
-    if db_call is None:
+    row = get_scheduled_call_response(db, call_id=call_id, user_id=current_user.id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Scheduled call not found")
     
-    # Получаем информацию о контакте
-    contact = db.query(Contact).filter(Contact.id == db_call.contact_id).first()
-    
-    if contact:
-        return ScheduledCallResponse(
-            id=db_call.id,
-            user_id=db_call.user_id,
-            contact_id=db_call.contact_id,
-            scheduled_time=db_call.scheduled_time,
-            start_time_window=db_call.start_time_window,
-            end_time_window=db_call.end_time_window,
-            retry_until_success=db_call.retry_until_success,
-            script=db_call.script,
-            notes=db_call.notes,
-            status=db_call.status,
-            call_attempts=db_call.call_attempts,
-            last_attempt_at=db_call.last_attempt_at,
-            next_retry_at=db_call.next_retry_at,
-            created_at=db_call.created_at,
-            updated_at=db_call.updated_at,
-            contact_name=contact.name,
-            contact_phone=contact.phone,
-            contact_company=contact.company
-        )
-    else:
-        return ScheduledCallResponse(
-            id=db_call.id,
-            user_id=db_call.user_id,
-            contact_id=db_call.contact_id,
-            scheduled_time=db_call.scheduled_time,
-            start_time_window=db_call.start_time_window,
-            end_time_window=db_call.end_time_window,
-            retry_until_success=db_call.retry_until_success,
-            script=db_call.script,
-            notes=db_call.notes,
-            status=db_call.status,
-            call_attempts=db_call.call_attempts,
-            last_attempt_at=db_call.last_attempt_at,
-            next_retry_at=db_call.next_retry_at,
-            created_at=db_call.created_at,
-            updated_at=db_call.updated_at,
-            contact_name="Unknown",
-            contact_phone="",
-            contact_company=""
-        )
+    return ScheduledCallResponse.model_validate(row)
 
 @router.put("/{call_id}", response_model=ScheduledCallResponse)
 def update_scheduled_call_endpoint(
@@ -275,51 +168,9 @@ def update_scheduled_call_endpoint(
     if db_call is None:
         raise HTTPException(status_code=404, detail="Scheduled call not found")
     
-    # Получаем информацию о контакте
-    contact = db.query(Contact).filter(Contact.id == db_call.contact_id).first()
-    
-    if contact:
-        return ScheduledCallResponse(
-            id=db_call.id,
-            user_id=db_call.user_id,
-            contact_id=db_call.contact_id,
-            scheduled_time=db_call.scheduled_time,
-            start_time_window=db_call.start_time_window,
-            end_time_window=db_call.end_time_window,
-            retry_until_success=db_call.retry_until_success,
-            script=db_call.script,
-            notes=db_call.notes,
-            status=db_call.status,
-            call_attempts=db_call.call_attempts,
-            last_attempt_at=db_call.last_attempt_at,
-            next_retry_at=db_call.next_retry_at,
-            created_at=db_call.created_at,
-            updated_at=db_call.updated_at,
-            contact_name=contact.name,
-            contact_phone=contact.phone,
-            contact_company=contact.company
-        )
-    else:
-        return ScheduledCallResponse(
-            id=db_call.id,
-            user_id=db_call.user_id,
-            contact_id=db_call.contact_id,
-            scheduled_time=db_call.scheduled_time,
-            start_time_window=db_call.start_time_window,
-            end_time_window=db_call.end_time_window,
-            retry_until_success=db_call.retry_until_success,
-            script=db_call.script,
-            notes=db_call.notes,
-            status=db_call.status,
-            call_attempts=db_call.call_attempts,
-            last_attempt_at=db_call.last_attempt_at,
-            next_retry_at=db_call.next_retry_at,
-            created_at=db_call.created_at,
-            updated_at=db_call.updated_at,
-            contact_name="Unknown",
-            contact_phone="",
-            contact_company=""
-        )
+    return ScheduledCallResponse.model_validate(
+        get_scheduled_call_response(db, call_id=db_call.id, user_id=current_user.id)
+    )
 
 @router.delete("/{call_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_scheduled_call_endpoint(
@@ -354,33 +205,5 @@ def get_contact_scheduled_calls(
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
     
-    calls = db.query(ScheduledCall).filter(
-        ScheduledCall.contact_id == contact_id,
-        ScheduledCall.user_id == current_user.id
-    ).all()
-    
-    # Добавляем информацию о контакте
-    calls_with_contact_info = []
-    for call in calls:
-        calls_with_contact_info.append(ScheduledCallResponse(
-            id=call.id,
-            user_id=call.user_id,
-            contact_id=call.contact_id,
-            scheduled_time=call.scheduled_time,
-            start_time_window=call.start_time_window,
-            end_time_window=call.end_time_window,
-            retry_until_success=call.retry_until_success,
-            script=call.script,
-            notes=call.notes,
-            status=call.status,
-            call_attempts=call.call_attempts,
-            last_attempt_at=call.last_attempt_at,
-            next_retry_at=call.next_retry_at,
-            created_at=call.created_at,
-            updated_at=call.updated_at,
-            contact_name=contact.name,
-            contact_phone=contact.phone,
-            contact_company=contact.company
-        ))
-    
-    return calls_with_contact_info
\ No newline at end of file
+    rows = get_contact_call_responses(db, contact_id=contact_id, user_id=current_user.id)
+    return [ScheduledCallResponse.model_validate(row) for row in rows]
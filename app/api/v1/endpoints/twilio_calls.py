@@ -16,14 +16,16 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 from fastapi.websockets import WebSocket
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.api import deps
 from app.models.user import User
 from app.models.contact import Contact, ContactDialog, DialogMessage
 from app.services.twilio_service import twilio_service
 from app.schemas.twilio_call import TwilioCallCreate, TwilioCallResponse, TwilioCallStatus
 from app.crud.contact import get_contact, add_dialog, add_dialog_message
+from app.crud.aio import contact as contact_aio
 
 # Новый API
 from google import genai
@@ -176,7 +178,7 @@ async def twilio_webhook(request: Request):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/status")
-async def call_status_webhook(request: Request, db: Session = Depends(get_db)):
+async def call_status_webhook(request: Request):
     """
     Webhook для получения статуса звонка
     """
@@ -307,7 +309,7 @@ async def dialog_gather(
     script: str = None,
     contact_id: int = None,
     user_id: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     from twilio.twiml.voice_response import VoiceResponse
 
@@ -315,6 +317,12 @@ async def dialog_gather(
     speech_result = form.get("SpeechResult")
     call_sid = form.get("CallSid")
 
+    # Звонок не в памяти (например, после рестарта) — восстанавливаем контакт из параметров вебхука
+    if call_sid and call_sid not in active_calls and contact_id and user_id:
+        contact = await contact_aio.get_contact(db, contact_id, user_id)
+        if contact:
+            active_calls[call_sid] = {"contact_id": contact.id, "user_id": user_id, "script": unquote(script or "")}
+
     resp = VoiceResponse()
     script_decoded = unquote(script) if script else ""
 
@@ -423,7 +431,7 @@ async def gemini_tts(text: str):
 # ==============================
 # Media Stream WebSocket (реальный TTS/STT)
 @router.websocket("/media-stream/{call_sid}")
-async def media_stream_websocket(websocket: WebSocket, call_sid: str, db: Session = Depends(get_db)):
+async def media_stream_websocket(websocket: WebSocket, call_sid: str, db: AsyncSession = Depends(get_async_db)):
     await websocket.accept()
     logger.info(f"🎙️ Media stream connected for call {call_sid}")
 
@@ -524,37 +532,20 @@ async def process_text_to_speech(text: str) -> bytes:
 
 # --------------------- Сохранение сообщений ---------------------
 
-async def save_speech_message(db: Session, call_sid: str, role: str, text: str):
+async def save_speech_message(db: AsyncSession, call_sid: str, role: str, text: str):
     """
-    Сохраняем текст в БД
+    Сохраняем текст в БД (асинхронная сессия — не блокирует цикл событий)
     """
     call_info = active_calls.get(call_sid)
     if not call_info:
         logger.warning(f"❌ Call {call_sid} not found")
         return
 
-    dialog = db.query(ContactDialog).filter(
-        ContactDialog.contact_id == call_info["contact_id"],
-    ).order_by(ContactDialog.date.desc()).first()
-
+    dialog = await contact_aio.get_latest_dialog(db, call_info["contact_id"])
     if not dialog:
-        dialog = ContactDialog(
-            contact_id=call_info["contact_id"],
-            user_id=call_info["user_id"],
-            date=datetime.utcnow()
-        )
-        db.add(dialog)
-        db.commit()
-        db.refresh(dialog)
-
-    message = DialogMessage(
-        dialog_id=dialog.id,
-        role=role,
-        text=text
-    )
-    db.add(message)
-    db.commit()
-    db.refresh(message)
+        dialog = await contact_aio.create_dialog(db, call_info["contact_id"])
+
+    await contact_aio.add_dialog_message(db, dialog.id, role, text)
     logger.info(f"💾 Saved {role} message: {text[:50]}...")
 
 
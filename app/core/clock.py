@@ -0,0 +1,45 @@
+# app/core/clock.py
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Текущее время (naive UTC, как и все даты в базе)"""
+
+    def now(self) -> datetime:
+        return datetime.utcnow()
+
+
+class SimulatedClock:
+    """Управляемые часы для симуляции и тестов"""
+
+    def __init__(self, start: datetime):
+        self._now = start
+
+    def now(self) -> datetime:
+        return self._now
+
+    def set(self, value: datetime):
+        self._now = value
+
+    def advance(self, delta: timedelta):
+        self._now += delta
+
+
+class Clock:
+    """Прокси на текущий источник времени; подменяется через set_source()"""
+
+    def __init__(self):
+        self.source = SystemClock()
+
+    def now(self) -> datetime:
+        return self.source.now()
+
+    def set_source(self, source):
+        self.source = source
+
+    def reset(self):
+        self.source = SystemClock()
+
+
+# Глобальные часы планировщика
+clock = Clock()
@@ -16,6 +16,14 @@ class Settings:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+
+    # SQLite: WAL, кэш и пулы соединений
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))  # байты
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # отрицательное — в КиБ
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # мс
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", os.cpu_count() or 4))
+    DB_WRITE_TIMEOUT: int = int(os.getenv("DB_WRITE_TIMEOUT", 30))  # секунды ожидания писателя
     
     # Twilio
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
@@ -24,4 +32,47 @@ class Settings:
 
     # Base URL для webhook'ов
     BASE_URL: str = os.getenv("BASE_URL", "http://localhost:8000")
+
+    # Повторы звонков
+    RETRY_STRATEGY: str = os.getenv("RETRY_STRATEGY", "decorrelated_jitter")  # fixed, exponential, decorrelated_jitter
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", 10))
+    RETRY_DEFAULT_INTERVAL: int = int(os.getenv("RETRY_DEFAULT_INTERVAL", 60))  # минуты
+
+    # Ёмкость дозвонщика
+    DIALER_MAX_CONCURRENCY: int = int(os.getenv("DIALER_MAX_CONCURRENCY", 10))  # одновременных звонков
+    TWILIO_CPS_LIMIT: float = float(os.getenv("TWILIO_CPS_LIMIT", 1))  # новых звонков в секунду
+    EXPECTED_CALL_DURATION: int = int(os.getenv("EXPECTED_CALL_DURATION", 90))  # секунды
+
+    # Очередь отправки звонков
+    DISPATCH_DEFAULT_SLACK: int = int(os.getenv("DISPATCH_DEFAULT_SLACK", 60))  # минуты, срок для звонков без окна
+    DISPATCH_PRIORITY_STEP: int = int(os.getenv("DISPATCH_PRIORITY_STEP", 600))  # секунды форы за единицу приоритета
+    DISPATCH_AGING_FACTOR: float = float(os.getenv("DISPATCH_AGING_FACTOR", 0.5))  # фора за каждую секунду ожидания
+    DIALING_TIMEOUT: int = int(os.getenv("DIALING_TIMEOUT", 30))  # минуты в dialing, после которых попытка неудачна
+    DIALING_RECOVERY_INTERVAL: int = int(os.getenv("DIALING_RECOVERY_INTERVAL", 5))  # минуты, 0 — не проверять в фоне
+
+    # Телефоны: код страны для национальных номеров с ведущим 0
+    DEFAULT_PHONE_COUNTRY_CODE: str = os.getenv("DEFAULT_PHONE_COUNTRY_CODE", "421")
+
+    # Поиск контактов: сколько самых новых совпадений ранжировать
+    CONTACT_SEARCH_WINDOW: int = int(os.getenv("CONTACT_SEARCH_WINDOW", 1000))
+
+    # Битмапы участников групп в памяти: сколько групп держать в кэше
+    GROUP_INDEX_MAX_GROUPS: int = int(os.getenv("GROUP_INDEX_MAX_GROUPS", 1000))
+
+    # Сжатие длинных текстов в базе (app/models/types.py)
+    TEXT_COMPRESSION_THRESHOLD: int = int(os.getenv("TEXT_COMPRESSION_THRESHOLD", 512))  # байты UTF-8
+    TEXT_COMPRESSION_LEVEL: int = int(os.getenv("TEXT_COMPRESSION_LEVEL", 6))  # уровень zlib, 1-9
+    TEXT_COMPRESSION_MIN_SAVING: float = float(os.getenv("TEXT_COMPRESSION_MIN_SAVING", 0.2))  # доля экономии
+
+    # Архив старых диалогов (app/services/dialog_archive.py)
+    DIALOG_ARCHIVE_DIR: str = os.getenv("DIALOG_ARCHIVE_DIR", "./dialog_archive")
+    DIALOG_ARCHIVE_AFTER_DAYS: int = int(os.getenv("DIALOG_ARCHIVE_AFTER_DAYS", 180))  # без сообщений столько дней
+    DIALOG_ARCHIVE_INTERVAL_HOURS: float = float(os.getenv("DIALOG_ARCHIVE_INTERVAL_HOURS", 24))  # 0 — не запускать в фоне
+    DIALOG_ARCHIVE_SEGMENT_SIZE: int = int(os.getenv("DIALOG_ARCHIVE_SEGMENT_SIZE", 64 * 1024 * 1024))  # байты
+
+    # Разрешённые часы звонков (местное время контакта)
+    DEFAULT_CONTACT_TIMEZONE: str = os.getenv("DEFAULT_CONTACT_TIMEZONE", "Europe/Bratislava")
+    CALLING_HOURS_START: str = os.getenv("CALLING_HOURS_START", "09:00")
+    CALLING_HOURS_END: str = os.getenv("CALLING_HOURS_END", "20:00")
+    CALLING_DAYS: str = os.getenv("CALLING_DAYS", "0,1,2,3,4,5")  # 0 = понедельник
 settings = Settings()
\ No newline at end of file
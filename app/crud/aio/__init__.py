@@ -0,0 +1,11 @@
+# app/crud/aio/__init__.py
+"""
+Асинхронные варианты CRUD для путей, которые работают в цикле событий:
+вебхуки диалога Twilio и WebSocket медиапотока. Они читают только контакты
+и пишут диалоги, поэтому здесь есть лишь contact.py.
+
+Группы и запланированные звонки читаются из синхронных эндпоинтов (FastAPI
+выполняет их в пуле потоков) и из фоновых потоков планировщика, где сессия
+синхронная. Асинхронные копии этих модулей появятся вместе с первым
+async-вызывающим, а не заранее.
+"""
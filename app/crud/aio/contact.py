@@ -0,0 +1,52 @@
+# app/crud/aio/contact.py
+"""Асинхронные варианты app/crud/contact.py для вебхуков Twilio и WebSocket"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.models.contact import Contact, ContactDialog, DialogMessage
+from datetime import datetime
+
+async def get_contact(db: AsyncSession, contact_id: int, user_id: int) -> Optional[Contact]:
+    result = await db.execute(
+        select(Contact).where(
+            Contact.id == contact_id,
+            Contact.user_id == user_id,
+            Contact.is_active == True
+        )
+    )
+    return result.scalars().first()
+
+async def get_latest_dialog(db: AsyncSession, contact_id: int) -> Optional[ContactDialog]:
+    """Последний диалог контакта"""
+    result = await db.execute(
+        select(ContactDialog).where(
+            ContactDialog.contact_id == contact_id
+        ).order_by(ContactDialog.date.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+async def create_dialog(db: AsyncSession, contact_id: int, transcript: str = None) -> ContactDialog:
+    dialog = ContactDialog(
+        contact_id=contact_id,
+        date=datetime.utcnow(),
+        transcript=transcript
+    )
+    db.add(dialog)
+    await db.commit()
+    return dialog
+
+async def add_dialog_message(db: AsyncSession, dialog_id: int, role: str, text: str) -> Optional[DialogMessage]:
+    """Добавляет сообщение к диалогу"""
+    try:
+        message = DialogMessage(
+            dialog_id=dialog_id,
+            role=role,
+            text=text
+        )
+        db.add(message)
+        await db.commit()
+        return message
+    except Exception as e:
+        await db.rollback()
+        print(f"Error adding dialog message: {e}")
+        return None
@@ -1,35 +1,137 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload, undefer
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from app.models.contact import Contact, ContactDialog, DialogMessage
+from app.models.group import Group, GroupMember
+from app.models.search import contacts_fts, match_query
 from app.schemas.contact import ContactCreate, ContactUpdate
+from app.crud.scheduled_call import recompute_eligibility
+from app.crud.pagination import keyset
+from app.crud.dialog import get_dialogs
+from app.crud.tag import add_contact_tags, get_tag_names, set_contact_tags
+from app.crud.group import bump_group_counters
+from app.core.config import settings
+from app.services.contact_import import ImportReport, validate_record
+from app.services.group_index import mark_group_changed
+from app.services.phone import normalize_phone, try_normalize_phone
+from collections import defaultdict
+from itertools import islice
 import json
 from datetime import datetime
 
 def get_contact(db: Session, contact_id: int, user_id: int) -> Optional[Contact]:
-    return db.query(Contact).filter(
+    return db.query(Contact).options(
+        selectinload(Contact.tag_objects), undefer(Contact.script)
+    ).filter(
         Contact.id == contact_id,
         Contact.user_id == user_id,
         Contact.is_active == True
     ).first()
 
-def get_contacts(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Contact]:
+def contact_exists(db: Session, contact_id: int, user_id: int) -> bool:
+    """Проверка без загрузки контакта: ни тегов, ни распаковки script"""
+    return db.query(Contact.id).filter(
+        Contact.id == contact_id,
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    ).first() is not None
+
+class DuplicatePhone(ValueError):
+    """У пользователя уже есть активный контакт с этим номером"""
+
+class DynamicGroupMembers(ValueError):
+    """Состав динамической группы задают правила, импорт в неё не добавляет"""
+
+def get_contact_by_phone(db: Session, user_id: int, phone: str) -> Optional[Contact]:
+    """Активный контакт пользователя по номеру в любом написании — через индекс (user_id, phone_e164)"""
+    phone_e164 = try_normalize_phone(phone)
+    if not phone_e164:
+        return None
     return db.query(Contact).filter(
+        Contact.user_id == user_id,
+        Contact.phone_e164 == phone_e164,
+        Contact.is_active == True
+    ).first()
+
+def get_existing_phones(db: Session, user_id: int, phones: List[str], batch_size: int = 1000) -> set:
+    """Какие из номеров E.164 уже заняты активными контактами пользователя"""
+    existing = set()
+    for start in range(0, len(phones), batch_size):
+        existing.update(phone for (phone,) in db.query(Contact.phone_e164).filter(
+            Contact.user_id == user_id,
+            Contact.phone_e164.in_(phones[start:start + batch_size]),
+            Contact.is_active == True
+        ))
+    return existing
+
+def _check_phone_free(db: Session, user_id: int, phone_e164: str, contact_id: Optional[int] = None):
+    existing = get_contact_by_phone(db, user_id, phone_e164)
+    if existing and existing.id != contact_id:
+        raise DuplicatePhone(f"Contact with phone {phone_e164} already exists (id {existing.id})")
+
+def get_contacts(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Contact]:
+    query = db.query(Contact).options(
+        selectinload(Contact.tag_objects), undefer(Contact.script)
+    ).filter(
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    )
+    return keyset(query, (Contact.id,), cursor).offset(skip).limit(limit).all()
+
+def search_contacts(
+    db: Session,
+    user_id: int,
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> list:
+    """
+    Поиск активных контактов по имени, компании, email, телефону и тегам через FTS5:
+    слова ищутся как префиксы, лучшие совпадения (bm25) сверху, курсор по (rank, id).
+
+    bm25 по всем совпадениям короткого префикса ("pe") на миллионе контактов — сотни
+    миллисекунд, поэтому ранжируются только CONTACT_SEARCH_WINDOW самых новых
+    совпадений пользователя: их FTS отдаёт по rowid без сортировки. Для typeahead
+    этого хватает — уточнённый запрос сужает совпадения до окна.
+    Возвращает лёгкие строки колонок, без ORM-объектов и тегов (см. get_tag_names).
+    """
+    match = match_query(q)
+    if not match:
+        return []
+    # MATERIALIZED: окно считается один раз, планировщик не разворачивает его в join
+    recent = select(
+        contacts_fts.c.rowid.label("id"),
+        contacts_fts.c.rank
+    ).join(
+        Contact, Contact.id == contacts_fts.c.rowid
+    ).where(
+        contacts_fts.c.contacts_fts.match(match),
         Contact.user_id == user_id,
         Contact.is_active == True
-    ).offset(skip).limit(limit).all()
+    ).order_by(
+        contacts_fts.c.rowid.desc()
+    ).limit(settings.CONTACT_SEARCH_WINDOW).cte("recent_matches").prefix_with("MATERIALIZED")
+
+    query = db.query(
+        Contact.id, Contact.name, Contact.phone, Contact.email, Contact.company, recent.c.rank
+    ).join(recent, recent.c.id == Contact.id)
+    return keyset(query, (recent.c.rank, Contact.id), cursor).limit(limit).all()
 
 def create_contact(db: Session, contact: ContactCreate, user_id: int) -> Contact:
+    phone_e164 = normalize_phone(contact.phone)
+    _check_phone_free(db, user_id, phone_e164)
     db_contact = Contact(
         user_id=user_id,
         name=contact.name,
         phone=contact.phone,
+        phone_e164=phone_e164,
         email=contact.email,
         company=contact.company,
+        timezone=contact.timezone,
         script=contact.script
     )
     # Устанавливаем теги
-    if contact.tags:
-        db_contact.set_tags(contact.tags)
+    set_contact_tags(db, db_contact, contact.tags)
     
     db.add(db_contact)
     db.commit()
@@ -44,29 +146,162 @@ def update_contact(db: Session, contact_id: int, contact_update: ContactUpdate,
         # Обрабатываем теги отдельно
         if 'tags' in update_data:
             tags = update_data.pop('tags')
-            db_contact.set_tags(tags)
+            set_contact_tags(db, db_contact, tags)
         
+        if 'phone' in update_data:
+            update_data['phone_e164'] = normalize_phone(update_data['phone'])
+            _check_phone_free(db, user_id, update_data['phone_e164'], contact_id=db_contact.id)
+
+        timezone_changed = 'timezone' in update_data and update_data['timezone'] != db_contact.timezone
         for field, value in update_data.items():
             setattr(db_contact, field, value)
         
         db.commit()
         db.refresh(db_contact)
+
+        # Сменился часовой пояс — пересчитываем время набора только звонков этого контакта
+        if timezone_changed:
+            recompute_eligibility(db, contact_id=db_contact.id)
     return db_contact
 
 def delete_contact(db: Session, contact_id: int, user_id: int) -> bool:
     db_contact = get_contact(db, contact_id, user_id)
     if db_contact:
         db_contact.is_active = False
+        # Контакт остаётся участником своих групп, но уже не активным
+        bump_group_counters(
+            db, select(GroupMember.group_id).where(GroupMember.contact_id == db_contact.id), active_member_count=-1
+        )
         db.commit()
         return True
     return False
 
+def import_contacts(
+    db: Session,
+    records: Iterable[Tuple[int, Union[dict, ValueError]]],
+    user_id: int,
+    group_id: Optional[int] = None,
+    chunk_size: int = 5000,
+    on_progress: Optional[Callable[[ImportReport], None]] = None
+) -> ImportReport:
+    """
+    Массовый импорт контактов из потока (номер строки, запись) — см. contact_import.iter_records.
+    Вставка пачками по chunk_size строк одним executemany, коммит на пачку:
+    упавший посреди файла импорт оставляет уже вставленные пачки. Повторы номера
+    (среди существующих контактов и внутри файла) пропускаются и считаются в отчёте:
+    перед вставкой пачки занятые номера ищутся по индексу (user_id, phone_e164).
+    """
+    if group_id is not None:
+        group = db.query(Group.id, Group.rules).filter(
+            Group.id == group_id, Group.user_id == user_id, Group.is_active == True
+        ).first()
+        if not group:
+            raise ValueError("Group not found")
+        if group.rules is not None:
+            raise DynamicGroupMembers("Members of a dynamic group are defined by its rules")
+
+    started = datetime.utcnow()
+    report = ImportReport()
+    chunk = {}  # phone_e164 -> значения колонок
+
+    def flush():
+        if not chunk:
+            return
+        existing = get_existing_phones(db, user_id, list(chunk))
+        report.duplicates += len(existing)
+        rows = [values for phone, values in chunk.items() if phone not in existing]
+        chunk.clear()
+        if rows:
+            tags = [values.pop("tags") for values in rows]
+            # Core-вставка через соединение писателя: ORM-bulk на каждой строке заметно медленнее.
+            # RETURNING в порядке параметров: id новых контактов сразу идут в теги и группу
+            contacts_insert = insert(Contact.__table__)
+            conn = db.connection(bind_arguments={"clause": contacts_insert})
+            contact_ids = conn.execute(
+                contacts_insert.returning(Contact.__table__.c.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            add_contact_tags(db, user_id, {
+                contact_id: contact_tags for contact_id, contact_tags in zip(contact_ids, tags) if contact_tags
+            })
+            if group_id is not None:
+                conn.execute(insert(GroupMember.__table__), [
+                    {"group_id": group_id, "contact_id": contact_id} for contact_id in contact_ids
+                ])
+                mark_group_changed(db, [group_id])
+                bump_group_counters(
+                    db, [group_id], member_count=len(contact_ids), active_member_count=len(contact_ids)
+                )
+                report.added_to_group += len(contact_ids)
+            db.commit()
+            report.inserted += len(rows)
+        if on_progress:
+            on_progress(report)
+
+    for line, record in records:
+        report.processed += 1
+        if isinstance(record, ValueError):
+            report.add_error(line, str(record))
+            continue
+        try:
+            values = validate_record(record)
+        except ValueError as e:
+            report.add_error(line, str(e))
+            continue
+
+        if values["phone_e164"] in chunk:
+            report.duplicates += 1
+            continue
+
+        values["user_id"] = user_id
+        chunk[values["phone_e164"]] = values
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+
+    report.seconds = (datetime.utcnow() - started).total_seconds()
+    return report
+
+# Колонки выгрузки контактов; tags и group_ids — списки
+EXPORT_COLUMNS = ("id", "name", "phone", "email", "company", "timezone", "script", "tags", "group_ids", "created_at")
+
+def iter_contacts_for_export(db: Session, user_id: int, batch_size: int = 1000) -> Iterator[dict]:
+    """
+    Все активные контакты пользователя по id для выгрузки, потоком с серверного курсора.
+    Теги и членство в группах — по одному IN-запросу на пачку из batch_size
+    контактов, так что память постоянна при любом числе контактов.
+    """
+    rows = iter(db.query(
+        Contact.id, Contact.name, Contact.phone, Contact.email, Contact.company,
+        Contact.timezone, Contact.script, Contact.created_at
+    ).filter(
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    ).order_by(Contact.id).yield_per(batch_size))
+
+    while batch := list(islice(rows, batch_size)):
+        contact_ids = [row.id for row in batch]
+        tag_names = get_tag_names(db, contact_ids)
+        group_ids = defaultdict(list)
+        memberships = db.query(GroupMember.contact_id, GroupMember.group_id).join(
+            Group, Group.id == GroupMember.group_id
+        ).filter(
+            GroupMember.contact_id.in_(contact_ids),
+            Group.is_active == True
+        ).order_by(GroupMember.group_id)
+        for contact_id, group_id in memberships:
+            group_ids[contact_id].append(group_id)
+
+        for row in batch:
+            values = row._asdict()
+            values["tags"] = tag_names[row.id]
+            values["group_ids"] = group_ids[row.id]
+            yield values
+
 # Диалоги
 def add_dialog(db: Session, contact_id: int, user_id: int, messages: List[dict], transcript: str = None) -> Optional[ContactDialog]:
     """Добавляет новый диалог к контакту"""
     # Проверяем, что контакт принадлежит пользователю
-    contact = get_contact(db, contact_id, user_id)
-    if not contact:
+    if not contact_exists(db, contact_id, user_id):
         return None
     
     try:
@@ -98,23 +333,18 @@ def add_dialog(db: Session, contact_id: int, user_id: int, messages: List[dict],
         print(f"Error adding dialog: {e}")
         return None
 
-def get_contact_dialogs(db: Session, contact_id: int, user_id: int) -> List[ContactDialog]:
-    """Получает все диалоги контакта"""
-    contact = get_contact(db, contact_id, user_id)
-    if not contact:
+def get_contact_dialogs(
+    db: Session,
+    contact_id: int,
+    user_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> List[ContactDialog]:
+    """Получает диалоги контакта с сообщениями (два запроса), новые сверху; без limit — все"""
+    if not contact_exists(db, contact_id, user_id):
         return []
     
-    dialogs = db.query(ContactDialog).filter(
-        ContactDialog.contact_id == contact_id
-    ).order_by(ContactDialog.date.desc()).all()
-    
-    # Загружаем сообщения для каждого диалога
-    for dialog in dialogs:
-        dialog.messages = db.query(DialogMessage).filter(
-            DialogMessage.dialog_id == dialog.id
-        ).order_by(DialogMessage.timestamp.asc()).all()
-    
-    return dialogs
+    return get_dialogs(db, contact_id, limit=limit, cursor=cursor)
 
 def add_dialog_message(db: Session, dialog_id: int, role: str, text: str) -> Optional[DialogMessage]:
     """Добавляет сообщение к диалогу"""
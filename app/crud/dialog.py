@@ -0,0 +1,292 @@
+# app/crud/dialog.py
+"""
+Репозиторий диалогов контакта.
+
+Диалоги со всеми сообщениями загружаются двумя запросами: страница диалогов
+и один SELECT ... WHERE dialog_id IN (...) для их сообщений (selectinload,
+порядок задан в ContactDialog.messages). Сводки диалогов — один запрос
+с агрегатами, без текста сообщений и транскриптов.
+
+Старые диалоги archive_old_dialogs переносит из contact_dialogs/dialog_messages
+в сегментные файлы (app/services/dialog_archive.py), индекс — archived_dialogs.
+Чтения ниже видят оба источника: страница списка — страница из каждого по тому
+же ключу (date, id) и слияние, а сегмент читается только для архивных диалогов,
+попавших на страницу.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, func, insert, literal, select
+from sqlalchemy.orm import Session, selectinload, undefer
+from typing import Iterator, List, Optional, Sequence, Union
+from app.core.clock import clock
+from app.core.config import settings
+from app.models.contact import Contact, ContactDialog, DialogMessage, ArchivedDialog
+from app.crud.pagination import decode_cursor, keyset
+from app.services.dialog_archive import DialogArchive, DialogRecord, dialog_archive, encode_dialog
+
+# Ключи сортировки для курсоров
+DIALOG_KEY = (ContactDialog.date, ContactDialog.id)
+ARCHIVE_KEY = (ArchivedDialog.date, ArchivedDialog.id)
+MESSAGE_KEY = (DialogMessage.timestamp, DialogMessage.id)
+
+def _newest_first(rows: list, limit: Optional[int]) -> list:
+    """Слияние страниц горячих и архивных диалогов по (date, id); диалоги без даты — в конце, как NULL в SQL"""
+    rows = sorted(rows, key=lambda row: (row.date is not None, row.date or datetime.min, row.id), reverse=True)
+    return rows if limit is None else rows[:limit]
+
+def load_archived_dialog(entry: ArchivedDialog, archive: Optional[DialogArchive] = None) -> DialogRecord:
+    """Диалог с сообщениями из сегмента по записи индекса"""
+    return (archive or dialog_archive).read(entry.id, entry.segment, entry.segment_offset, entry.segment_length)
+
+def get_archived_dialog(db: Session, dialog_id: int) -> Optional[ArchivedDialog]:
+    return db.query(ArchivedDialog).filter(ArchivedDialog.id == dialog_id).first()
+
+def get_dialogs(
+    db: Session,
+    contact_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> List[Union[ContactDialog, DialogRecord]]:
+    """Диалоги контакта (и архивные) с упорядоченными сообщениями, новые сверху; без limit — все"""
+    query = db.query(ContactDialog).options(
+        selectinload(ContactDialog.messages), undefer(ContactDialog.transcript)
+    ).filter(
+        ContactDialog.contact_id == contact_id
+    )
+    dialogs = keyset(query, DIALOG_KEY, cursor, descending=True).limit(limit).all()
+    archived = db.query(ArchivedDialog).filter(ArchivedDialog.contact_id == contact_id)
+    archived = keyset(archived, ARCHIVE_KEY, cursor, descending=True).limit(limit).all()
+    if not archived:
+        return dialogs
+    return [
+        load_archived_dialog(dialog) if isinstance(dialog, ArchivedDialog) else dialog
+        for dialog in _newest_first(dialogs + archived, limit)
+    ]
+
+def get_dialog_summaries(
+    db: Session,
+    contact_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> list:
+    """Облегчённый список: диалог, число сообщений и время последнего сообщения"""
+    query = db.query(
+        ContactDialog.id,
+        ContactDialog.contact_id,
+        ContactDialog.date,
+        func.count(DialogMessage.id).label("message_count"),
+        func.max(DialogMessage.timestamp).label("last_message_at"),
+        literal(False).label("archived")
+    ).outerjoin(
+        DialogMessage, DialogMessage.dialog_id == ContactDialog.id
+    ).filter(
+        ContactDialog.contact_id == contact_id
+    ).group_by(ContactDialog.id)
+    summaries = keyset(query, DIALOG_KEY, cursor, descending=True).limit(limit).all()
+    # Сводка архивного диалога хранится в индексе, сегмент не читается
+    archived = db.query(
+        ArchivedDialog.id,
+        ArchivedDialog.contact_id,
+        ArchivedDialog.date,
+        ArchivedDialog.message_count,
+        ArchivedDialog.last_message_at,
+        literal(True).label("archived")
+    ).filter(
+        ArchivedDialog.contact_id == contact_id
+    )
+    archived = keyset(archived, ARCHIVE_KEY, cursor, descending=True).limit(limit).all()
+    return _newest_first(summaries + archived, limit) if archived else summaries
+
+def dialog_exists(db: Session, dialog_id: int, contact_id: int) -> bool:
+    """Есть ли у контакта диалог, горячий или архивный; транскрипт и сегмент не читаются"""
+    return db.query(
+        exists().where(ContactDialog.id == dialog_id, ContactDialog.contact_id == contact_id)
+        | exists().where(ArchivedDialog.id == dialog_id, ArchivedDialog.contact_id == contact_id)
+    ).scalar()
+
+def get_dialog(db: Session, dialog_id: int, contact_id: int) -> Optional[Union[ContactDialog, DialogRecord]]:
+    dialog = db.query(ContactDialog).filter(
+        ContactDialog.id == dialog_id,
+        ContactDialog.contact_id == contact_id
+    ).first()
+    if dialog:
+        return dialog
+    entry = db.query(ArchivedDialog).filter(
+        ArchivedDialog.id == dialog_id,
+        ArchivedDialog.contact_id == contact_id
+    ).first()
+    return load_archived_dialog(entry) if entry else None
+
+def _page_messages(messages: Sequence, limit: Optional[int], cursor: Optional[str], descending: bool) -> list:
+    """Страница сообщений архивного диалога в памяти, с тем же курсором, что и у горячих"""
+    key = lambda message: (message.timestamp, message.id)
+    if cursor:
+        after = tuple(decode_cursor(cursor, MESSAGE_KEY))
+        messages = [m for m in messages if (key(m) < after if descending else key(m) > after)]
+    messages = sorted(messages, key=key, reverse=descending)
+    return messages if limit is None else messages[:limit]
+
+def get_dialog_messages(
+    db: Session,
+    dialog_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    newest_first: bool = False
+) -> list:
+    """
+    Сообщения диалога страницами по (timestamp, id). С newest_first страницы идут
+    от последних сообщений к старым — для ленивой догрузки истории в UI.
+    """
+    entry = get_archived_dialog(db, dialog_id)
+    if entry:
+        return _page_messages(load_archived_dialog(entry).messages, limit, cursor, newest_first)
+    query = db.query(DialogMessage).filter(DialogMessage.dialog_id == dialog_id)
+    return keyset(query, MESSAGE_KEY, cursor, descending=newest_first).limit(limit).all()
+
+def iter_dialog_messages(db: Session, dialog_id: int, batch_size: int = 1000) -> Iterator:
+    """
+    Все сообщения диалога по порядку, потоком с серверного курсора.
+    Строки — кортежи колонок, не ORM-объекты: identity map не растёт,
+    память постоянна при любой длине диалога.
+    """
+    entry = get_archived_dialog(db, dialog_id)
+    if entry:
+        yield from load_archived_dialog(entry).messages
+        return
+    query = db.query(
+        DialogMessage.id,
+        DialogMessage.role,
+        DialogMessage.text,
+        DialogMessage.timestamp
+    ).filter(
+        DialogMessage.dialog_id == dialog_id
+    ).order_by(*MESSAGE_KEY)
+    yield from query.yield_per(batch_size)
+
+# Колонки выгрузки диалогов: строка на сообщение, диалог без сообщений — одна строка с пустыми полями
+EXPORT_COLUMNS = ("contact_id", "dialog_id", "dialog_date", "message_id", "role", "text", "timestamp")
+
+def iter_dialogs_for_export(
+    db: Session,
+    user_id: int,
+    contact_id: Optional[int] = None,
+    batch_size: int = 1000
+) -> Iterator[dict]:
+    """
+    Сообщения всех диалогов активных контактов пользователя (или одного контакта)
+    потоком. Порядок (контакт, диалог, сообщение) совпадает с индексами
+    contacts/contact_dialogs/dialog_messages, сортировки в памяти базы нет.
+    Архивные диалоги идут следом в том же порядке, по одному из сегмента.
+    """
+    query = db.query(
+        ContactDialog.contact_id,
+        ContactDialog.id.label("dialog_id"),
+        ContactDialog.date.label("dialog_date"),
+        DialogMessage.id.label("message_id"),
+        DialogMessage.role,
+        DialogMessage.text,
+        DialogMessage.timestamp
+    ).select_from(Contact).join(
+        ContactDialog, ContactDialog.contact_id == Contact.id
+    ).outerjoin(
+        DialogMessage, DialogMessage.dialog_id == ContactDialog.id
+    ).filter(
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    )
+    if contact_id is not None:
+        query = query.filter(Contact.id == contact_id)
+    query = query.order_by(Contact.id, *DIALOG_KEY, *MESSAGE_KEY)
+    for row in query.yield_per(batch_size):
+        yield row._asdict()
+
+    archived = db.query(ArchivedDialog).select_from(Contact).join(
+        ArchivedDialog, ArchivedDialog.contact_id == Contact.id
+    ).filter(
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    )
+    if contact_id is not None:
+        archived = archived.filter(Contact.id == contact_id)
+    for entry in archived.order_by(Contact.id, *ARCHIVE_KEY).yield_per(batch_size):
+        dialog = load_archived_dialog(entry)
+        dialog_values = {"contact_id": dialog.contact_id, "dialog_id": dialog.id, "dialog_date": dialog.date}
+        if not dialog.messages:
+            yield {**dialog_values, "message_id": None, "role": None, "text": None, "timestamp": None}
+        for message in dialog.messages:
+            yield {
+                **dialog_values,
+                "message_id": message.id,
+                "role": message.role,
+                "text": message.text,
+                "timestamp": message.timestamp,
+            }
+
+def archive_old_dialogs(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    now: Optional[datetime] = None,
+    batch_size: int = 500,
+    archive: Optional[DialogArchive] = None
+) -> int:
+    """
+    Переносит в архив диалоги старше older_than_days (по умолчанию DIALOG_ARCHIVE_AFTER_DAYS),
+    в которых с тех пор не было сообщений. Пачка — одна транзакция: строки удаляются
+    DELETE ... RETURNING, так что в сегмент попадает ровно удалённое, затем записи
+    дописываются в сегмент и в индекс. Если транзакция откатится, в сегменте останутся
+    только записи без ссылок из индекса. Диалог с наибольшим id не переносится:
+    SQLite без AUTOINCREMENT выдал бы его id новому диалогу. Возвращает число перенесённых.
+    """
+    archive = archive or dialog_archive
+    days = settings.DIALOG_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = (now or clock.now()) - timedelta(days=days)
+    archivable = (
+        ContactDialog.date < cutoff,
+        ContactDialog.id < select(func.max(ContactDialog.id)).scalar_subquery(),
+        ~exists().where(DialogMessage.dialog_id == ContactDialog.id, DialogMessage.timestamp >= cutoff),
+    )
+
+    total = 0
+    while True:
+        # Кандидаты — читателем; условие повторяется в DELETE, уже под блокировкой писателя
+        candidates = [dialog_id for (dialog_id,) in db.query(ContactDialog.id).filter(
+            *archivable
+        ).order_by(ContactDialog.date).limit(batch_size)]
+        if not candidates:
+            return total
+
+        dialogs = db.execute(
+            delete(ContactDialog).where(ContactDialog.id.in_(candidates), *archivable).returning(
+                ContactDialog.id, ContactDialog.contact_id, ContactDialog.date, ContactDialog.transcript
+            ).execution_options(synchronize_session=False)
+        ).all()
+        if not dialogs:
+            db.rollback()
+            return total
+        messages = defaultdict(list)
+        for message in db.execute(
+            delete(DialogMessage).where(DialogMessage.dialog_id.in_([dialog.id for dialog in dialogs])).returning(
+                DialogMessage.dialog_id, DialogMessage.id, DialogMessage.role, DialogMessage.text, DialogMessage.timestamp
+            ).execution_options(synchronize_session=False)
+        ):
+            messages[message.dialog_id].append(message)
+        for dialog_messages in messages.values():
+            dialog_messages.sort(key=lambda message: (message.timestamp or datetime.min, message.id))
+
+        locations = archive.append([(dialog.id, encode_dialog(dialog, messages[dialog.id])) for dialog in dialogs])
+        db.execute(insert(ArchivedDialog), [
+            {
+                "id": dialog.id,
+                "contact_id": dialog.contact_id,
+                "date": dialog.date,
+                "message_count": len(messages[dialog.id]),
+                "last_message_at": messages[dialog.id][-1].timestamp if messages[dialog.id] else None,
+                "segment": segment,
+                "segment_offset": offset,
+                "segment_length": length,
+                "archived_at": clock.now(),
+            }
+            for dialog, (segment, offset, length) in zip(dialogs, locations)
+        ])
+        db.commit()
+        total += len(dialogs)
@@ -1,10 +1,39 @@
 # app/crud/group.py
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.models.group import Group, GroupMember, ScheduledGroupCall
-from app.models.contact import Contact
-from app.schemas.group import GroupCreate, GroupUpdate, GroupMemberCreate, ScheduledGroupCallCreate, ScheduledGroupCallUpdate
-from datetime import datetime
+from sqlalchemy import case, delete, exists, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, undefer
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.models.group import Group, GroupMember, GroupRuleChange, ScheduledGroupCall
+from app.models.contact import Contact, ContactDialog, ArchivedDialog
+from app.schemas.group import (
+    GroupCreate, GroupUpdate, GroupMemberCreate, GroupRules, ScheduledGroupCallCreate, ScheduledGroupCallUpdate
+)
+from app.models.scheduled_call import ScheduledCall
+from app.crud.scheduled_call import ACTIVE_STATUSES, apply_call_attempt, refresh_next_eligible_at
+from app.crud.pagination import keyset
+from app.crud.tag import tagged_contact_ids
+from app.core.clock import clock
+from app.core.config import settings
+from app.services.retry_policy import OUTCOME_COMPLETED, OUTCOME_FAILED
+from app.services.pacing import pacing_planner, PacingPlan
+from app.services.bitmap import ContactBitmap
+from app.services.group_index import group_index, mark_group_changed
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import reduce
+import operator
+from types import SimpleNamespace
+
+MEMBERS_BATCH_SIZE = 10000  # id в одном IN: ниже лимита параметров SQLite (32766)
+
+GROUP_COUNTERS = ("member_count", "active_member_count", "scheduled_calls_count", "completed_calls_count")
+MEMBER_COUNTERS = ("member_count", "active_member_count")  # Их изменение поднимает members_version
+
+SET_UNION = "union"
+SET_INTERSECTION = "intersection"
+SET_DIFFERENCE = "difference"
+SET_OPERATIONS = (SET_UNION, SET_INTERSECTION, SET_DIFFERENCE)
 
 def get_group(db: Session, group_id: int, user_id: int) -> Optional[Group]:
     return db.query(Group).filter(
@@ -13,39 +42,101 @@ def get_group(db: Session, group_id: int, user_id: int) -> Optional[Group]:
         Group.is_active == True
     ).first()
 
-def get_groups(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Group]:
-    return db.query(Group).filter(
+def get_groups(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Group]:
+    query = db.query(Group).filter(
         Group.user_id == user_id,
         Group.is_active == True
-    ).offset(skip).limit(limit).all()
+    )
+    return keyset(query, (Group.id,), cursor).offset(skip).limit(limit).all()
+
+# Счётчики групп
+def bump_group_counters(db: Session, group_ids, **deltas: int):
+    """
+    Атомарно сдвигает счётчики групп (UPDATE ... SET n = n + delta) в текущей
+    транзакции; group_ids — список id или подзапрос. Коммит — на вызывающем.
+    Сдвиг счётчиков участников тем же UPDATE поднимает members_version.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    values = {name: func.coalesce(getattr(Group, name), 0) + delta for name, delta in deltas.items()}
+    if deltas.keys() & set(MEMBER_COUNTERS):
+        values["members_version"] = func.coalesce(Group.members_version, 0) + 1
+    db.execute(update(Group).where(Group.id.in_(group_ids)).values(values).execution_options(
+        synchronize_session=False
+    ))
+
+def _completed(status: Optional[str]) -> int:
+    return 1 if status == "completed" else 0
+
+def reconcile_group_counters(db: Session, user_id: Optional[int] = None, batch_size: int = 1000) -> int:
+    """
+    Пересчитывает счётчики по group_members и scheduled_group_calls и исправляет
+    расхождения. Группы идут пачками по id, запросы — по индексам group_id.
+    Возвращает число исправленных групп.
+    """
+    query = db.query(Group)
+    if user_id is not None:
+        query = query.filter(Group.user_id == user_id)
+    repaired, last_id = 0, 0
+    while True:
+        groups = query.filter(Group.id > last_id).order_by(Group.id).limit(batch_size).all()
+        if not groups:
+            return repaired
+        last_id = groups[-1].id
+        group_ids = [group.id for group in groups]
+        actual = {group_id: dict.fromkeys(GROUP_COUNTERS, 0) for group_id in group_ids}
+
+        for group_id, count in db.query(GroupMember.group_id, func.count()).filter(
+            GroupMember.group_id.in_(group_ids)
+        ).group_by(GroupMember.group_id):
+            actual[group_id]["member_count"] = count
+        for group_id, count in db.query(GroupMember.group_id, func.count()).join(
+            Contact, Contact.id == GroupMember.contact_id
+        ).filter(
+            GroupMember.group_id.in_(group_ids),
+            Contact.is_active == True
+        ).group_by(GroupMember.group_id):
+            actual[group_id]["active_member_count"] = count
+        for group_id, count, completed in db.query(
+            ScheduledGroupCall.group_id,
+            func.count(),
+            func.sum(case((ScheduledGroupCall.status == "completed", 1), else_=0))
+        ).filter(
+            ScheduledGroupCall.group_id.in_(group_ids)
+        ).group_by(ScheduledGroupCall.group_id):
+            actual[group_id]["scheduled_calls_count"] = count
+            actual[group_id]["completed_calls_count"] = completed or 0
+
+        for group in groups:
+            drift = {name: value for name, value in actual[group.id].items() if getattr(group, name) != value}
+            if drift:
+                for name, value in drift.items():
+                    setattr(group, name, value)
+                # Участники менялись мимо счётчиков — значит, и мимо версии: кэш битмапов сбрасываем
+                if drift.keys() & set(MEMBER_COUNTERS):
+                    group.members_version = (group.members_version or 0) + 1
+                repaired += 1
+        db.commit()
 
 def create_group(db: Session, group: GroupCreate, user_id: int) -> Group:
     db_group = Group(
         user_id=user_id,
         name=group.name,
-        description=group.description
+        description=group.description,
+        rules=group.rules.model_dump() if group.rules else None
     )
     db.add(db_group)
     db.commit()
     db.refresh(db_group)
     
-    # Добавляем участников если указаны
-    if group.contact_ids:
-        for contact_id in group.contact_ids:
-            # Проверяем, что контакт принадлежит пользователю
-            contact = db.query(Contact).filter(
-                Contact.id == contact_id,
-                Contact.user_id == user_id
-            ).first()
-            
-            if contact:
-                member = GroupMember(
-                    group_id=db_group.id,
-                    contact_id=contact_id
-                )
-                db.add(member)
-        
-        db.commit()
+    # Динамическая группа: состав считается по правилам
+    if db_group.rules is not None:
+        refresh_dynamic_group(db, db_group)
+        db.refresh(db_group)
+    # Добавляем участников если указаны (только контакты пользователя, одним запросом)
+    elif group.contact_ids:
+        add_group_members(db, db_group.id, group.contact_ids, user_id)
         db.refresh(db_group)
     
     return db_group
@@ -54,11 +145,19 @@ def update_group(db: Session, group_id: int, group_update: GroupUpdate, user_id:
     db_group = get_group(db, group_id, user_id)
     if db_group:
         update_data = group_update.dict(exclude_unset=True)
+        rules_changed = 'rules' in update_data and update_data['rules'] != db_group.rules
         for field, value in update_data.items():
             setattr(db_group, field, value)
         db_group.updated_at = datetime.utcnow()
+        if rules_changed:
+            db_group.rules_synced_at = None
         db.commit()
         db.refresh(db_group)
+
+        # Новые правила — пересчёт состава; снятые правила оставляют текущий состав как обычный список
+        if rules_changed and db_group.rules is not None:
+            refresh_dynamic_group(db, db_group)
+            db.refresh(db_group)
     return db_group
 
 def delete_group(db: Session, group_id: int, user_id: int) -> bool:
@@ -99,6 +198,7 @@ def add_group_member(db: Session, member: GroupMemberCreate, user_id: int) -> Op
         contact_id=member.contact_id
     )
     db.add(db_member)
+    bump_group_counters(db, [member.group_id], member_count=1, active_member_count=1 if contact.is_active else 0)
     db.commit()
     db.refresh(db_member)
     return db_member
@@ -115,11 +215,317 @@ def remove_group_member(db: Session, group_id: int, contact_id: int, user_id: in
     ).first()
     
     if db_member:
+        is_active = db.query(Contact.is_active).filter(Contact.id == contact_id).scalar()
         db.delete(db_member)
+        bump_group_counters(db, [group_id], member_count=-1, active_member_count=-1 if is_active else 0)
         db.commit()
         return True
     return False
 
+@dataclass
+class MembershipChange:
+    """Итог массовой операции над составом группы"""
+    added: int = 0
+    skipped: int = 0  # Чужие, удалённые или несуществующие контакты и уже состоящие в группе
+    removed: int = 0
+
+def _batches(ids: List[int]) -> Iterable[List[int]]:
+    for start in range(0, len(ids), MEMBERS_BATCH_SIZE):
+        yield ids[start:start + MEMBERS_BATCH_SIZE]
+
+def owned_contact_ids(db: Session, user_id: int, contact_ids: Iterable[int]) -> Set[int]:
+    """Какие из id — активные контакты пользователя (один IN на MEMBERS_BATCH_SIZE id)"""
+    owned = set()
+    for batch in _batches(list(set(contact_ids))):
+        owned.update(contact_id for (contact_id,) in db.query(Contact.id).filter(
+            Contact.id.in_(batch),
+            Contact.user_id == user_id,
+            Contact.is_active == True
+        ))
+    return owned
+
+def _insert_members(db: Session, group_id: int, contact_ids: Iterable[int]) -> int:
+    """INSERT ... ON CONFLICT DO NOTHING по уникальному (group_id, contact_id); сколько строк вставлено"""
+    rows = [{"group_id": group_id, "contact_id": contact_id} for contact_id in contact_ids]
+    if not rows:
+        return 0
+    mark_group_changed(db, [group_id])
+    conn = db.connection(bind_arguments={"clause": GroupMember.__table__.insert()})
+    dialect = postgresql if conn.dialect.name == "postgresql" else sqlite
+    members_insert = dialect.insert(GroupMember.__table__).on_conflict_do_nothing(
+        index_elements=["group_id", "contact_id"]
+    )
+    added = conn.execute(members_insert, rows).rowcount
+    # Вставляются только активные контакты (владение и правила проверяют их активность)
+    bump_group_counters(db, [group_id], member_count=added, active_member_count=added)
+    return added
+
+def _delete_members(db: Session, group_id: int, contact_ids: Iterable[int]) -> int:
+    mark_group_changed(db, [group_id])
+    removed = removed_active = 0
+    for batch in _batches(list(contact_ids)):
+        removed_active += db.query(func.count()).select_from(GroupMember).join(
+            Contact, Contact.id == GroupMember.contact_id
+        ).filter(
+            GroupMember.group_id == group_id,
+            GroupMember.contact_id.in_(batch),
+            Contact.is_active == True
+        ).scalar()
+        result = db.execute(delete(GroupMember).where(
+            GroupMember.group_id == group_id,
+            GroupMember.contact_id.in_(batch)
+        ).execution_options(synchronize_session=False))
+        removed += result.rowcount
+    bump_group_counters(db, [group_id], member_count=-removed, active_member_count=-removed_active)
+    return removed
+
+def add_group_members(db: Session, group_id: int, contact_ids: List[int], user_id: int) -> MembershipChange:
+    """
+    Добавляет в группу контакты пользователя из списка. Владение проверяется
+    одним IN-запросом, вставка — одним executemany, уже состоящие пропускаются
+    базой. Принадлежность группы пользователю проверяет вызывающий.
+    """
+    requested = set(contact_ids)
+    owned = owned_contact_ids(db, user_id, requested)
+    added = _insert_members(db, group_id, owned)
+    db.commit()
+    return MembershipChange(added=added, skipped=len(requested) - added)
+
+def remove_group_members(db: Session, group_id: int, contact_ids: List[int]) -> MembershipChange:
+    """Удаляет из группы контакты из списка одним DELETE ... IN; отсутствующие в группе пропускаются"""
+    requested = set(contact_ids)
+    removed = _delete_members(db, group_id, requested)
+    db.commit()
+    return MembershipChange(removed=removed, skipped=len(requested) - removed)
+
+def replace_group_members(db: Session, group_id: int, contact_ids: List[int], user_id: int) -> MembershipChange:
+    """
+    Делает состав группы равным списку (только контакты пользователя): удаляется
+    и вставляется лишь разница между текущим и желаемым составом, одной транзакцией.
+    """
+    requested = set(contact_ids)
+    desired = owned_contact_ids(db, user_id, requested)
+    current = {contact_id for (contact_id,) in db.query(GroupMember.contact_id).filter(
+        GroupMember.group_id == group_id
+    )}
+    removed = _delete_members(db, group_id, current - desired)
+    added = _insert_members(db, group_id, desired - current)
+    db.commit()
+    return MembershipChange(added=added, removed=removed, skipped=len(requested - desired))
+
+# Динамические группы: состав по правилам хранится в group_members
+def rule_conditions(db: Session, user_id: int, rules: dict, now: datetime) -> Optional[list]:
+    """Условия на Contact по правилам (GroupRules); None — под правила не попадает никто"""
+    rules = GroupRules(**rules)
+    conditions = [Contact.user_id == user_id, Contact.is_active == True]
+    if rules.tags:
+        tagged = tagged_contact_ids(db, user_id, rules.tags, rules.tag_match)
+        if tagged is None:
+            return None
+        conditions.append(Contact.id.in_(tagged))
+    if rules.company is not None:
+        conditions.append(Contact.company == rules.company)
+    if rules.timezone is not None:
+        conditions.append(Contact.timezone == rules.timezone)
+    if rules.no_dialog_days:
+        since = now - timedelta(days=rules.no_dialog_days)
+        conditions.append(~exists().where(ContactDialog.contact_id == Contact.id, ContactDialog.date >= since))
+        conditions.append(~exists().where(ArchivedDialog.contact_id == Contact.id, ArchivedDialog.date >= since))
+    return conditions
+
+def match_dynamic_group(
+    db: Session, group: Group, contact_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None
+) -> Set[int]:
+    """id контактов под правилами группы: среди всех контактов пользователя или только среди contact_ids"""
+    conditions = rule_conditions(db, group.user_id, group.rules, now or clock.now())
+    if conditions is None:
+        return set()
+    query = db.query(Contact.id).filter(*conditions)
+    if contact_ids is None:
+        return {contact_id for (contact_id,) in query}
+    matched = set()
+    for batch in _batches(list(contact_ids)):
+        matched.update(contact_id for (contact_id,) in query.filter(Contact.id.in_(batch)))
+    return matched
+
+def _apply_rules(db: Session, group: Group, contact_ids: Optional[Set[int]], now: datetime) -> MembershipChange:
+    """Приводит к правилам состав группы целиком (contact_ids=None) или только по указанным контактам"""
+    desired = match_dynamic_group(db, group, contact_ids, now)
+    query = db.query(GroupMember.contact_id).filter(GroupMember.group_id == group.id)
+    if contact_ids is None:
+        current = {contact_id for (contact_id,) in query}
+    else:
+        current = set()
+        for batch in _batches(list(contact_ids)):
+            current.update(contact_id for (contact_id,) in query.filter(GroupMember.contact_id.in_(batch)))
+    removed = _delete_members(db, group.id, current - desired)
+    added = _insert_members(db, group.id, desired - current)
+    group.rules_synced_at = now
+    return MembershipChange(added=added, removed=removed)
+
+def refresh_dynamic_group(db: Session, group: Group, now: Optional[datetime] = None) -> MembershipChange:
+    """Полный пересчёт состава динамической группы (создание, смена правил)"""
+    change = _apply_rules(db, group, None, now or clock.now())
+    db.commit()
+    return change
+
+def _drain_rule_changes(db: Session, user_id: int) -> Set[int]:
+    """Забирает из очереди контакты пользователя (и удалённые контакты) одним DELETE ... RETURNING"""
+    owned = select(GroupRuleChange.contact_id).outerjoin(
+        Contact, Contact.id == GroupRuleChange.contact_id
+    ).where(or_(Contact.user_id == user_id, Contact.id == None))
+    # Пустая очередь — обычный случай: проверяем её читателем, не занимая писателя
+    if db.execute(owned.limit(1)).first() is None:
+        return set()
+    drained = db.execute(
+        delete(GroupRuleChange).where(GroupRuleChange.contact_id.in_(owned)).returning(GroupRuleChange.contact_id)
+    ).scalars().all()
+    return set(drained)
+
+def _aged_out_contacts(db: Session, group: Group, no_dialog_days: int, now: datetime) -> Set[int]:
+    """Контакты, у которых с прошлой синхронизации диалог (в том числе архивный) вышел из окна no_dialog_days"""
+    window = timedelta(days=no_dialog_days)
+    aged_out = set()
+    for dialogs in (ContactDialog, ArchivedDialog):
+        aged_out.update(contact_id for (contact_id,) in db.query(dialogs.contact_id).join(
+            Contact, Contact.id == dialogs.contact_id
+        ).filter(
+            dialogs.date > group.rules_synced_at - window,
+            dialogs.date <= now - window,
+            Contact.user_id == group.user_id
+        ).distinct())
+    return aged_out
+
+def sync_dynamic_groups(db: Session, user_id: int, now: Optional[datetime] = None) -> MembershipChange:
+    """
+    Инкрементально приводит динамические группы пользователя к правилам. Проверяются
+    только контакты из очереди group_rule_changes (её наполняют триггеры) и контакты,
+    у которых с прошлой синхронизации истекло окно no_dialog_days. Без триггеров
+    (не SQLite) и для ещё не посчитанных групп — полный пересчёт.
+    """
+    now = now or clock.now()
+    groups = db.query(Group).filter(
+        Group.user_id == user_id,
+        Group.is_active == True,
+        Group.rules != None
+    ).all()
+    changed = _drain_rule_changes(db, user_id)
+    incremental = db.get_bind().dialect.name == "sqlite"
+
+    total = MembershipChange()
+    for group in groups:
+        if not incremental or group.rules_synced_at is None:
+            change = _apply_rules(db, group, None, now)
+        else:
+            candidates = set(changed)
+            no_dialog_days = group.rules.get("no_dialog_days")
+            if no_dialog_days:
+                candidates |= _aged_out_contacts(db, group, no_dialog_days, now)
+            if not candidates:
+                continue
+            change = _apply_rules(db, group, candidates, now)
+        total.added += change.added
+        total.removed += change.removed
+    db.commit()
+    return total
+
+# Операции над множествами участников: битмапы из group_index вместо строк GroupMember
+def get_group_bitmaps(db: Session, user_id: int, group_ids: List[int]) -> Dict[int, ContactBitmap]:
+    """
+    Битмапы активных участников активных групп пользователя из group_ids; чужих и
+    удалённых групп в ответе нет. Версии читаются до загрузки участников, так что
+    закэшированный битмап не старше своей версии.
+    """
+    def active_groups():
+        return db.query(Group.id, Group.rules != None, Group.members_version).filter(
+            Group.id.in_(set(group_ids)),
+            Group.user_id == user_id,
+            Group.is_active == True
+        ).all()
+
+    groups = active_groups()
+    if any(dynamic for _, dynamic, _ in groups):
+        sync_dynamic_groups(db, user_id)
+        groups = active_groups()  # Синхронизация могла поменять состав и версии
+
+    def load(missing: List[int]) -> Dict[int, List[int]]:
+        members = defaultdict(list)
+        rows = db.query(GroupMember.group_id, GroupMember.contact_id).join(
+            Contact, Contact.id == GroupMember.contact_id
+        ).filter(
+            GroupMember.group_id.in_(missing),
+            Contact.is_active == True
+        ).order_by(GroupMember.group_id, GroupMember.contact_id)
+        for group_id, contact_id in rows:
+            members[group_id].append(contact_id)
+        return members
+
+    return group_index.get({group_id: version or 0 for group_id, _, version in groups}, load)
+
+def combine_groups(db: Session, user_id: int, operation: str, group_ids: List[int]) -> Optional[ContactBitmap]:
+    """
+    Объединение, пересечение или разность (первая группа минус остальные) участников групп.
+    None — если какой-то группы у пользователя нет.
+    """
+    if operation not in SET_OPERATIONS:
+        raise ValueError(f"Unsupported set operation: {operation}")
+    bitmaps = get_group_bitmaps(db, user_id, group_ids)
+    if set(bitmaps) != set(group_ids):
+        return None
+    ordered = [bitmaps[group_id] for group_id in group_ids]
+    if operation == SET_UNION:
+        return ContactBitmap.union_all(ordered)
+    if operation == SET_INTERSECTION:
+        return reduce(operator.and_, ordered)
+    return ordered[0] - ContactBitmap.union_all(ordered[1:])
+
+def get_contacts_by_ids(db: Session, user_id: int, contact_ids: Iterable[int]) -> List[Contact]:
+    """Активные контакты пользователя по id, пачками по MEMBERS_BATCH_SIZE"""
+    contacts = []
+    for batch in _batches(list(contact_ids)):
+        contacts.extend(db.query(Contact).filter(
+            Contact.id.in_(batch),
+            Contact.user_id == user_id,
+            Contact.is_active == True
+        ).order_by(Contact.id))
+    return contacts
+
+def get_group_call_contacts(db: Session, db_call: ScheduledGroupCall, user_id: int) -> List[Contact]:
+    """Кого обзванивает групповой звонок: участники группы минус участники exclude_group_ids"""
+    excluded = list(db_call.exclude_group_ids or [])
+    bitmaps = get_group_bitmaps(db, user_id, [db_call.group_id, *excluded])
+    targets = bitmaps.get(db_call.group_id, ContactBitmap())
+    if excluded:
+        targets = targets - ContactBitmap.union_all(bitmaps[group_id] for group_id in excluded if group_id in bitmaps)
+    return get_contacts_by_ids(db, user_id, targets)
+
+# Цели массового планирования звонков: (id контакта, часовой пояс)
+def get_group_call_targets(db: Session, user_id: int, group_id: int) -> Optional[List[Tuple[int, Optional[str]]]]:
+    """Активные контакты группы одним запросом; None — группы у пользователя нет"""
+    group = get_group(db, group_id, user_id)
+    if not group:
+        return None
+    if group.rules is not None:
+        sync_dynamic_groups(db, user_id)
+    return db.query(Contact.id, Contact.timezone).join(
+        GroupMember, GroupMember.contact_id == Contact.id
+    ).filter(
+        GroupMember.group_id == group_id,
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    ).all()
+
+def count_group_members(db: Session, group_id: int) -> int:
+    """Все участники группы, включая удалённые контакты; принадлежность группы проверяет вызывающий"""
+    return db.query(func.count()).select_from(GroupMember).filter(GroupMember.group_id == group_id).scalar()
+
+def get_rule_call_targets(db: Session, user_id: int, rules: dict) -> List[Tuple[int, Optional[str]]]:
+    """Активные контакты пользователя под правилами фильтра (те же правила, что у динамических групп)"""
+    conditions = rule_conditions(db, user_id, rules, clock.now())
+    if conditions is None:
+        return []
+    return db.query(Contact.id, Contact.timezone).filter(*conditions).all()
+
 def get_group_members(db: Session, group_id: int, user_id: int) -> List[GroupMember]:
     group = get_group(db, group_id, user_id)
     if not group:
@@ -143,6 +549,38 @@ def get_group_contacts(db: Session, group_id: int, user_id: int) -> List[Contact
     
     return member_contacts
 
+def load_group_details(db: Session, group_ids: List[int], user_id: int) -> Dict[int, SimpleNamespace]:
+    """
+    Участники и активные контакты для набора групп (счётчики — в колонках Group).
+    Два запроса на любое число групп (IN по group_id) вместо запроса на каждого участника.
+    """
+    details = {
+        group_id: SimpleNamespace(members=[], contacts=[])
+        for group_id in group_ids
+    }
+    if not group_ids:
+        return details
+
+    members = db.query(GroupMember).filter(
+        GroupMember.group_id.in_(group_ids)
+    ).order_by(GroupMember.group_id, GroupMember.id).all()
+    for member in members:
+        details[member.group_id].members.append(member)
+
+    rows = db.query(GroupMember.group_id, Contact).options(
+        undefer(Contact.script)
+    ).join(
+        Contact, Contact.id == GroupMember.contact_id
+    ).filter(
+        GroupMember.group_id.in_(group_ids),
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    ).order_by(GroupMember.group_id, GroupMember.id).all()
+    for group_id, contact in rows:
+        details[group_id].contacts.append(contact)
+
+    return details
+
 # Scheduled Group Calls CRUD
 def get_scheduled_group_call(db: Session, call_id: int, user_id: int) -> Optional[ScheduledGroupCall]:
     return db.query(ScheduledGroupCall).filter(
@@ -150,10 +588,17 @@ def get_scheduled_group_call(db: Session, call_id: int, user_id: int) -> Optiona
         ScheduledGroupCall.user_id == user_id
     ).first()
 
-def get_scheduled_group_calls(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[ScheduledGroupCall]:
-    return db.query(ScheduledGroupCall).filter(
+def get_scheduled_group_calls(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> List[ScheduledGroupCall]:
+    query = db.query(ScheduledGroupCall).filter(
         ScheduledGroupCall.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    )
+    return keyset(query, (ScheduledGroupCall.id,), cursor).offset(skip).limit(limit).all()
 
 def create_scheduled_group_call(db: Session, call: ScheduledGroupCallCreate, user_id: int) -> ScheduledGroupCall:
     db_call = ScheduledGroupCall(
@@ -164,9 +609,11 @@ def create_scheduled_group_call(db: Session, call: ScheduledGroupCallCreate, use
         script=call.script,
         notes=call.notes,
         retry_until_success=call.retry_until_success or False,
-        retry_interval=call.retry_interval or 60
+        retry_interval=call.retry_interval or settings.RETRY_DEFAULT_INTERVAL,
+        exclude_group_ids=call.exclude_group_ids or None
     )
     db.add(db_call)
+    bump_group_counters(db, [call.group_id], scheduled_calls_count=1)
     db.commit()
     db.refresh(db_call)
     return db_call
@@ -180,9 +627,11 @@ def update_scheduled_group_call(
     db_call = get_scheduled_group_call(db, call_id, user_id)
     if db_call:
         update_data = call_update.dict(exclude_unset=True)
+        was_completed = _completed(db_call.status)
         for field, value in update_data.items():
             setattr(db_call, field, value)
         db_call.updated_at = datetime.utcnow()
+        bump_group_counters(db, [db_call.group_id], completed_calls_count=_completed(db_call.status) - was_completed)
         db.commit()
         db.refresh(db_call)
     return db_call
@@ -190,6 +639,9 @@ def update_scheduled_group_call(
 def delete_scheduled_group_call(db: Session, call_id: int, user_id: int) -> bool:
     db_call = get_scheduled_group_call(db, call_id, user_id)
     if db_call:
+        bump_group_counters(
+            db, [db_call.group_id], scheduled_calls_count=-1, completed_calls_count=-_completed(db_call.status)
+        )
         db.delete(db_call)
         db.commit()
         return True
@@ -205,3 +657,117 @@ def get_group_scheduled_calls(db: Session, group_id: int, user_id: int) -> List[
         ScheduledGroupCall.group_id == group_id,
         ScheduledGroupCall.user_id == user_id
     ).all()
+
+def mark_group_call_as_attempted(
+    db: Session,
+    call_id: int,
+    success: bool = False,
+    outcome: Optional[str] = None,
+    now: Optional[datetime] = None
+) -> Optional[ScheduledGroupCall]:
+    """Помечает групповой звонок как попытанный; интервал повтора берётся из retry_interval"""
+    db_call = db.query(ScheduledGroupCall).filter(ScheduledGroupCall.id == call_id).first()
+    if db_call:
+        was_completed = _completed(db_call.status)
+        db_call.call_attempts = (db_call.call_attempts or 0) + 1
+        apply_call_attempt(db_call, OUTCOME_COMPLETED if success else (outcome or OUTCOME_FAILED), now=now)
+        bump_group_counters(db, [db_call.group_id], completed_calls_count=_completed(db_call.status) - was_completed)
+        db.commit()
+        db.refresh(db_call)
+    return db_call
+
+# Пейсинг групповых звонков
+STATUS_UNPLACED = "unplaced"  # Не поместился в окно; следующее планирование попробует снова
+BOOKED_STATUSES = ACTIVE_STATUSES + ("dialing",)  # Занимают дозвонщик: ждут набора, повтора или уже идут
+
+class NoTimeWindow(ValueError):
+    """У группового звонка не задано временное окно — раскладывать не по чему"""
+
+def get_booked_call_times(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    exclude_group_call_id: Optional[int] = None
+) -> List[datetime]:
+    """Время уже запланированных звонков в окне (все кампании делят один дозвонщик)"""
+    query = db.query(ScheduledCall.scheduled_time).filter(
+        ScheduledCall.status.in_(BOOKED_STATUSES),
+        ScheduledCall.scheduled_time >= start - timedelta(seconds=pacing_planner.call_duration),
+        ScheduledCall.scheduled_time < end
+    )
+    if exclude_group_call_id is not None:
+        query = query.filter(
+            (ScheduledCall.group_call_id == None) | (ScheduledCall.group_call_id != exclude_group_call_id)
+        )
+    return [row[0] for row in query.all()]
+
+def plan_group_call(db: Session, call_id: int, user_id: int, now: Optional[datetime] = None) -> Optional[PacingPlan]:
+    """
+    Раскладывает звонки участников группы по временному окну группового звонка.
+    Повторный вызов перепланирует только ещё не начатые звонки: завершённые раньше
+    или неудачные звонки освобождают ёмкость для оставшихся.
+    None — звонка нет; NoTimeWindow — у звонка нет окна.
+    """
+    db_call = get_scheduled_group_call(db, call_id, user_id)
+    if not db_call:
+        return None
+    if not db_call.start_time_window or not db_call.end_time_window:
+        raise NoTimeWindow("Scheduled group call has no time window")
+
+    now = now or clock.now()
+    start = max(now, db_call.start_time_window)
+
+    existing = {
+        call.contact_id: call
+        for call in db.query(ScheduledCall).filter(ScheduledCall.group_call_id == db_call.id).all()
+    }
+
+    # Планируем новых участников и ещё не начатые звонки (состав — из битмапов групп)
+    to_plan = []
+    contacts = get_group_call_contacts(db, db_call, user_id)
+    for contact in contacts:
+        call = existing.get(contact.id)
+        if call is None or call.status == STATUS_UNPLACED or (
+            call.status == "pending" and (call.scheduled_time is None or call.scheduled_time > now)
+        ):
+            to_plan.append(contact.id)
+    to_plan.sort()
+
+    booked = get_booked_call_times(db, start, db_call.end_time_window, exclude_group_call_id=db_call.id)
+    plan = pacing_planner.plan(to_plan, start, db_call.end_time_window, booked)
+
+    timezones = {contact.id: contact.timezone for contact in contacts}
+    for contact_id, planned_at in plan.slots:
+        call = existing.get(contact_id)
+        if call is None:
+            call = ScheduledCall(
+                user_id=user_id,
+                contact_id=contact_id,
+                group_call_id=db_call.id,
+                scheduled_time=planned_at,
+                start_time_window=db_call.start_time_window,
+                end_time_window=db_call.end_time_window,
+                retry_until_success=db_call.retry_until_success or False,
+                retry_interval=db_call.retry_interval or settings.RETRY_DEFAULT_INTERVAL,
+                script=db_call.script,
+                notes=db_call.notes,
+                status="pending",
+                call_attempts=0
+            )
+            db.add(call)
+        else:
+            call.scheduled_time = planned_at
+            call.status = "pending"
+        refresh_next_eligible_at(call, timezones.get(contact_id))
+
+    # Не поместившиеся в окно звонки снимаем с расписания: статус вне ACTIVE_STATUSES,
+    # иначе recompute_eligibility вернул бы их в очередь к началу окна
+    for contact_id in plan.unplaced:
+        call = existing.get(contact_id)
+        if call is not None:
+            call.status = STATUS_UNPLACED
+            call.scheduled_time = None
+            call.next_eligible_at = None
+
+    db.commit()
+    return plan
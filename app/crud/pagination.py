@@ -0,0 +1,66 @@
+# app/crud/pagination.py
+"""
+Keyset-пагинация по непрозрачному курсору.
+
+Курсор — base64 от значений ключа сортировки последней строки страницы,
+например (id) или (date, id). Следующая страница начинается с условия
+(date, id) > (:date, :id) по индексу, поэтому страница 5000 стоит столько же,
+сколько первая, в отличие от offset.
+"""
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+import base64
+import json
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """Разбирает курсор и приводит значения к типам колонок ключа"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("Invalid cursor")
+
+    decoded = []
+    for column, value in zip(columns, values):
+        if value is not None and column.type.python_type is datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise InvalidCursor("Invalid cursor")
+        decoded.append(value)
+    return decoded
+
+
+def keyset(query: Query, columns: Sequence, cursor: Optional[str], descending: bool = False) -> Query:
+    """Сортирует запрос по ключу и, если передан курсор, продолжает после него"""
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    return query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+
+def next_cursor(items: List[Any], limit: Optional[int], *attrs: str) -> Optional[str]:
+    """Курсор на следующую страницу; None, если страница неполная (дальше ничего нет)"""
+    if not items or limit is None or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, attr) for attr in attrs])
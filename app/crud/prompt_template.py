@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models.prompt_template import PromptTemplate
 from app.schemas.prompt_template import PromptTemplateCreate, PromptTemplateUpdate
+from app.crud.pagination import keyset
 
 def get_prompt_template(db: Session, template_id: int, user_id: int) -> Optional[PromptTemplate]:
     return db.query(PromptTemplate).filter(
@@ -10,11 +11,18 @@ def get_prompt_template(db: Session, template_id: int, user_id: int) -> Optional
         PromptTemplate.is_active == True
     ).first()
 
-def get_prompt_templates(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[PromptTemplate]:
-    return db.query(PromptTemplate).filter(
+def get_prompt_templates(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> List[PromptTemplate]:
+    query = db.query(PromptTemplate).filter(
         PromptTemplate.user_id == user_id,
         PromptTemplate.is_active == True
-    ).offset(skip).limit(limit).all()
+    )
+    return keyset(query, (PromptTemplate.id,), cursor).offset(skip).limit(limit).all()
 
 def create_prompt_template(
     db: Session, 
@@ -1,10 +1,35 @@
 # app/crud/scheduled_call.py
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from app.models.scheduled_call import ScheduledCall
 from app.models.contact import Contact
-from app.schemas.scheduled_call import ScheduledCallCreate, ScheduledCallUpdate
-from datetime import datetime
+from app.models.app_state import AppState
+from app.schemas.scheduled_call import ScheduledCallBulkCreate, ScheduledCallCreate, ScheduledCallUpdate
+from app.core.clock import clock
+from app.core.config import settings
+from app.services.retry_policy import retry_policy, OUTCOME_COMPLETED, OUTCOME_FAILED
+from app.services.dispatch_queue import DispatchQueue, call_ready_at
+from app.services.eligibility import calling_hours, CallingHours
+from app.crud.pagination import keyset
+from sqlalchemy import String, bindparam, or_, and_, func, case, insert, update
+from sqlalchemy.sql.elements import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import time
+
+# Статусы звонков, которые ещё ждут набора
+ACTIVE_STATUSES = ("pending", "retrying")
+# В окне звонка не осталось разрешённых часов контакта
+STATUS_EXPIRED = "expired"
+# Ключ app_state с отпечатком правил, по которым рассчитаны next_eligible_at
+CALLING_HOURS_STATE_KEY = "calling_hours"
+
+BULK_BATCH_SIZE = 10000  # id в одном IN и строк в одном executemany
+
+class ContactNotFound(ValueError):
+    """Контакта нет или он принадлежит другому пользователю"""
 
 def get_scheduled_call(db: Session, call_id: int, user_id: int) -> Optional[ScheduledCall]:
     return db.query(ScheduledCall).filter(
@@ -12,13 +37,14 @@ def get_scheduled_call(db: Session, call_id: int, user_id: int) -> Optional[Sche
         ScheduledCall.user_id == user_id
     ).first()
 
-def get_scheduled_calls(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[ScheduledCall]:
-    return db.query(ScheduledCall).filter(
+def get_scheduled_calls(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[ScheduledCall]:
+    query = db.query(ScheduledCall).filter(
         ScheduledCall.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    )
+    return keyset(query, (ScheduledCall.id,), cursor).offset(skip).limit(limit).all()
 
 def get_upcoming_calls(db: Session, user_id: int, limit: int = 10) -> List[ScheduledCall]:
-    now = datetime.utcnow()
+    now = clock.now()
     return db.query(ScheduledCall).filter(
         ScheduledCall.user_id == user_id,
         ScheduledCall.status == "pending",
@@ -27,6 +53,45 @@ def get_upcoming_calls(db: Session, user_id: int, limit: int = 10) -> List[Sched
         ScheduledCall.scheduled_time.asc() if ScheduledCall.scheduled_time else ScheduledCall.start_time_window.asc()
     ).limit(limit).all()
 
+# Проекция для ScheduledCallResponse: все поля звонка и данные контакта одним LEFT JOIN.
+# Строки результата валидируются в ScheduledCallResponse напрямую (from_attributes)
+CALL_RESPONSE_COLUMNS = (
+    *ScheduledCall.__table__.columns,
+    func.coalesce(Contact.name, "Unknown").label("contact_name"),
+    func.coalesce(Contact.phone, "").label("contact_phone"),
+    case((Contact.id == None, ""), else_=Contact.company).label("contact_company"),
+)
+
+def call_response_query(db: Session):
+    return db.query(*CALL_RESPONSE_COLUMNS).outerjoin(
+        Contact, Contact.id == ScheduledCall.contact_id
+    )
+
+def get_scheduled_call_response(db: Session, call_id: int, user_id: int):
+    return call_response_query(db).filter(
+        ScheduledCall.id == call_id,
+        ScheduledCall.user_id == user_id
+    ).first()
+
+def get_scheduled_call_responses(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> list:
+    query = call_response_query(db).filter(
+        ScheduledCall.user_id == user_id
+    )
+    return keyset(query, (ScheduledCall.id,), cursor).offset(skip).limit(limit).all()
+
+def get_upcoming_call_responses(db: Session, user_id: int, limit: int = 10) -> list:
+    return call_response_query(db).filter(
+        ScheduledCall.user_id == user_id,
+        ScheduledCall.status == "pending",
+        ScheduledCall.scheduled_time > clock.now()
+    ).order_by(ScheduledCall.scheduled_time.asc()).limit(limit).all()
+
+def get_contact_call_responses(db: Session, contact_id: int, user_id: int) -> list:
+    return call_response_query(db).filter(
+        ScheduledCall.contact_id == contact_id,
+        ScheduledCall.user_id == user_id
+    ).order_by(ScheduledCall.id).all()
+
 def create_scheduled_call(db: Session, call: ScheduledCallCreate, user_id: int) -> ScheduledCall:
     # Получаем контакт для проверки
     contact = db.query(Contact).filter(
@@ -35,7 +100,7 @@ def create_scheduled_call(db: Session, call: ScheduledCallCreate, user_id: int)
     ).first()
     
     if not contact:
-        raise ValueError("Contact not found")
+        raise ContactNotFound("Contact not found")
     
     # Создаем звонок
     db_call = ScheduledCall(
@@ -45,16 +110,111 @@ def create_scheduled_call(db: Session, call: ScheduledCallCreate, user_id: int)
         start_time_window=call.start_time_window,
         end_time_window=call.end_time_window,
         retry_until_success=call.retry_until_success or False,
+        retry_interval=call.retry_interval or settings.RETRY_DEFAULT_INTERVAL,
+        priority=call.priority or 0,
         script=call.script,
         notes=call.notes,
         status="pending",
         call_attempts=0
     )
+    refresh_next_eligible_at(db_call, contact.timezone)
     db.add(db_call)
     db.commit()
     db.refresh(db_call)
     return db_call
 
+@dataclass
+class BulkScheduleResult:
+    requested: int = 0
+    scheduled: int = 0
+    not_found: int = 0
+    already_scheduled: int = 0
+    expired: int = 0
+    seconds: float = 0.0
+
+def _batches(ids: List[int], size: int = BULK_BATCH_SIZE) -> Iterable[List[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def get_call_targets(db: Session, user_id: int, contact_ids: Iterable[int]) -> List[Tuple[int, Optional[str]]]:
+    """(id, часовой пояс) активных контактов пользователя из списка: один IN на BULK_BATCH_SIZE id"""
+    targets = []
+    for batch in _batches(list(set(contact_ids))):
+        targets.extend(db.query(Contact.id, Contact.timezone).filter(
+            Contact.id.in_(batch),
+            Contact.user_id == user_id,
+            Contact.is_active == True
+        ).all())
+    return targets
+
+def get_contacts_with_active_calls(db: Session, contact_ids: List[int]) -> set:
+    """Какие из контактов уже ждут звонка (pending или retrying)"""
+    busy = set()
+    for batch in _batches(contact_ids):
+        busy.update(contact_id for (contact_id,) in db.query(ScheduledCall.contact_id).filter(
+            ScheduledCall.contact_id.in_(batch),
+            ScheduledCall.status.in_(ACTIVE_STATUSES)
+        ).distinct())
+    return busy
+
+def create_scheduled_calls(
+    db: Session,
+    user_id: int,
+    targets: List[Tuple[int, Optional[str]]],
+    call: ScheduledCallBulkCreate,
+    requested: Optional[int] = None
+) -> BulkScheduleResult:
+    """
+    Планирует одинаковый звонок всем целям (id контакта, часовой пояс) — см. get_call_targets
+    и get_group_call_targets. Строки вставляются Core-executemany пачками по BULK_BATCH_SIZE
+    в одной транзакции: либо запланированы все, либо ни один. Звонки, которым в окне
+    не осталось разрешённых часов, сохраняются со статусом expired и считаются отдельно.
+    """
+    started = time.perf_counter()
+    result = BulkScheduleResult(requested=len(targets) if requested is None else requested)
+    result.not_found = result.requested - len(targets)
+    if call.skip_scheduled and targets:
+        busy = get_contacts_with_active_calls(db, [contact_id for contact_id, _ in targets])
+        result.already_scheduled = len(busy)
+        targets = [target for target in targets if target[0] not in busy]
+
+    shared = {
+        "user_id": user_id,
+        "scheduled_time": call.scheduled_time,
+        "start_time_window": call.start_time_window,
+        "end_time_window": call.end_time_window,
+        "retry_until_success": call.retry_until_success or False,
+        "retry_interval": call.retry_interval or settings.RETRY_DEFAULT_INTERVAL,
+        "priority": call.priority or 0,
+        "script": call.script,
+        "notes": call.notes,
+        "status": "pending",
+        "call_attempts": 0,
+    }
+    # Время готовности у всех звонков одно, поэтому время набора зависит только от часового пояса
+    template = SimpleNamespace(**shared, next_retry_at=None)
+    eligible_at = {}
+    rows = []
+    for contact_id, tz_name in targets:
+        if tz_name not in eligible_at:
+            eligible_at[tz_name] = vars(refresh_next_eligible_at(SimpleNamespace(**vars(template)), tz_name))
+        call_values = eligible_at[tz_name]
+        rows.append({
+            **shared, "contact_id": contact_id,
+            "status": call_values["status"], "next_eligible_at": call_values["next_eligible_at"]
+        })
+
+    if rows:
+        calls_insert = insert(ScheduledCall.__table__)
+        conn = db.connection(bind_arguments={"clause": calls_insert})
+        for start in range(0, len(rows), BULK_BATCH_SIZE):
+            conn.execute(calls_insert, rows[start:start + BULK_BATCH_SIZE])
+        db.commit()
+    result.expired = sum(row["status"] == STATUS_EXPIRED for row in rows)
+    result.scheduled = len(rows) - result.expired
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
 def update_scheduled_call(
     db: Session, 
     call_id: int, 
@@ -66,6 +226,7 @@ def update_scheduled_call(
         update_data = call_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_call, field, value)
+        refresh_next_eligible_at(db_call, get_contact_timezone(db, db_call.contact_id))
         db_call.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(db_call)
@@ -79,35 +240,263 @@ def delete_scheduled_call(db: Session, call_id: int, user_id: int) -> bool:
         return True
     return False
 
-def mark_call_as_attempted(db: Session, call_id: int, success: bool = False) -> Optional[ScheduledCall]:
+def apply_call_attempt(db_call, outcome: str, now: Optional[datetime] = None):
+    """Обновляет статистику звонка (личного или группового) по исходу попытки"""
+    now = now or clock.now()
+    decision = retry_policy.decide(db_call, outcome, now=now)
+
+    db_call.last_attempt_at = now
+    db_call.last_outcome = outcome
+    db_call.status = decision.status
+    db_call.next_retry_at = decision.next_retry_at
+    return db_call
+
+def mark_call_as_attempted(
+    db: Session,
+    call_id: int,
+    success: bool = False,
+    outcome: Optional[str] = None,
+    now: Optional[datetime] = None
+) -> Optional[ScheduledCall]:
     """Помечает звонок как попытанный и обновляет статистику"""
-    db_call = db.query(ScheduledCall).filter(ScheduledCall.id == call_id).first()
+    # Звонок и часовой пояс контакта одним запросом
+    row = db.query(ScheduledCall, Contact.timezone).outerjoin(
+        Contact, Contact.id == ScheduledCall.contact_id
+    ).filter(ScheduledCall.id == call_id).first()
+    db_call = row[0] if row else None
     if db_call:
-        db_call.call_attempts += 1
-        db_call.last_attempt_at = datetime.utcnow()
-        
-        if success:
-            db_call.status = "completed"
-            db_call.next_retry_at = None
-        else:
-            db_call.status = "failed"
-            # Если нужно повторять, устанавливаем время следующей попытки
-            if db_call.retry_until_success:
-                from datetime import timedelta
-                db_call.next_retry_at = datetime.utcnow() + timedelta(hours=1)  # Повтор через 1 час
-                db_call.status = "retrying"
-            else:
-                db_call.next_retry_at = None
-        
+        db_call.call_attempts = (db_call.call_attempts or 0) + 1
+        # Время следующей попытки считается политикой повторов (retry_interval, исход, окно)
+        apply_call_attempt(db_call, OUTCOME_COMPLETED if success else (outcome or OUTCOME_FAILED), now=now)
+        refresh_next_eligible_at(db_call, row[1])
+
         db.commit()
         db.refresh(db_call)
     return db_call
 
-def get_calls_for_retry(db: Session, limit: int = 10) -> List[ScheduledCall]:
-    """Получает звонки, которые нужно повторить"""
-    now = datetime.utcnow()
+# Поля звонка, которые нужны политике повторов и расчёту next_eligible_at
+ATTEMPT_FIELDS = (
+    "id", "status", "call_attempts", "retry_until_success", "retry_interval",
+    "scheduled_time", "start_time_window", "end_time_window", "last_attempt_at", "next_retry_at"
+)
+
+ATTEMPT_UPDATE = update(ScheduledCall.__table__).where(ScheduledCall.__table__.c.id == bindparam("call_id"))
+
+def mark_calls_as_attempted(db: Session, outcomes: Dict[int, str], now: Optional[datetime] = None) -> List[SimpleNamespace]:
+    """
+    Пакетная версия mark_call_as_attempted для исходов {id звонка: исход}.
+    Читает только нужные колонки и пишет одним executemany, без ORM-объектов.
+    Возвращает обновлённые значения полей звонков.
+    """
+    if not outcomes:
+        return []
+    columns = [getattr(ScheduledCall, name) for name in ATTEMPT_FIELDS]
+    rows = db.query(*columns, Contact.timezone).outerjoin(
+        Contact, Contact.id == ScheduledCall.contact_id
+    ).filter(ScheduledCall.id.in_(list(outcomes))).all()
+
+    calls = []
+    mappings = []
+    for row in rows:
+        call = SimpleNamespace(**{name: row[i] for i, name in enumerate(ATTEMPT_FIELDS)})
+        call.call_attempts = (call.call_attempts or 0) + 1
+        apply_call_attempt(call, outcomes[call.id], now=now)
+        refresh_next_eligible_at(call, row[-1])
+        calls.append(call)
+        mappings.append({
+            "call_id": call.id,
+            "call_attempts": call.call_attempts,
+            "last_attempt_at": call.last_attempt_at,
+            "last_outcome": call.last_outcome,
+            "status": call.status,
+            "next_retry_at": call.next_retry_at,
+            "next_eligible_at": call.next_eligible_at,
+            "updated_at": call.last_attempt_at,
+        })
+
+    if mappings:
+        # Core-executemany: ORM bulk_update_mappings тратит на разбор каждой строки больше, чем сам UPDATE
+        conn = db.connection(bind_arguments={"clause": ATTEMPT_UPDATE})
+        conn.execute(ATTEMPT_UPDATE, mappings)
+    db.commit()
+    return calls
+
+def get_calls_for_retry(db: Session, limit: int = 10, now: Optional[datetime] = None) -> List[ScheduledCall]:
+    """Получает звонки, которые нужно повторить (по индексу status + next_retry_at)"""
+    now = now or clock.now()
     return db.query(ScheduledCall).filter(
         ScheduledCall.status == "retrying",
         ScheduledCall.next_retry_at <= now,
-        ScheduledCall.call_attempts < 10  # Максимум 10 попыток
-    ).limit(limit).all()
\ No newline at end of file
+        ScheduledCall.call_attempts < retry_policy.max_attempts
+    ).order_by(ScheduledCall.next_retry_at.asc()).limit(limit).all()
+
+
+def get_ready_calls(db: Session, now: Optional[datetime] = None, user_id: Optional[int] = None, limit: int = 1000) -> List[ScheduledCall]:
+    """
+    Звонки, которые уже можно набирать. Время готовности и разрешённые часы контакта
+    заранее сведены в next_eligible_at, поэтому выборка — диапазон по индексу.
+    """
+    now = now or clock.now()
+    query = db.query(ScheduledCall).filter(
+        ScheduledCall.status.in_(ACTIVE_STATUSES),
+        ScheduledCall.next_eligible_at <= now
+    )
+    if user_id is not None:
+        query = query.filter(ScheduledCall.user_id == user_id)
+    # populate_existing: пакетные UPDATE не обновляют объекты в сессии, а диспетчер держит её долго.
+    # При перегрузке в выборку должны попасть звонки с самым ранним сроком
+    return query.populate_existing().order_by(
+        func.coalesce(ScheduledCall.end_time_window, ScheduledCall.scheduled_time, ScheduledCall.next_retry_at).asc()
+    ).limit(limit).all()
+
+# status с унарным плюсом: SQLite не берёт для условия индекс (status, ...) и ищет строки
+# по первичному ключу, а не просматривает все ожидающие звонки
+UNINDEXED_STATUS = UnaryExpression(ScheduledCall.status, operator=custom_op("+"), type_=String)
+
+# Собран один раз: диспетчер вызывает его на каждом тике, а сборка выражения дороже самого UPDATE
+DISPATCH_UPDATE = update(ScheduledCall).where(
+    ScheduledCall.id.in_(bindparam("call_ids", expanding=True)),
+    UNINDEXED_STATUS.in_(ACTIVE_STATUSES)
+).values(
+    status="dialing", next_eligible_at=None, updated_at=bindparam("now")
+).returning(ScheduledCall.id)
+
+def mark_calls_as_dispatched(db: Session, call_ids: List[int], now: Optional[datetime] = None) -> List[int]:
+    """
+    Переводит ожидающие звонки в статус dialing, чтобы диспетчер не выбрал их повторно.
+    Звонки, которые тем временем сменили статус (отменены, уже набираются), не трогаются.
+    Возвращает id переведённых звонков (UPDATE ... RETURNING).
+    """
+    if not call_ids:
+        return []
+    now = now or clock.now()
+    conn = db.connection(bind_arguments={"clause": DISPATCH_UPDATE})
+    dispatched = []
+    for batch in _batches(list(call_ids)):
+        dispatched.extend(conn.execute(DISPATCH_UPDATE, {"call_ids": batch, "now": now}).scalars())
+    db.commit()
+    return dispatched
+
+def release_stuck_calls(db: Session, now: Optional[datetime] = None, timeout_minutes: int = None) -> List[SimpleNamespace]:
+    """
+    Звонки, которые дольше timeout_minutes висят в статусе dialing (процесс упал, статус
+    от Twilio не пришёл), считаются неудачной попыткой: политика повторов решает,
+    вернуть их в очередь или завершить.
+    """
+    now = now or clock.now()
+    timeout = timedelta(minutes=timeout_minutes or settings.DIALING_TIMEOUT)
+    stuck_ids = [call_id for (call_id,) in db.query(ScheduledCall.id).filter(
+        ScheduledCall.status == "dialing",
+        ScheduledCall.updated_at <= now - timeout
+    )]
+    return mark_calls_as_attempted(db, {call_id: OUTCOME_FAILED for call_id in stuck_ids}, now=now)
+
+def get_dispatch_queue(db: Session, now: Optional[datetime] = None, user_id: Optional[int] = None, limit: int = 1000) -> DispatchQueue:
+    """Очередь готовых звонков в порядке EDF (крайний срок + приоритет + aging)"""
+    queue = DispatchQueue(now=now)
+    queue.extend(get_ready_calls(db, now=queue.now, user_id=user_id, limit=limit))
+    return queue
+
+def get_shared_dispatch_queue(db: Session, user_id: int, now: Optional[datetime] = None, limit: int = 1000) -> DispatchQueue:
+    """
+    Очередь для проверки ёмкости с точки зрения пользователя. Дозвонщик общий, поэтому
+    в очереди готовые звонки всех пользователей; звонки user_id, не попавшие в первые
+    limit по сроку, добавляются в хвост.
+    """
+    queue = get_dispatch_queue(db, now=now, limit=limit)
+    queued = {entry.call.id for entry in queue.ordered()}
+    queue.extend(
+        call for call in get_ready_calls(db, now=queue.now, user_id=user_id, limit=limit)
+        if call.id not in queued
+    )
+    return queue
+
+
+# Разрешённые часы звонков
+def get_contact_timezone(db: Session, contact_id: int) -> Optional[str]:
+    row = db.query(Contact.timezone).filter(Contact.id == contact_id).first()
+    return row[0] if row else None
+
+def compute_next_eligible_at(db_call, tz_name: Optional[str], hours: CallingHours = None) -> Optional[datetime]:
+    """
+    Ближайшее время набора: момент готовности звонка, сдвинутый в разрешённые часы контакта.
+    None — звонок не ждёт набора или до конца его окна разрешённых часов уже нет.
+    """
+    if db_call.status not in ACTIVE_STATUSES:
+        return None
+    ready_at = call_ready_at(db_call)
+    if ready_at is None:
+        return None
+    return (hours or calling_hours).next_eligible(ready_at, tz_name, not_after=db_call.end_time_window)
+
+def refresh_next_eligible_at(db_call, tz_name: Optional[str], hours: CallingHours = None):
+    """
+    Пересчитывает next_eligible_at звонка (ORM-объекта или SimpleNamespace).
+    Готовый к набору звонок, которому в окне не осталось разрешённых часов, получает статус expired.
+    """
+    db_call.next_eligible_at = compute_next_eligible_at(db_call, tz_name, hours)
+    if db_call.next_eligible_at is None and db_call.status in ACTIVE_STATUSES and call_ready_at(db_call) is not None:
+        db_call.status = STATUS_EXPIRED
+    return db_call
+
+def recompute_eligibility(
+    db: Session,
+    contact_id: Optional[int] = None,
+    only_missing: bool = False,
+    hours: CallingHours = None,
+    batch_size: int = 1000
+) -> int:
+    """
+    Пересчитывает next_eligible_at для ожидающих звонков пачками по id.
+    contact_id — только звонки контакта (сменился часовой пояс),
+    only_missing — только звонки без рассчитанного значения.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        query = db.query(ScheduledCall, Contact.timezone).join(
+            Contact, Contact.id == ScheduledCall.contact_id
+        ).filter(
+            ScheduledCall.status.in_(ACTIVE_STATUSES),
+            ScheduledCall.id > last_id
+        )
+        if contact_id is not None:
+            query = query.filter(ScheduledCall.contact_id == contact_id)
+        if only_missing:
+            query = query.filter(ScheduledCall.next_eligible_at == None)
+        rows = query.order_by(ScheduledCall.id.asc()).limit(batch_size).all()
+        if not rows:
+            break
+
+        mappings = []
+        for db_call, tz_name in rows:
+            call = refresh_next_eligible_at(
+                SimpleNamespace(**{name: getattr(db_call, name) for name in ATTEMPT_FIELDS}), tz_name, hours
+            )
+            if call.next_eligible_at != db_call.next_eligible_at or call.status != db_call.status:
+                mappings.append({"id": db_call.id, "status": call.status, "next_eligible_at": call.next_eligible_at})
+        if mappings:
+            db.bulk_update_mappings(ScheduledCall, mappings)
+            db.commit()
+            updated += len(mappings)
+        last_id = rows[-1][0].id
+    return updated
+
+def recompute_eligibility_on_startup(db: Session, hours: CallingHours = None) -> int:
+    """
+    Досчитывает next_eligible_at при запуске. Если правила разрешённых часов
+    (CALLING_HOURS_*, CALLING_DAYS, DEFAULT_CONTACT_TIMEZONE) изменились с прошлого
+    запуска, пересчитываются все ожидающие звонки, иначе — только без значения.
+    """
+    hours = hours or calling_hours
+    fingerprint = hours.fingerprint()
+    state = db.get(AppState, CALLING_HOURS_STATE_KEY)
+    changed = state is None or state.value != fingerprint
+    updated = recompute_eligibility(db, only_missing=not changed, hours=hours)
+    if changed:
+        if state is None:
+            db.add(AppState(key=CALLING_HOURS_STATE_KEY, value=fingerprint))
+        else:
+            state.value = fingerprint
+        db.commit()
+    return updated
@@ -0,0 +1,134 @@
+# app/crud/tag.py
+"""
+Теги контактов: таблица tags (уникальное имя на пользователя) и связь contact_tags.
+
+Фильтр "контакты с тегами" — подзапрос по индексу (tag_id, contact_id):
+для "любой из" — IN по тегам, для "все" — GROUP BY contact_id HAVING count = n.
+Контакты без нужных тегов не читаются вовсе.
+"""
+from collections import defaultdict
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, selectinload, undefer
+from typing import Dict, Iterable, List, Optional
+from app.models.contact import Contact
+from app.models.tag import Tag, ContactTag
+from app.crud.pagination import keyset
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+TAG_MATCHES = (MATCH_ANY, MATCH_ALL)
+
+def clean_tag_names(names: Optional[Iterable[str]]) -> List[str]:
+    """Имена без пробелов по краям, без пустых и повторов, в исходном порядке"""
+    cleaned = []
+    for name in names or []:
+        name = str(name).strip()
+        if name and name not in cleaned:
+            cleaned.append(name)
+    return cleaned
+
+def get_tags_by_name(db: Session, user_id: int, names: List[str]) -> List[Tag]:
+    if not names:
+        return []
+    return db.query(Tag).filter(Tag.user_id == user_id, Tag.name.in_(names)).all()
+
+def get_or_create_tag_ids(db: Session, user_id: int, names: List[str]) -> Dict[str, int]:
+    """id тегов по именам; недостающие теги создаются (без коммита)"""
+    ids = {tag.name: tag.id for tag in get_tags_by_name(db, user_id, names)}
+    missing = [name for name in names if name not in ids]
+    if missing:
+        tags_insert = insert(Tag.__table__)
+        conn = db.connection(bind_arguments={"clause": tags_insert})
+        created = conn.execute(
+            tags_insert.returning(Tag.__table__.c.id, Tag.__table__.c.name, sort_by_parameter_order=True),
+            [{"user_id": user_id, "name": name} for name in missing]
+        ).all()
+        ids.update({name: tag_id for tag_id, name in created})
+    return ids
+
+def set_contact_tags(db: Session, contact: Contact, names: Optional[Iterable[str]]):
+    """Заменяет теги контакта; коммит — на вызывающем"""
+    names = clean_tag_names(names)
+    existing = {tag.name: tag for tag in get_tags_by_name(db, contact.user_id, names)}
+    for name in names:
+        if name not in existing:
+            existing[name] = Tag(user_id=contact.user_id, name=name)
+            db.add(existing[name])
+    contact.tag_objects = [existing[name] for name in names]
+
+def add_contact_tags(db: Session, user_id: int, tag_names_by_contact: Dict[int, List[str]]):
+    """Массовое назначение тегов новым контактам (импорт): один executemany на всех"""
+    names = clean_tag_names(name for names in tag_names_by_contact.values() for name in names)
+    if not names:
+        return
+    tag_ids = get_or_create_tag_ids(db, user_id, names)
+    links = [
+        {"contact_id": contact_id, "tag_id": tag_ids[name]}
+        for contact_id, contact_names in tag_names_by_contact.items()
+        for name in clean_tag_names(contact_names)
+    ]
+    links_insert = insert(ContactTag.__table__)
+    db.connection(bind_arguments={"clause": links_insert}).execute(links_insert, links)
+
+def get_tag_names(db: Session, contact_ids: List[int]) -> Dict[int, List[str]]:
+    """Имена тегов для набора контактов одним запросом"""
+    names = defaultdict(list)
+    if not contact_ids:
+        return names
+    rows = db.query(ContactTag.contact_id, Tag.name).join(
+        Tag, Tag.id == ContactTag.tag_id
+    ).filter(
+        ContactTag.contact_id.in_(contact_ids)
+    ).order_by(ContactTag.contact_id, Tag.name)
+    for contact_id, name in rows:
+        names[contact_id].append(name)
+    return names
+
+def get_tag_counts(db: Session, user_id: int) -> list:
+    """Теги пользователя с числом активных контактов, по алфавиту"""
+    return db.query(
+        Tag.id,
+        Tag.name,
+        func.count(Contact.id).label("contact_count")
+    ).outerjoin(
+        ContactTag, ContactTag.tag_id == Tag.id
+    ).outerjoin(
+        Contact, (Contact.id == ContactTag.contact_id) & (Contact.is_active == True)
+    ).filter(
+        Tag.user_id == user_id
+    ).group_by(Tag.id).order_by(Tag.name).all()
+
+def tagged_contact_ids(db: Session, user_id: int, names: List[str], match: str = MATCH_ANY):
+    """
+    Подзапрос id контактов с любым (any) или всеми (all) тегами из names;
+    None — если ни одного контакта быть не может (тега нет у пользователя)
+    """
+    names = clean_tag_names(names)
+    tag_ids = [tag.id for tag in get_tags_by_name(db, user_id, names)]
+    if not tag_ids or (match == MATCH_ALL and len(tag_ids) < len(names)):
+        return None
+    query = db.query(ContactTag.contact_id).filter(ContactTag.tag_id.in_(tag_ids))
+    if match == MATCH_ALL:
+        query = query.group_by(ContactTag.contact_id).having(func.count() == len(tag_ids))
+    return query
+
+def get_contacts_by_tags(
+    db: Session,
+    user_id: int,
+    names: List[str],
+    match: str = MATCH_ANY,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> List[Contact]:
+    contact_ids = tagged_contact_ids(db, user_id, names, match)
+    if contact_ids is None:
+        return []
+    query = db.query(Contact).options(
+        selectinload(Contact.tag_objects), undefer(Contact.script)
+    ).filter(
+        Contact.id.in_(contact_ids),
+        Contact.user_id == user_id,
+        Contact.is_active == True
+    )
+    return keyset(query, (Contact.id,), cursor).offset(skip).limit(limit).all()
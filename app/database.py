@@ -1,20 +1,50 @@
 # app/database.py
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, configure_mappers
 import os
 from dotenv import load_dotenv
+from app.db_bootstrap import create_engines, install_pragmas, is_file_sqlite, RoutingSession, ASYNC
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
+# engine — писатель (он же для create_all и миграций), read_engine — пул читателей
+engine, read_engine = create_engines(SQLALCHEMY_DATABASE_URL)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    writer=engine,
+    reader=read_engine
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Асинхронные драйверы для тех же баз
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def make_async_url(url: str) -> str:
+    """sqlite:///./app.db -> sqlite+aiosqlite:///./app.db"""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+ASYNC_DATABASE_URL = make_async_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+if is_file_sqlite(SQLALCHEMY_DATABASE_URL):
+    install_pragmas(async_engine.sync_engine, ASYNC)
+
+# expire_on_commit=False: после коммита атрибуты нельзя лениво догрузить в async-режиме
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 Base = declarative_base()
 
@@ -23,10 +53,13 @@ def configure_database():
     """Конфигурирует все мапперы после импорта моделей"""
     # Импортируем все модели для регистрации
     from app.models.user import User, RefreshToken
-    from app.models.contact import Contact, ContactDialog, DialogMessage
-    from app.models.group import Group, GroupMember, ScheduledGroupCall
+    from app.models.contact import Contact, ContactDialog, DialogMessage, ArchivedDialog
+    from app.models.group import Group, GroupMember, GroupRuleChange, ScheduledGroupCall
     from app.models.prompt_template import PromptTemplate
     from app.models.scheduled_call import ScheduledCall
+    from app.models.tag import Tag, ContactTag
+    from app.models.app_state import AppState
+    import app.models.indexes
     
     # Конфигурируем мапперы
     configure_mappers()
@@ -36,4 +69,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,167 @@
+# app/db_bootstrap.py
+"""
+Настройка SQLite для продакшена.
+
+Каждое соединение получает WAL, synchronous=NORMAL, mmap и размер кэша.
+Запись идёт через единственное соединение-писатель, чтения — через пул
+соединений только для чтения: в WAL читатели не блокируют писателя и
+друг друга. Для других СУБД остаётся один обычный engine.
+"""
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+import threading
+import time
+
+from sqlalchemy import create_engine, event, Delete, Insert, Update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import settings
+
+WRITER = "writer"
+READER = "reader"
+ASYNC = "async"  # async-engine вебхуков (пишет сам, ждёт по busy_timeout)
+
+
+@dataclass
+class DatabaseStats:
+    """Счётчики соединений и ожидания писателя (потокобезопасные)"""
+    connections: dict = field(default_factory=lambda: {WRITER: 0, READER: 0, ASYNC: 0})
+    checkouts: dict = field(default_factory=lambda: {WRITER: 0, READER: 0, ASYNC: 0})
+    write_transactions: int = 0
+    write_wait_total: float = 0.0  # секунды
+    write_wait_max: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, counter: dict, role: str):
+        with self._lock:
+            counter[role] += 1
+
+    def record_write_wait(self, seconds: float):
+        with self._lock:
+            self.write_transactions += 1
+            self.write_wait_total += seconds
+            self.write_wait_max = max(self.write_wait_max, seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "connections": dict(self.connections),
+                "checkouts": dict(self.checkouts),
+                "write_transactions": self.write_transactions,
+                "write_wait_avg_ms": round(self.write_wait_total / max(self.write_transactions, 1) * 1000, 3),
+                "write_wait_max_ms": round(self.write_wait_max * 1000, 3),
+            }
+
+
+# Глобальная статистика
+db_stats = DatabaseStats()
+
+
+def is_file_sqlite(url: str) -> bool:
+    """SQLite в файле (для :memory: отдельный читатель увидел бы другую, пустую базу)"""
+    if not url.startswith("sqlite"):
+        return False
+    path = url.split("://", 1)[1].lstrip("/")
+    return bool(path) and ":memory:" not in path and "mode=memory" not in path
+
+
+def sqlite_pragmas(role: str) -> list:
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if role == READER:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def install_pragmas(engine: Engine, role: str = WRITER):
+    """Выполняет pragmas на каждом новом соединении и считает соединения пула"""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas(role):
+            cursor.execute(pragma)
+        cursor.close()
+        db_stats.count(db_stats.connections, role)
+
+    @event.listens_for(engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        db_stats.count(db_stats.checkouts, role)
+
+
+def create_engines(url: str) -> Tuple[Engine, Engine]:
+    """
+    Возвращает (писатель, читатель). Для файлового SQLite это два пула
+    над одной базой, для остальных случаев — один и тот же engine.
+    """
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    if not is_file_sqlite(url):
+        engine = create_engine(url, connect_args=connect_args)
+        return engine, engine
+
+    # Одно соединение-писатель: транзакции записи встают в очередь пула, а не ловят SQLITE_BUSY
+    writer = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.DB_WRITE_TIMEOUT
+    )
+    reader = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=QueuePool,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_POOL_SIZE
+    )
+    install_pragmas(writer, WRITER)
+    install_pragmas(reader, READER)
+    return writer, reader
+
+
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет чтения в пул читателей, а запись — писателю.
+    После первой записи вся оставшаяся транзакция идёт через писателя,
+    чтобы чтения видели собственные незакоммиченные изменения.
+    """
+
+    def __init__(self, *args, writer: Engine = None, reader: Optional[Engine] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer = writer
+        self.reader = reader
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.reader is None or self.reader is self.writer:
+            return self.writer
+        if self._flushing or self.info.get("uses_writer") or isinstance(clause, (Insert, Update, Delete, TextClause)):
+            if not self.info.get("uses_writer"):
+                self.info["uses_writer"] = True
+                self.info["writer_requested_at"] = time.perf_counter()
+            return self.writer
+        return self.reader
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _measure_write_wait(session, transaction, connection):
+    # Между запросом писателя и началом транзакции — ожидание в очереди пула
+    requested_at = session.info.pop("writer_requested_at", None)
+    if requested_at is not None and connection.engine is session.writer:
+        db_stats.record_write_wait(time.perf_counter() - requested_at)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("uses_writer", None)
+        session.info.pop("writer_requested_at", None)
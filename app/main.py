@@ -8,9 +8,17 @@ from app.api.v1.endpoints import (
     twilio_calls,
     groups  
 )
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal, configure_database
+from app.db_bootstrap import db_stats
+from app.migrations import run_migrations, compress_existing_text
+from app.crud.scheduled_call import recompute_eligibility_on_startup
+from app.crud.group import reconcile_group_counters
+from app.services.dialog_archive import archive_periodically
+from app.services.dispatch_queue import release_stuck_calls_periodically
+from app.core.config import settings
 import logging
 import os 
+import threading
 from dotenv import load_dotenv
 from fastapi.responses import FileResponse
 load_dotenv()
@@ -24,8 +32,35 @@ SQUESTION_WAV_PATH = os.path.join(BASE_DIR, 'sounds', "squestion.wav")
 REPEAT_WAV_PATH = os.path.join(BASE_DIR, 'sounds', "repeat.wav")
 
 
-# Создание таблиц
+# Создание таблиц (configure_database подключает индексы из app/models/indexes.py)
+configure_database()
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+# Досчитываем время набора для звонков без next_eligible_at; при смене разрешённых часов — для всех
+with SessionLocal() as db:
+    recompute_eligibility_on_startup(db)
+
+# Сверяем счётчики групп с group_members и звонками (после миграции колонки пустые)
+with SessionLocal() as db:
+    repaired = reconcile_group_counters(db)
+    if repaired:
+        logging.getLogger(__name__).info(f"🧮 Repaired counters of {repaired} groups")
+
+# Длинные тексты, записанные до сжатия, сжимаем в фоне небольшими транзакциями
+threading.Thread(target=compress_existing_text, args=(engine,), name="compress-text", daemon=True).start()
+
+# Звонки, зависшие в dialing (упавший процесс, потерянный статус Twilio), возвращаем политике повторов
+if settings.DIALING_RECOVERY_INTERVAL > 0:
+    threading.Thread(
+        target=release_stuck_calls_periodically, args=(settings.DIALING_RECOVERY_INTERVAL,), name="release-stuck-calls", daemon=True
+    ).start()
+
+# Старые диалоги периодически уходят из горячих таблиц в архив
+if settings.DIALOG_ARCHIVE_INTERVAL_HOURS > 0:
+    threading.Thread(
+        target=archive_periodically, args=(settings.DIALOG_ARCHIVE_INTERVAL_HOURS,), name="archive-dialogs", daemon=True
+    ).start()
 
 app = FastAPI(
     title="Novo Contact App API",
@@ -40,7 +75,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Access-Control-Allow-Origin"]
+    expose_headers=["Access-Control-Allow-Origin", "X-Next-Cursor"]
 )
 
 # Подключение роутов
@@ -60,6 +95,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/health/db")
+async def database_stats():
+    """Соединения, обращения к пулам и ожидание писателя"""
+    return db_stats.as_dict()
+
 @app.get("/static/start.wav")
 async def get_start_wav():
     """
@@ -0,0 +1,251 @@
+# app/migrations.py
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from app.database import Base
+from app.models.search import create_contact_search
+from app.models.group_rules import create_group_rule_triggers
+from app.models.types import CompressedText, compress_text
+from app.crud.tag import clean_tag_names
+from app.core.config import settings
+from app.services.phone import try_normalize_phone
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(engine: Engine):
+    """
+    Добавляет в существующие таблицы колонки, которые появились в моделях.
+    create_all создаёт только новые таблицы, поэтому новые поля добавляем через ALTER TABLE.
+    """
+    # Инспектируем через то же соединение: у писателя SQLite в пуле всего одно
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                logger.info(f"➕ Added column {table.name}.{column.name}")
+
+                # Заполняем значение по умолчанию для уже существующих строк
+                default = column.default
+                if default is not None and default.is_scalar:
+                    conn.execute(
+                        text(f'UPDATE "{table.name}" SET "{column.name}" = :value WHERE "{column.name}" IS NULL'),
+                        {"value": default.arg}
+                    )
+
+
+def remove_duplicate_group_members(engine: Engine):
+    """Оставляет одну запись на пару (group_id, contact_id), иначе уникальный индекс не создастся"""
+    if "group_members" not in inspect(engine).get_table_names():
+        return
+    with engine.begin() as conn:
+        result = conn.execute(text(
+            'DELETE FROM group_members WHERE id NOT IN '
+            '(SELECT MIN(id) FROM group_members GROUP BY group_id, contact_id)'
+        ))
+        if result.rowcount:
+            logger.info(f"🧹 Removed {result.rowcount} duplicate group members")
+
+
+# Колонки-ключи курсоров. В SQLite func.now() пишет "YYYY-MM-DD HH:MM:SS", а параметры
+# из Python приходят как "YYYY-MM-DD HH:MM:SS.ffffff"; строковое сравнение в keyset
+# требует одного формата
+KEYSET_TIMESTAMPS = (
+    ("contact_dialogs", "date"),
+    ("dialog_messages", "timestamp"),
+)
+
+
+def normalize_keyset_timestamps(engine: Engine):
+    """Дописывает дробную часть секунд к значениям, записанным через func.now()"""
+    if engine.dialect.name != "sqlite":
+        return
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        for table, column in KEYSET_TIMESTAMPS:
+            if table not in existing_tables:
+                continue
+            result = conn.execute(text(
+                f'UPDATE "{table}" SET "{column}" = "{column}" || \'.000000\' WHERE length("{column}") = 19'
+            ))
+            if result.rowcount:
+                logger.info(f"🕒 Normalized {result.rowcount} timestamps in {table}.{column}")
+
+
+def backfill_phone_e164(engine: Engine):
+    """
+    Заполняет contacts.phone_e164 для строк без него. Номера, которые не удалось
+    разобрать, и повторы среди активных контактов пользователя остаются пустыми,
+    иначе уникальный индекс (user_id, phone_e164) не создастся.
+    """
+    if "contacts" not in inspect(engine).get_table_names():
+        return
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, user_id, phone, is_active FROM contacts WHERE phone_e164 IS NULL ORDER BY id"
+        )).fetchall()
+        if not rows:
+            return
+        taken = set(conn.execute(text(
+            "SELECT user_id, phone_e164 FROM contacts WHERE phone_e164 IS NOT NULL AND is_active = 1"
+        )).fetchall())
+
+        updates, duplicates, invalid = [], 0, 0
+        for contact_id, user_id, phone, is_active in rows:
+            phone_e164 = try_normalize_phone(phone)
+            if not phone_e164:
+                invalid += 1
+                continue
+            if is_active:
+                if (user_id, phone_e164) in taken:
+                    duplicates += 1
+                    continue
+                taken.add((user_id, phone_e164))
+            updates.append({"id": contact_id, "phone_e164": phone_e164})
+
+        if updates:
+            conn.execute(text("UPDATE contacts SET phone_e164 = :phone_e164 WHERE id = :id"), updates)
+            logger.info(f"☎️ Normalized {len(updates)} contact phones to E.164")
+        if duplicates or invalid:
+            logger.warning(f"⚠️ Left phone_e164 empty for {duplicates} duplicate and {invalid} unparseable phones")
+
+
+def create_missing_indexes(engine: Engine):
+    """Создаёт индексы, объявленные в моделях, если их ещё нет в базе"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _legacy_tag_list(raw) -> list:
+    """Старое contacts.tags: JSON-строка со списком, сохранённая в JSON-колонку (двойное кодирование)"""
+    value = raw
+    for _ in range(2):
+        if not isinstance(value, str):
+            break
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return clean_tag_names(value) if isinstance(value, list) else []
+
+
+def migrate_contact_tags(engine: Engine):
+    """
+    Переносит теги из старой JSON-колонки contacts.tags в tags/contact_tags
+    и очищает колонку. Сама колонка остаётся (модель её не использует),
+    повторный запуск ничего не делает.
+    """
+    inspector = inspect(engine)
+    if "contacts" not in inspector.get_table_names():
+        return
+    if "tags" not in {column["name"] for column in inspector.get_columns("contacts")}:
+        return
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, user_id, tags FROM contacts WHERE tags IS NOT NULL")).fetchall()
+        if not rows:
+            return
+        links, tagged = 0, 0
+        for contact_id, user_id, raw in rows:
+            names = _legacy_tag_list(raw)
+            tagged += bool(names)
+            for name in names:
+                conn.execute(text(
+                    "INSERT OR IGNORE INTO tags (user_id, name, created_at) VALUES (:user_id, :name, CURRENT_TIMESTAMP)"
+                ), {"user_id": user_id, "name": name})
+                result = conn.execute(text(
+                    "INSERT OR IGNORE INTO contact_tags (contact_id, tag_id) "
+                    "SELECT :contact_id, id FROM tags WHERE user_id = :user_id AND name = :name"
+                ), {"contact_id": contact_id, "user_id": user_id, "name": name})
+                links += result.rowcount
+        conn.execute(text("UPDATE contacts SET tags = NULL WHERE tags IS NOT NULL"))
+        logger.info(f"🏷️ Moved {links} tags of {tagged} contacts to the tags table")
+
+
+def create_search_index(engine: Engine):
+    """FTS5-индекс контактов (только SQLite); при создании или смене схемы заполняется из contacts"""
+    with engine.begin() as conn:
+        if create_contact_search(conn):
+            logger.info("🔎 Built full-text index for contacts")
+
+
+def create_group_rule_queue(engine: Engine):
+    """Триггеры очереди динамических групп (только SQLite)"""
+    with engine.begin() as conn:
+        create_group_rule_triggers(conn)
+
+
+def compressed_text_columns() -> list:
+    """(таблица, колонка) всех колонок CompressedText в моделях"""
+    return [
+        (table.name, column.name)
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, CompressedText)
+    ]
+
+
+def compress_existing_text(engine: Engine, batch_size: int = 500, pause: float = 0.05) -> int:
+    """
+    Сжимает длинные значения, записанные обычным текстом до появления CompressedText.
+    Идёт по rowid пачками, каждая пачка — своя короткая транзакция, между ними пауза:
+    запускается в фоне и не держит писателя. Уже сжатые (BLOB) строки пропускаются,
+    повторный запуск проходит только по оставшимся длинным текстам. Возвращает число сжатых.
+    """
+    if engine.dialect.name != "sqlite":
+        return 0
+    existing_tables = set(inspect(engine).get_table_names())
+    threshold = settings.TEXT_COMPRESSION_THRESHOLD
+    total = 0
+    for table, column in compressed_text_columns():
+        if table not in existing_tables:
+            continue
+        last_id, compressed = 0, 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(text(
+                    f'SELECT id, "{column}" FROM "{table}" WHERE id > :last_id '
+                    f'AND typeof("{column}") = \'text\' AND length(CAST("{column}" AS BLOB)) >= :threshold '
+                    f'ORDER BY id LIMIT :limit'
+                ), {"last_id": last_id, "threshold": threshold, "limit": batch_size}).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                updates = []
+                for row_id, value in rows:
+                    packed = compress_text(value, threshold)
+                    if isinstance(packed, bytes):
+                        updates.append({"id": row_id, "value": packed})
+                if updates:
+                    conn.execute(text(f'UPDATE "{table}" SET "{column}" = :value WHERE id = :id'), updates)
+                    compressed += len(updates)
+            time.sleep(pause)
+        if compressed:
+            logger.info(f"🗜️ Compressed {compressed} values in {table}.{column}")
+        total += compressed
+    return total
+
+
+def run_migrations(engine: Engine):
+    """Приводит схему существующей базы к текущим моделям"""
+    add_missing_columns(engine)
+    remove_duplicate_group_members(engine)
+    normalize_keyset_timestamps(engine)
+    backfill_phone_e164(engine)
+    create_missing_indexes(engine)
+    migrate_contact_tags(engine)
+    create_search_index(engine)
+    create_group_rule_queue(engine)
@@ -0,0 +1,12 @@
+# app/models/app_state.py
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AppState(Base):
+    """Служебные значения приложения по ключу (например, отпечаток правил разрешённых часов)"""
+    __tablename__ = "app_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -1,9 +1,10 @@
 # app/models/contact.py (обновленный с группами)
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.database import Base
-import json
+from app.models.types import CompressedText
+from datetime import datetime
 
 class Contact(Base):
     __tablename__ = "contacts"
@@ -12,10 +13,11 @@ class Contact(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
     phone = Column(String, nullable=False)
+    phone_e164 = Column(String, nullable=True)  # Канонический номер для поиска и дедупликации; пусто — не удалось разобрать
     email = Column(String, nullable=True)
     company = Column(String, nullable=True)
-    script = Column(Text, nullable=True)
-    tags = Column(JSON, nullable=True)  # JSON строка с тегами
+    timezone = Column(String, nullable=True)  # IANA, например "Europe/Bratislava"; пусто — по умолчанию
+    script = deferred(Column(CompressedText, nullable=True))  # Грузится при обращении или через undefer
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -25,34 +27,34 @@ class Contact(Base):
     dialogs = relationship("ContactDialog", back_populates="contact", cascade="all, delete-orphan")
     scheduled_calls = relationship("ScheduledCall", back_populates="contact", cascade="all, delete-orphan")
     group_memberships = relationship("GroupMember", back_populates="contact", cascade="all, delete-orphan")  # ← Добавлено
+    # Теги — таблицы tags/contact_tags; назначаются через app/crud/tag.py:set_contact_tags
+    tag_objects = relationship("Tag", secondary="contact_tags", back_populates="contacts", order_by="Tag.name")
+
+    @property
+    def tags(self):
+        """Имена тегов списком (для списков контактов грузите tag_objects через selectinload)"""
+        return [tag.name for tag in self.tag_objects]
 
     def get_tags(self):
         """Получение тегов как список"""
-        if self.tags:
-            try:
-                return json.loads(self.tags)
-            except:
-                return []
-        return []
-
-    def set_tags(self, tags_list):
-        """Установка тегов из списка"""
-        if tags_list:
-            self.tags = json.dumps(tags_list)
-        else:
-            self.tags = None
+        return self.tags
 
 class ContactDialog(Base):
     __tablename__ = "contact_dialogs"
     
     id = Column(Integer, primary_key=True, index=True)
     contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
-    date = Column(DateTime, default=func.now())
-    transcript = Column(Text, nullable=True)  # Полный текст диалога
+    date = Column(DateTime, default=datetime.utcnow)  # Ключ курсора: значение из Python, формат как у параметров
+    transcript = deferred(Column(CompressedText, nullable=True))  # Полный текст диалога; грузится при обращении или через undefer
     
     # Связи
     contact = relationship("Contact", back_populates="dialogs")
-    messages = relationship("DialogMessage", back_populates="dialog", cascade="all, delete-orphan")
+    messages = relationship(
+        "DialogMessage",
+        back_populates="dialog",
+        cascade="all, delete-orphan",
+        order_by=lambda: (DialogMessage.timestamp, DialogMessage.id)  # Хронологический порядок при загрузке
+    )
 
 class DialogMessage(Base):
     __tablename__ = "dialog_messages"
@@ -60,8 +62,25 @@ class DialogMessage(Base):
     id = Column(Integer, primary_key=True, index=True)
     dialog_id = Column(Integer, ForeignKey("contact_dialogs.id"), nullable=False)
     role = Column(String, nullable=False)  # "agent" или "client"
-    text = Column(Text, nullable=False)
-    timestamp = Column(DateTime, default=func.now())
+    text = Column(CompressedText, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow)  # Ключ курсора: значение из Python, формат как у параметров
     
     # Связи
-    dialog = relationship("ContactDialog", back_populates="messages")
\ No newline at end of file
+    dialog = relationship("ContactDialog", back_populates="messages")
+
+class ArchivedDialog(Base):
+    """
+    Диалог, перенесённый в архив (app/services/dialog_archive.py): где лежит запись
+    и сводка для списков без чтения сегмента. id — прежний id диалога.
+    """
+    __tablename__ = "archived_dialogs"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
+    date = Column(DateTime, nullable=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    last_message_at = Column(DateTime, nullable=True)
+    segment = Column(String, nullable=False)  # Имя файла сегмента в DIALOG_ARCHIVE_DIR
+    segment_offset = Column(Integer, nullable=False)  # Смещение заголовка записи
+    segment_length = Column(Integer, nullable=False)  # Длина сжатых данных
+    archived_at = Column(DateTime, default=datetime.utcnow)
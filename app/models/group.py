@@ -1,8 +1,9 @@
 # app/models/group.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.core.config import settings
 import secrets
 
 class Group(Base):
@@ -13,6 +14,17 @@ class Group(Base):
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)
+    # Правила динамической группы (schemas.group.GroupRules); NULL — обычная группа со списком участников
+    rules = Column(JSON(none_as_null=True), nullable=True)
+    rules_synced_at = Column(DateTime, nullable=True)  # До какого момента состав приведён к правилам
+    # Денормализованные счётчики: ведёт CRUD в транзакции изменения, сверяет reconcile_group_counters
+    member_count = Column(Integer, default=0)
+    active_member_count = Column(Integer, default=0)    # Участники с активным контактом
+    scheduled_calls_count = Column(Integer, default=0)
+    completed_calls_count = Column(Integer, default=0)
+    # Растёт с каждым изменением участников или их активности (bump_group_counters): по нему
+    # кэш битмапов любого процесса видит, что состав группы поменяли в другом
+    members_version = Column(Integer, default=0)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
@@ -33,6 +45,15 @@ class GroupMember(Base):
     group = relationship("Group", back_populates="group_members")
     contact = relationship("Contact", back_populates="group_memberships")
 
+class GroupRuleChange(Base):
+    """
+    Очередь контактов, которые могли войти в динамические группы или выйти из них.
+    Заполняется триггерами (app/models/group_rules.py), разбирается crud.group.sync_dynamic_groups
+    """
+    __tablename__ = "group_rule_changes"
+
+    contact_id = Column(Integer, primary_key=True)  # Без внешнего ключа: удалённый контакт просто пропускается
+
 class ScheduledGroupCall(Base):
     __tablename__ = "scheduled_group_calls"
     
@@ -51,12 +72,18 @@ class ScheduledGroupCall(Base):
     call_attempts = Column(Integer, default=0)           # Количество попыток звонка
     last_attempt_at = Column(DateTime, nullable=True)    # Время последней попытки
     next_retry_at = Column(DateTime, nullable=True)      # Время следующей попытки
+    last_outcome = Column(String, nullable=True)         # Исход последней попытки
     retry_until_success = Column(Boolean, default=False)  # Повторять пока не дозвонимся
-    retry_interval = Column(Integer, default=60)         # Интервал повторения в минутах
+    retry_interval = Column(Integer, default=settings.RETRY_DEFAULT_INTERVAL)  # Интервал повторения в минутах
+    exclude_group_ids = Column(JSON(none_as_null=True), nullable=True)  # Участники этих групп не обзваниваются
     
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Связи
     user = relationship("User", back_populates="scheduled_group_calls")
-    group = relationship("Group", back_populates="scheduled_group_calls")
\ No newline at end of file
+    group = relationship("Group", back_populates="scheduled_group_calls")
+
+    __table_args__ = (
+        Index("ix_scheduled_group_calls_status_next_retry_at", "status", "next_retry_at"),
+    )
\ No newline at end of file
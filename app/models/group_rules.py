@@ -0,0 +1,60 @@
+# app/models/group_rules.py
+"""
+Триггеры очереди динамических групп.
+
+Любое изменение, от которого зависит попадание контакта под правила группы
+(новый контакт, смена company/timezone/is_active, теги, новый диалог,
+переименование тега), кладёт id контакта в group_rule_changes. Так очередь
+не обходит ни ORM, ни Core-вставка импорта, ни асинхронные сессии. Условие WHEN
+отсекает пользователей без динамических групп по индексу (user_id, id) групп:
+массовый импорт у них очередь не наполняет.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def _has_dynamic_groups(user_id: str) -> str:
+    return (
+        f"EXISTS (SELECT 1 FROM groups WHERE groups.user_id = {user_id} "
+        f"AND groups.is_active = 1 AND groups.rules IS NOT NULL)"
+    )
+
+
+def _owner_has_dynamic_groups(contact_id: str) -> str:
+    return _has_dynamic_groups(f"(SELECT user_id FROM contacts WHERE contacts.id = {contact_id})")
+
+
+def _enqueue(source: str) -> str:
+    return f"BEGIN INSERT OR IGNORE INTO group_rule_changes (contact_id) {source}; END"
+
+
+TRIGGERS = {
+    "contacts_group_rules_insert":
+        f"AFTER INSERT ON contacts WHEN {_has_dynamic_groups('new.user_id')} "
+        + _enqueue("VALUES (new.id)"),
+    "contacts_group_rules_update":
+        f"AFTER UPDATE OF company, timezone, is_active ON contacts WHEN {_has_dynamic_groups('new.user_id')} "
+        + _enqueue("VALUES (new.id)"),
+    "contact_tags_group_rules_insert":
+        f"AFTER INSERT ON contact_tags WHEN {_owner_has_dynamic_groups('new.contact_id')} "
+        + _enqueue("VALUES (new.contact_id)"),
+    "contact_tags_group_rules_delete":
+        f"AFTER DELETE ON contact_tags WHEN {_owner_has_dynamic_groups('old.contact_id')} "
+        + _enqueue("VALUES (old.contact_id)"),
+    "contact_dialogs_group_rules_insert":
+        f"AFTER INSERT ON contact_dialogs WHEN {_owner_has_dynamic_groups('new.contact_id')} "
+        + _enqueue("VALUES (new.contact_id)"),
+    "tags_group_rules_rename":
+        f"AFTER UPDATE OF name ON tags WHEN {_has_dynamic_groups('new.user_id')} "
+        + _enqueue("SELECT contact_id FROM contact_tags WHERE tag_id = new.id"),
+}
+
+
+def create_group_rule_triggers(conn: Connection) -> bool:
+    """Создаёт триггеры очереди (только SQLite; без них sync_dynamic_groups пересчитывает группы целиком)"""
+    if conn.dialect.name != "sqlite":
+        return False
+    for name, body in TRIGGERS.items():
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+    return True
+
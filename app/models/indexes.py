@@ -0,0 +1,136 @@
+# app/models/indexes.py
+"""
+Составные и частичные индексы под реальные запросы CRUD.
+
+Индексы объявляются здесь, а не в моделях, чтобы все они были видны в одном
+месте рядом с запросами, которые их используют. Index(...) с колонками модели
+сам добавляется в таблицу, поэтому create_all и create_missing_indexes их
+подхватывают. Проверка планов: python -m app.query_plans
+"""
+from sqlalchemy import Index, text
+
+from app.models.user import RefreshToken
+from app.models.contact import Contact, ContactDialog, DialogMessage, ArchivedDialog
+from app.models.group import Group, GroupMember, ScheduledGroupCall
+from app.models.prompt_template import PromptTemplate
+from app.models.scheduled_call import ScheduledCall
+from app.models.tag import Tag, ContactTag
+
+# Частичные индексы только по активным строкам: is_active == True в SQLite
+# компилируется в литерал "is_active = 1", поэтому планировщик их использует
+ACTIVE = text("is_active = 1")
+POSTGRES_ACTIVE = text("is_active")
+
+# Списки контактов пользователя: user_id = ? AND is_active = 1, порядок по id
+ix_contacts_user_active = Index(
+    "ix_contacts_user_id_active",
+    Contact.user_id, Contact.id,
+    sqlite_where=ACTIVE,
+    postgresql_where=POSTGRES_ACTIVE
+)
+
+# Один активный контакт на номер у пользователя; поиск по номеру из вебхука и при импорте
+uq_contacts_user_phone = Index(
+    "uq_contacts_user_id_phone_e164",
+    Contact.user_id, Contact.phone_e164,
+    unique=True,
+    sqlite_where=ACTIVE,
+    postgresql_where=POSTGRES_ACTIVE
+)
+
+# Диалоги контакта, новые сверху
+ix_contact_dialogs_contact_date = Index(
+    "ix_contact_dialogs_contact_id_date",
+    ContactDialog.contact_id, ContactDialog.date
+)
+
+# Динамические группы с правилом "нет диалога N дней": контакты, чей диалог вышел из окна
+ix_contact_dialogs_date = Index(
+    "ix_contact_dialogs_date",
+    ContactDialog.date
+)
+
+# Архивные диалоги контакта, новые сверху
+ix_archived_dialogs_contact_date = Index(
+    "ix_archived_dialogs_contact_id_date",
+    ArchivedDialog.contact_id, ArchivedDialog.date
+)
+
+# Правило "нет диалога N дней" учитывает и архивные диалоги
+ix_archived_dialogs_date = Index(
+    "ix_archived_dialogs_date",
+    ArchivedDialog.date
+)
+
+# Сообщения диалога в хронологическом порядке
+ix_dialog_messages_dialog_timestamp = Index(
+    "ix_dialog_messages_dialog_id_timestamp",
+    DialogMessage.dialog_id, DialogMessage.timestamp
+)
+
+# Тег с таким именем у пользователя один; поиск тегов по именам
+uq_tags_user_name = Index(
+    "uq_tags_user_id_name",
+    Tag.user_id, Tag.name,
+    unique=True
+)
+
+# Контакты с тегом: фильтр по тегам читает только индекс (ключ contact_tags — (contact_id, tag_id))
+ix_contact_tags_tag = Index(
+    "ix_contact_tags_tag_id_contact_id",
+    ContactTag.tag_id, ContactTag.contact_id
+)
+
+ix_groups_user_active = Index(
+    "ix_groups_user_id_active",
+    Group.user_id, Group.id,
+    sqlite_where=ACTIVE,
+    postgresql_where=POSTGRES_ACTIVE
+)
+
+# Контакт состоит в группе не больше одного раза
+uq_group_members_group_contact = Index(
+    "uq_group_members_group_id_contact_id",
+    GroupMember.group_id, GroupMember.contact_id,
+    unique=True
+)
+
+# Обратный путь: группы контакта (каскадное удаление, членство контакта)
+ix_group_members_contact = Index(
+    "ix_group_members_contact_id",
+    GroupMember.contact_id
+)
+
+ix_scheduled_group_calls_user = Index(
+    "ix_scheduled_group_calls_user_id",
+    ScheduledGroupCall.user_id, ScheduledGroupCall.id
+)
+
+ix_scheduled_group_calls_group = Index(
+    "ix_scheduled_group_calls_group_id_user_id",
+    ScheduledGroupCall.group_id, ScheduledGroupCall.user_id
+)
+
+# Список звонков пользователя и ближайшие звонки (user_id = ? AND scheduled_time > ?)
+ix_scheduled_calls_user_time = Index(
+    "ix_scheduled_calls_user_id_scheduled_time",
+    ScheduledCall.user_id, ScheduledCall.scheduled_time
+)
+
+# Пересчёт времени набора при смене часового пояса контакта
+ix_scheduled_calls_contact = Index(
+    "ix_scheduled_calls_contact_id",
+    ScheduledCall.contact_id
+)
+
+ix_prompt_templates_user_active = Index(
+    "ix_prompt_templates_user_id_active",
+    PromptTemplate.user_id, PromptTemplate.id,
+    sqlite_where=ACTIVE,
+    postgresql_where=POSTGRES_ACTIVE
+)
+
+ix_refresh_tokens_user = Index(
+    "ix_refresh_tokens_user_id",
+    RefreshToken.user_id
+)
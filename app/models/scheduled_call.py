@@ -1,8 +1,9 @@
 # app/models/scheduled_call.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.core.config import settings
 
 class ScheduledCall(Base):
     __tablename__ = "scheduled_calls"
@@ -10,6 +11,7 @@ class ScheduledCall(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
+    group_call_id = Column(Integer, ForeignKey("scheduled_group_calls.id"), nullable=True)  # Звонок создан из группового
     
     # Поддержка обоих вариантов: конкретное время или временное окно
     scheduled_time = Column(DateTime, nullable=True)      # Конкретное время звонка
@@ -17,18 +19,32 @@ class ScheduledCall(Base):
     end_time_window = Column(DateTime, nullable=True)     # Конец временного окна
     
     retry_until_success = Column(Boolean, default=False)  # Повторять пока не дозвонимся
+    retry_interval = Column(Integer, default=settings.RETRY_DEFAULT_INTERVAL)  # Базовый интервал повторения в минутах
     script = Column(Text, nullable=True)
     notes = Column(Text, nullable=True)
-    status = Column(String, default="pending")  # pending, completed, failed, cancelled, retrying
+    status = Column(String, default="pending")  # pending, dialing, completed, failed, cancelled, retrying, unplaced, expired
+    priority = Column(Integer, default=0)       # Чем больше, тем раньше в очереди
     
     # Статистика звонков
     call_attempts = Column(Integer, default=0)           # Количество попыток звонка
     last_attempt_at = Column(DateTime, nullable=True)    # Время последней попытки
     next_retry_at = Column(DateTime, nullable=True)      # Время следующей попытки
+    last_outcome = Column(String, nullable=True)         # Исход последней попытки: busy, no-answer, failed, completed
+    next_eligible_at = Column(DateTime, nullable=True)   # Когда звонок можно набирать с учётом часов контакта
     
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Связи
     user = relationship("User", back_populates="scheduled_calls")
-    contact = relationship("Contact", back_populates="scheduled_calls")
\ No newline at end of file
+    contact = relationship("Contact", back_populates="scheduled_calls")
+
+    __table_args__ = (
+        # Выборка звонков для повтора: status = 'retrying' AND next_retry_at <= now
+        Index("ix_scheduled_calls_status_next_retry_at", "status", "next_retry_at"),
+        Index("ix_scheduled_calls_group_call_id_status", "group_call_id", "status"),
+        # Занятость дозвонщика: pending-звонки в интервале времени
+        Index("ix_scheduled_calls_status_scheduled_time", "status", "scheduled_time"),
+        # Выборка диспетчера: status IN ('pending', 'retrying') AND next_eligible_at <= now
+        Index("ix_scheduled_calls_status_next_eligible_at", "status", "next_eligible_at"),
+    )
\ No newline at end of file
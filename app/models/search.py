@@ -0,0 +1,107 @@
+# app/models/search.py
+"""
+Полнотекстовый индекс контактов на SQLite FTS5.
+
+contacts_fts хранит копию индексируемого текста контакта: колонки contacts и
+имена тегов из tags/contact_tags одной строкой. Поэтому это обычная FTS5-таблица,
+а не external content — тегов в contacts нет. Префиксные индексы по 2 и 3
+символам — для typeahead. Синхронизацию делают триггеры на contacts,
+contact_tags и tags, так что её не обходит ни ORM, ни Core-вставка импорта.
+Таблица описана здесь отдельной MetaData только для построения запросов:
+create_all её не создаёт, DDL выполняет create_contact_search.
+"""
+from typing import Optional
+import re
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, text
+from sqlalchemy.engine import Connection
+
+_WORDS = re.compile(r"\w+")
+
+CONTACT_COLUMNS = ("name", "company", "email", "phone", "phone_e164")
+SEARCH_COLUMNS = CONTACT_COLUMNS + ("tags",)
+
+search_metadata = MetaData()
+
+contacts_fts = Table(
+    "contacts_fts", search_metadata,
+    Column("rowid", Integer, primary_key=True),
+    *[Column(name, Text) for name in SEARCH_COLUMNS],
+    Column("contacts_fts", Text),  # Скрытая колонка с именем таблицы — левая часть MATCH
+    Column("rank", Float),         # bm25, меньше — релевантнее
+)
+
+_columns = ", ".join(CONTACT_COLUMNS)
+_new_values = ", ".join(f"new.{name}" for name in CONTACT_COLUMNS)
+_assignments = ", ".join(f"{name} = new.{name}" for name in CONTACT_COLUMNS)
+
+
+def _tags_text(contact_id: str) -> str:
+    return (
+        f"(SELECT group_concat(tags.name, ' ') FROM contact_tags "
+        f"JOIN tags ON tags.id = contact_tags.tag_id WHERE contact_tags.contact_id = {contact_id})"
+    )
+
+
+FTS_TABLE_DDL = (
+    f"CREATE VIRTUAL TABLE contacts_fts USING fts5("
+    f"{', '.join(SEARCH_COLUMNS)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+TRIGGERS = {
+    "contacts_fts_insert":
+        f"AFTER INSERT ON contacts BEGIN "
+        f"INSERT INTO contacts_fts(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    "contacts_fts_delete":
+        "AFTER DELETE ON contacts BEGIN DELETE FROM contacts_fts WHERE rowid = old.id; END",
+    # Только при смене индексируемых колонок: soft delete и updated_at индекс не трогают
+    "contacts_fts_update":
+        f"AFTER UPDATE OF {_columns} ON contacts BEGIN "
+        f"UPDATE contacts_fts SET {_assignments} WHERE rowid = new.id; END",
+    "contact_tags_fts_insert":
+        f"AFTER INSERT ON contact_tags BEGIN "
+        f"UPDATE contacts_fts SET tags = {_tags_text('new.contact_id')} WHERE rowid = new.contact_id; END",
+    "contact_tags_fts_delete":
+        f"AFTER DELETE ON contact_tags BEGIN "
+        f"UPDATE contacts_fts SET tags = {_tags_text('old.contact_id')} WHERE rowid = old.contact_id; END",
+    "tags_fts_rename":
+        f"AFTER UPDATE OF name ON tags BEGIN "
+        f"UPDATE contacts_fts SET tags = {_tags_text('contacts_fts.rowid')} "
+        f"WHERE rowid IN (SELECT contact_id FROM contact_tags WHERE tag_id = new.id); END",
+}
+
+REBUILD = (
+    f"INSERT INTO contacts_fts(rowid, {_columns}, tags) "
+    f"SELECT id, {_columns}, {_tags_text('contacts.id')} FROM contacts"
+)
+
+
+def create_contact_search(conn: Connection) -> bool:
+    """
+    Создаёт FTS-таблицу и триггеры. Если таблицы нет или она объявлена иначе
+    (старая схема индекса), пересоздаёт её и индексирует все контакты.
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    existing = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'contacts_fts'"
+    )).scalar()
+    rebuild = existing != FTS_TABLE_DDL
+    if rebuild:
+        for name in TRIGGERS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text("DROP TABLE IF EXISTS contacts_fts"))
+        conn.execute(text(FTS_TABLE_DDL))
+        conn.execute(text(REBUILD))
+    for name, body in TRIGGERS.items():
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+    return rebuild
+
+
+def match_query(raw: str) -> Optional[str]:
+    """
+    Строка поиска пользователя -> запрос FTS5: каждое слово — префикс в кавычках,
+    слова через AND. Операторы и спецсимволы FTS из ввода не проходят.
+    """
+    words = _WORDS.findall(raw or "")
+    return " ".join(f'"{word}"*' for word in words) or None
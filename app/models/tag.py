@@ -0,0 +1,24 @@
+# app/models/tag.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+    # Связи
+    contacts = relationship("Contact", secondary="contact_tags", back_populates="tag_objects", viewonly=True)
+
+class ContactTag(Base):
+    """Связь контакт — тег; без rowid: строка и есть ключ (contact_id, tag_id)"""
+    __tablename__ = "contact_tags"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    contact_id = Column(Integer, ForeignKey("contacts.id"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
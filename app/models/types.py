@@ -0,0 +1,64 @@
+# app/models/types.py
+"""
+Сжатый текст для больших колонок (транскрипты, сообщения, скрипты, промпты).
+
+Значение короче TEXT_COMPRESSION_THRESHOLD байт или то, что сжимается хуже чем
+на TEXT_COMPRESSION_MIN_SAVING, хранится как обычный TEXT. Остальное — BLOB:
+байт-маркер формата и сжатые zlib данные UTF-8. SQLite не приводит BLOB
+в колонке с TEXT-аффинностью, поэтому схема не меняется, а старые строки
+читаются как есть. Маркер оставляет место для других кодеков.
+
+Распаковка — в обработчике результата, то есть только для строк и колонок,
+которые запрос действительно выбрал: сводки диалогов и выгрузки без этих
+колонок их не трогают. Contact.script и ContactDialog.transcript отложены
+(deferred): загрузка контакта или диалога их не выбирает, текст читается при
+первом обращении к атрибуту или сразу — там, где запрос добавляет undefer
+(списки и карточки, которые отдают текст в ответе). Сжимаем только на SQLite — PostgreSQL сжимает большие
+значения сам (TOAST), туда текст пишется без изменений.
+"""
+from typing import Optional, Union
+import zlib
+
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import settings
+
+ZLIB = b"z"
+CODECS = {ZLIB: zlib.decompress}
+
+
+def compress_text(value: str, threshold: Optional[int] = None) -> Union[str, bytes]:
+    """Строка -> BLOB с маркером, если она длинная и сжатие того стоит; иначе строка как есть"""
+    threshold = settings.TEXT_COMPRESSION_THRESHOLD if threshold is None else threshold
+    raw = value.encode("utf-8")
+    if len(raw) < threshold:
+        return value
+    packed = ZLIB + zlib.compress(raw, settings.TEXT_COMPRESSION_LEVEL)
+    if len(packed) > len(raw) * (1 - settings.TEXT_COMPRESSION_MIN_SAVING):
+        return value
+    return packed
+
+
+def decompress_text(value: Union[str, bytes, None]) -> Optional[str]:
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    value = bytes(value)
+    codec = CODECS.get(value[:1])
+    if codec is None:
+        raise ValueError(f"Unknown compressed text format: {value[:1]!r}")
+    return codec(value[1:]).decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """Text, который на SQLite прозрачно сжимает длинные значения"""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
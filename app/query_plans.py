@@ -0,0 +1,274 @@
+# app/query_plans.py
+"""
+Проверка планов запросов CRUD.
+
+Поднимает схему (с индексами из app/models/indexes.py) на SQLite в памяти,
+прогоняет функции app/crud, перехватывает каждый SQL-запрос и выполняет для
+него EXPLAIN QUERY PLAN. Полный проход по таблице ("SCAN <таблица>" без
+индекса) считается ошибкой: такой запрос растёт вместе с таблицей, а не со
+страницей. Запуск:
+
+    python -m app.query_plans
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+import sys
+import tempfile
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.clock import clock, SimulatedClock
+from app.core.config import settings
+from app.database import Base, configure_database
+from app.models.user import User, RefreshToken
+from app.models.contact import Contact, ContactDialog, DialogMessage
+from app.models.group import Group, GroupMember, GroupRuleChange, ScheduledGroupCall
+from app.models.prompt_template import PromptTemplate
+from app.models.scheduled_call import ScheduledCall
+from app.models.search import create_contact_search
+from app.models.group_rules import create_group_rule_triggers
+from app.services.group_index import group_index
+from app.services.dialog_archive import dialog_archive
+from app.models.tag import Tag, ContactTag
+from app.crud import contact as contact_crud
+from app.crud import dialog as dialog_crud
+from app.crud import group as group_crud
+from app.crud import prompt_template as template_crud
+from app.crud import scheduled_call as call_crud
+from app.crud import tag as tag_crud
+from app.crud import user as user_crud
+from app.crud.pagination import encode_cursor
+from app.schemas.group import GroupMemberCreate, ScheduledGroupCallUpdate
+from app.schemas.scheduled_call import ScheduledCallBulkCreate
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+# (название, вызов) — чтения и изменения, которые сначала ищут строку
+CHECKS: List[Tuple[str, Callable]] = [
+    ("user.get_user", lambda db: user_crud.get_user(db, 1)),
+    ("user.get_user_by_email", lambda db: user_crud.get_user_by_email(db, "plans@example.com")),
+    ("user.revoke_refresh_token", lambda db: user_crud.revoke_refresh_token(db, "token")),
+    ("contact.get_contact", lambda db: contact_crud.get_contact(db, 1, 1)),
+    ("contact.contact_exists", lambda db: contact_crud.contact_exists(db, 1, 1)),
+    ("contact.get_contact_by_phone", lambda db: contact_crud.get_contact_by_phone(db, 1, "0900 000 001")),
+    ("contact.search_contacts", lambda db: contact_crud.search_contacts(db, 1, "cont")),
+    ("contact.search_contacts(cursor)", lambda db: contact_crud.search_contacts(
+        db, 1, "cont", cursor=encode_cursor([-1.0, 1])
+    )),
+    ("contact.get_contacts", lambda db: contact_crud.get_contacts(db, 1)),
+    ("contact.get_contacts(cursor)", lambda db: contact_crud.get_contacts(db, 1, cursor=encode_cursor([1]))),
+    ("contact.get_contact_dialogs", lambda db: contact_crud.get_contact_dialogs(db, 1, 1)),
+    ("contact.get_contact_dialogs(cursor)", lambda db: contact_crud.get_contact_dialogs(
+        db, 1, 1, limit=20, cursor=encode_cursor([NOW, 2])
+    )),
+    ("dialog.archive_old_dialogs", lambda db: dialog_crud.archive_old_dialogs(db, now=NOW)),
+    ("dialog.get_dialogs(archived)", lambda db: dialog_crud.get_dialogs(db, 1, limit=20)),
+    ("dialog.get_dialog(archived)", lambda db: dialog_crud.get_dialog(db, 2, 1)),
+    ("dialog.dialog_exists", lambda db: dialog_crud.dialog_exists(db, 2, 1)),
+    ("dialog.get_dialog_messages(archived)", lambda db: dialog_crud.get_dialog_messages(db, 2, limit=100)),
+    ("dialog.get_dialog_summaries", lambda db: dialog_crud.get_dialog_summaries(db, 1, limit=20)),
+    ("dialog.get_dialog_messages(cursor)", lambda db: dialog_crud.get_dialog_messages(
+        db, 1, limit=100, cursor=encode_cursor([NOW, 1])
+    )),
+    ("dialog.get_dialog_messages(newest_first)", lambda db: dialog_crud.get_dialog_messages(
+        db, 1, limit=100, cursor=encode_cursor([NOW, 1]), newest_first=True
+    )),
+    ("dialog.iter_dialog_messages", lambda db: list(dialog_crud.iter_dialog_messages(db, 1))),
+    ("contact.add_dialog_message", lambda db: contact_crud.add_dialog_message(db, 1, "agent", "…")),
+    ("contact.import_contacts", lambda db: contact_crud.import_contacts(
+        db, [(2, {"name": "Plans", "phone": "+421900000001"})], user_id=1, group_id=1
+    )),
+    ("contact.iter_contacts_for_export", lambda db: list(contact_crud.iter_contacts_for_export(db, 1))),
+    ("dialog.iter_dialogs_for_export", lambda db: list(dialog_crud.iter_dialogs_for_export(db, 1))),
+    ("dialog.iter_dialogs_for_export(contact)", lambda db: list(dialog_crud.iter_dialogs_for_export(db, 1, contact_id=1))),
+    ("tag.get_tag_counts", lambda db: tag_crud.get_tag_counts(db, 1)),
+    ("tag.get_tag_names", lambda db: tag_crud.get_tag_names(db, [1, 2])),
+    ("tag.get_contacts_by_tags(any)", lambda db: tag_crud.get_contacts_by_tags(db, 1, ["VIP", "Bratislava"])),
+    ("tag.get_contacts_by_tags(all)", lambda db: tag_crud.get_contacts_by_tags(
+        db, 1, ["VIP", "Bratislava"], match=tag_crud.MATCH_ALL, cursor=encode_cursor([1])
+    )),
+    ("contact.delete_contact", lambda db: contact_crud.delete_contact(db, 2, 1)),
+    ("group.get_group", lambda db: group_crud.get_group(db, 1, 1)),
+    ("group.get_groups", lambda db: group_crud.get_groups(db, 1)),
+    ("group.get_groups(cursor)", lambda db: group_crud.get_groups(db, 1, cursor=encode_cursor([1]))),
+    ("group.add_group_member", lambda db: group_crud.add_group_member(db, GroupMemberCreate(group_id=1, contact_id=3), 1)),
+    ("group.remove_group_member", lambda db: group_crud.remove_group_member(db, 1, 3, 1)),
+    ("group.add_group_members", lambda db: group_crud.add_group_members(db, 1, [1, 2, 3], 1)),
+    ("group.remove_group_members", lambda db: group_crud.remove_group_members(db, 1, [3])),
+    ("group.replace_group_members", lambda db: group_crud.replace_group_members(db, 1, [1, 2], 1)),
+    ("group.refresh_dynamic_group", lambda db: group_crud.refresh_dynamic_group(db, group_crud.get_group(db, 2, 1))),
+    ("group.sync_dynamic_groups", lambda db: group_crud.sync_dynamic_groups(db, 1)),
+    ("group.combine_groups", lambda db: group_crud.combine_groups(db, 1, group_crud.SET_DIFFERENCE, [1, 2])),
+    ("group.update_scheduled_group_call", lambda db: group_crud.update_scheduled_group_call(
+        db, 1, ScheduledGroupCallUpdate(status="completed"), 1
+    )),
+    ("group.reconcile_group_counters", lambda db: group_crud.reconcile_group_counters(db, 1)),
+    ("group.get_group_call_targets", lambda db: group_crud.get_group_call_targets(db, 1, 2)),
+    ("group.count_group_members", lambda db: group_crud.count_group_members(db, 2)),
+    ("group.get_rule_call_targets", lambda db: group_crud.get_rule_call_targets(db, 1, {"company": "Acme"})),
+    ("group.get_group_members", lambda db: group_crud.get_group_members(db, 1, 1)),
+    ("group.get_group_contacts", lambda db: group_crud.get_group_contacts(db, 1, 1)),
+    ("group.load_group_details", lambda db: group_crud.load_group_details(db, [1], 1)),
+    ("group.get_scheduled_group_calls", lambda db: group_crud.get_scheduled_group_calls(db, 1)),
+    ("group.get_group_scheduled_calls", lambda db: group_crud.get_group_scheduled_calls(db, 1, 1)),
+    ("group.plan_group_call", lambda db: group_crud.plan_group_call(db, 1, 1)),
+    ("group.mark_group_call_as_attempted", lambda db: group_crud.mark_group_call_as_attempted(db, 1)),
+    ("prompt_template.get_prompt_templates", lambda db: template_crud.get_prompt_templates(db, 1)),
+    ("prompt_template.get_prompt_template", lambda db: template_crud.get_prompt_template(db, 1, 1)),
+    ("scheduled_call.get_scheduled_call", lambda db: call_crud.get_scheduled_call(db, 1, 1)),
+    ("scheduled_call.get_scheduled_calls", lambda db: call_crud.get_scheduled_calls(db, 1)),
+    ("scheduled_call.get_scheduled_calls(cursor)", lambda db: call_crud.get_scheduled_calls(db, 1, cursor=encode_cursor([1]))),
+    ("scheduled_call.get_upcoming_calls", lambda db: call_crud.get_upcoming_calls(db, 1)),
+    ("scheduled_call.get_scheduled_call_response", lambda db: call_crud.get_scheduled_call_response(db, 1, 1)),
+    ("scheduled_call.get_scheduled_call_responses(cursor)", lambda db: call_crud.get_scheduled_call_responses(
+        db, 1, cursor=encode_cursor([1])
+    )),
+    ("scheduled_call.get_upcoming_call_responses", lambda db: call_crud.get_upcoming_call_responses(db, 1)),
+    ("scheduled_call.get_contact_call_responses", lambda db: call_crud.get_contact_call_responses(db, 1, 1)),
+    ("scheduled_call.get_calls_for_retry", lambda db: call_crud.get_calls_for_retry(db)),
+    ("scheduled_call.get_dispatch_queue", lambda db: call_crud.get_dispatch_queue(db)),
+    ("scheduled_call.get_shared_dispatch_queue", lambda db: call_crud.get_shared_dispatch_queue(db, 1)),
+    ("scheduled_call.mark_calls_as_dispatched", lambda db: call_crud.mark_calls_as_dispatched(db, [1])),
+    ("scheduled_call.release_stuck_calls", lambda db: call_crud.release_stuck_calls(db)),
+    ("scheduled_call.mark_call_as_attempted", lambda db: call_crud.mark_call_as_attempted(db, 1, outcome="busy")),
+    ("scheduled_call.get_call_targets", lambda db: call_crud.get_call_targets(db, 1, [1, 2, 3])),
+    ("scheduled_call.create_scheduled_calls", lambda db: call_crud.create_scheduled_calls(
+        db, 1, [(1, None), (2, "Europe/Bratislava")],
+        ScheduledCallBulkCreate(contact_ids=[1, 2], scheduled_time=NOW + timedelta(hours=1))
+    )),
+    ("scheduled_call.recompute_eligibility", lambda db: call_crud.recompute_eligibility(db, contact_id=1)),
+    ("scheduled_call.recompute_eligibility_on_startup", lambda db: call_crud.recompute_eligibility_on_startup(db)),
+]
+
+
+# Очереди разбираются целиком, пока они малы, — их полный просмотр не ошибка
+SCANNED_BY_DESIGN = {"group_rule_changes"}
+
+
+@dataclass
+class PlanReport:
+    statements: int = 0
+    full_scans: List[Tuple[str, str, str]] = field(default_factory=list)  # (проверка, таблица, SQL)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.full_scans and not self.errors
+
+
+def full_scan_tables(plan_rows, tables) -> List[str]:
+    """Таблицы, которые план читает целиком: "SCAN contacts", но не "SCAN contacts USING INDEX ..." """
+    scanned = []
+    for row in plan_rows:
+        detail = row[-1]
+        if not detail.startswith("SCAN ") or " USING " in detail:
+            continue
+        name = detail.split()[1]
+        if name in tables:
+            scanned.append(name)
+    return scanned
+
+
+def seed(db):
+    """Минимальный набор строк, чтобы каждая проверка дошла до своих запросов"""
+    db.add(User(id=1, email="plans@example.com", password_hash="-", first_name="Plan", last_name="Check"))
+    db.add(RefreshToken(user_id=1, token="token", expires_at=NOW + timedelta(days=1)))
+    for contact_id in (1, 2, 3):
+        phone = f"+42190000000{contact_id}"
+        db.add(Contact(id=contact_id, user_id=1, name=f"Contact {contact_id}", phone=phone, phone_e164=phone))
+    db.add_all([Tag(id=1, user_id=1, name="VIP"), Tag(id=2, user_id=1, name="Bratislava")])
+    db.add_all([ContactTag(contact_id=1, tag_id=1), ContactTag(contact_id=1, tag_id=2)])
+    db.add(ContactDialog(id=1, contact_id=1, date=NOW))
+    db.add(DialogMessage(dialog_id=1, role="client", text="…", timestamp=NOW))
+    # Старый диалог — для архивации; диалог 3 с наибольшим id остаётся в горячих таблицах
+    db.add(ContactDialog(id=2, contact_id=1, date=NOW - timedelta(days=400)))
+    db.add(DialogMessage(dialog_id=2, role="client", text="…", timestamp=NOW - timedelta(days=400)))
+    db.add(ContactDialog(id=3, contact_id=2, date=NOW))
+    db.add(Group(id=1, user_id=1, name="Group"))
+    db.add(GroupMember(group_id=1, contact_id=1))
+    db.add(Group(
+        id=2, user_id=1, name="Dynamic", rules_synced_at=NOW - timedelta(days=1),
+        rules={"tags": ["VIP"], "tag_match": "all", "company": "Acme", "timezone": None, "no_dialog_days": 30}
+    ))
+    db.add(GroupRuleChange(contact_id=2))
+    db.add(ScheduledGroupCall(
+        id=1, user_id=1, group_id=1, exclude_group_ids=[2],
+        start_time_window=NOW, end_time_window=NOW + timedelta(hours=2)
+    ))
+    db.add(PromptTemplate(id=1, user_id=1, name="Template", content="…"))
+    db.add(ScheduledCall(id=1, user_id=1, contact_id=1, scheduled_time=NOW, next_eligible_at=NOW))
+    db.commit()
+
+
+def check_query_plans() -> PlanReport:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    configure_database()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        create_contact_search(conn)
+        create_group_rule_triggers(conn)
+    tables = set(Base.metadata.tables) - SCANNED_BY_DESIGN
+
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+            captured.append((statement, parameters))
+
+    report = PlanReport()
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    clock.set_source(SimulatedClock(NOW))
+    archive_dir = tempfile.TemporaryDirectory()
+    dialog_archive.directory = archive_dir.name
+    try:
+        with Session() as db:
+            seed(db)
+
+        for name, run in CHECKS:
+            captured.clear()
+            group_index.clear()  # Иначе битмапы из прошлых проверок скроют запросы загрузки
+            with Session() as db:
+                try:
+                    run(db)
+                except Exception as e:
+                    report.errors.append((name, repr(e)))
+                    continue
+
+            seen = set()
+            with engine.connect() as conn:
+                for statement, parameters in captured:
+                    if statement in seen:
+                        continue
+                    seen.add(statement)
+                    report.statements += 1
+                    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                    for table in full_scan_tables(plan, tables):
+                        report.full_scans.append((name, table, " ".join(statement.split())))
+    finally:
+        clock.reset()
+        dialog_archive.directory = settings.DIALOG_ARCHIVE_DIR
+        archive_dir.cleanup()
+    return report
+
+
+def main():
+    report = check_query_plans()
+    for name, table, statement in report.full_scans:
+        print(f"FULL SCAN {table} in {name}:\n    {statement}")
+    for name, error in report.errors:
+        print(f"ERROR in {name}: {error}")
+    print(f"Checked {report.statements} statements from {len(CHECKS)} CRUD calls: "
+          f"{len(report.full_scans)} full scans, {len(report.errors)} errors")
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
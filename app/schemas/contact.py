@@ -2,22 +2,41 @@
 from pydantic import BaseModel, validator
 from typing import List, Optional
 from datetime import datetime
+from app.services.eligibility import is_valid_timezone
+from app.services.phone import try_normalize_phone
 
 class ContactBase(BaseModel):
     name: str
     phone: str
     email: Optional[str] = None
     company: Optional[str] = None
+    timezone: Optional[str] = None
     script: Optional[str] = None
     tags: Optional[List[str]] = []
 
-class ContactCreate(ContactBase):
+class ContactInput(ContactBase):
+    """Проверки входящих данных; ответы (Contact) их не наследуют — старые записи могут им не соответствовать"""
+
+    @validator('phone')
+    def validate_phone(cls, v):
+        if not try_normalize_phone(v):
+            raise ValueError('Invalid phone number')
+        return v
+
+    @validator('timezone')
+    def validate_timezone(cls, v):
+        if v and not is_valid_timezone(v):
+            raise ValueError('Unknown timezone')
+        return v
+
+class ContactCreate(ContactInput):
     pass
 
-class ContactUpdate(ContactBase):
+class ContactUpdate(ContactInput):
     pass
 
 class DialogMessage(BaseModel):
+    id: Optional[int] = None
     role: str  # "agent" или "client"
     text: str
     timestamp: Optional[datetime] = None
@@ -31,17 +50,61 @@ class ContactDialog(BaseModel):
     date: datetime
     transcript: Optional[str] = None
     messages: List[DialogMessage] = []
+    archived: bool = False  # Читается из архива диалогов
     
     class Config:
         from_attributes = True
 
+class ContactDialogSummary(BaseModel):
+    id: int
+    contact_id: int
+    date: datetime
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
+    archived: bool = False
+
+    class Config:
+        from_attributes = True
+
 class Contact(ContactBase):
     id: int
     user_id: int
+    phone_e164: Optional[str] = None
     is_active: bool
     created_at: datetime
     updated_at: datetime
     dialogs: List[ContactDialog] = []
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ContactSearchHit(BaseModel):
+    id: int
+    name: str
+    phone: str
+    email: Optional[str] = None
+    company: Optional[str] = None
+    tags: List[str] = []
+    rank: float
+
+class TagCount(BaseModel):
+    id: int
+    name: str
+    contact_count: int
+
+    class Config:
+        from_attributes = True
+
+class ContactImportError(BaseModel):
+    line: int
+    error: str
+
+class ContactImportReport(BaseModel):
+    processed: int
+    inserted: int
+    duplicates: int
+    added_to_group: int
+    failed: int
+    errors: List[ContactImportError] = []
+    seconds: float
+    rows_per_second: float
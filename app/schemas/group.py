@@ -1,7 +1,18 @@
 # app/schemas/group.py
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
+from app.core.config import settings
+
+MAX_BULK_MEMBERS = 100000  # Контактов в одном запросе массового изменения состава группы
+
+class GroupRules(BaseModel):
+    """Правила динамической группы: контакт входит, если выполнены все заданные условия"""
+    tags: List[str] = []
+    tag_match: Literal["any", "all"] = "any"
+    company: Optional[str] = None
+    timezone: Optional[str] = None
+    no_dialog_days: Optional[int] = Field(None, ge=1)  # Нет диалогов за последние N дней
 
 class GroupBase(BaseModel):
     name: str
@@ -9,14 +20,16 @@ class GroupBase(BaseModel):
 
 class GroupCreate(GroupBase):
     contact_ids: Optional[List[int]] = []
+    rules: Optional[GroupRules] = None  # Задан — состав группы считается по правилам, contact_ids игнорируется
 
 class GroupUpdate(GroupBase):
-    pass
+    rules: Optional[GroupRules] = None  # null делает группу обычной с текущим составом
 
 class Group(GroupBase):
     id: int
     user_id: int
     is_active: bool
+    rules: Optional[GroupRules] = None
     created_at: datetime
     updated_at: datetime
     
@@ -37,6 +50,24 @@ class GroupMember(GroupMemberBase):
     class Config:
         from_attributes = True
 
+class GroupMembersBulk(BaseModel):
+    contact_ids: List[int] = Field(..., max_length=MAX_BULK_MEMBERS)
+
+class GroupMembershipChange(BaseModel):
+    group_id: int
+    added: int = 0
+    skipped: int = 0
+    removed: int = 0
+
+class GroupSetOperation(BaseModel):
+    group_ids: List[int] = Field(..., min_length=1)  # Для разности: первая группа минус остальные
+
+class GroupSetResult(BaseModel):
+    operation: str
+    group_ids: List[int]
+    count: int
+    contact_ids: Optional[List[int]] = None  # Не заполняется при count_only
+
 class GroupWithMembers(Group):
     members: List[GroupMember] = []
     contacts: List['Contact'] = []  # Будет определено позже
@@ -51,7 +82,8 @@ class ScheduledGroupCallBase(BaseModel):
     script: Optional[str] = None
     notes: Optional[str] = None
     retry_until_success: Optional[bool] = False
-    retry_interval: Optional[int] = 60
+    retry_interval: Optional[int] = settings.RETRY_DEFAULT_INTERVAL
+    exclude_group_ids: Optional[List[int]] = None  # Звонить участникам группы, кроме состоящих в этих группах
 
 class ScheduledGroupCallCreate(ScheduledGroupCallBase):
     pass
@@ -62,6 +94,7 @@ class ScheduledGroupCallUpdate(BaseModel):
     status: Optional[str] = None
     retry_until_success: Optional[bool] = None
     retry_interval: Optional[int] = None
+    exclude_group_ids: Optional[List[int]] = None
 
 class ScheduledGroupCall(ScheduledGroupCallBase):
     id: int
@@ -70,15 +103,27 @@ class ScheduledGroupCall(ScheduledGroupCallBase):
     call_attempts: int
     last_attempt_at: Optional[datetime] = None
     next_retry_at: Optional[datetime] = None
+    last_outcome: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+class GroupCallPlanResponse(BaseModel):
+    group_call_id: int
+    planned: int
+    unplaced: int
+    capacity: float
+    peak_concurrency: float
+    first_call_at: Optional[datetime] = None
+    last_call_at: Optional[datetime] = None
+
 class GroupResponse(GroupWithMembers):
     member_count: int = 0
+    active_member_count: int = 0
     scheduled_calls_count: int = 0
+    completed_calls_count: int = 0
     
     class Config:
         from_attributes = True
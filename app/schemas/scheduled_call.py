@@ -1,7 +1,11 @@
 # app/schemas/scheduled_call.py
-from pydantic import BaseModel, field_validator, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List
 from datetime import datetime
+from app.core.config import settings
+from app.schemas.group import GroupRules
+
+MAX_BULK_CALLS = 100000  # Контактов в одном запросе массового планирования
 
 class ScheduledCallBase(BaseModel):
     contact_id: int
@@ -10,34 +14,71 @@ class ScheduledCallBase(BaseModel):
     start_time_window: Optional[datetime] = None   # Начало временного окна
     end_time_window: Optional[datetime] = None     # Конец временного окна
     retry_until_success: Optional[bool] = False    # Повторять пока не дозвонимся
+    retry_interval: Optional[int] = settings.RETRY_DEFAULT_INTERVAL  # Базовый интервал повторения в минутах
     script: Optional[str] = None
     notes: Optional[str] = None
-    status: Optional[str] = "pending"  # pending, completed, failed, cancelled, retrying
+    status: Optional[str] = "pending"  # pending, completed, failed, cancelled, retrying, unplaced, expired
+    priority: Optional[int] = 0        # Чем больше, тем раньше в очереди
+
+def check_call_timing(values):
+    """Должен быть указан либо scheduled_time, либо оба временных окна"""
+    scheduled_time = values.scheduled_time
+    start_time_window = values.start_time_window
+    end_time_window = values.end_time_window
+
+    # Проверяем, что указано либо scheduled_time, либо оба временных окна
+    if not scheduled_time and not (start_time_window and end_time_window):
+        raise ValueError(
+            "Must specify either scheduled_time or both start_time_window and end_time_window"
+        )
+
+    if scheduled_time and (start_time_window or end_time_window):
+        raise ValueError(
+            "Cannot specify both scheduled_time and time windows"
+        )
+
+    if start_time_window and end_time_window and start_time_window >= end_time_window:
+        raise ValueError("start_time_window must be before end_time_window")
+
+    return values
 
 class ScheduledCallCreate(ScheduledCallBase):
     # Валидация: должен быть указан либо scheduled_time, либо оба временных окна
     @model_validator(mode="after")
     @classmethod
     def validate_timing(cls, values):
-        scheduled_time = values.scheduled_time
-        start_time_window = values.start_time_window
-        end_time_window = values.end_time_window
-
-        # Проверяем, что указано либо scheduled_time, либо оба временных окна
-        if not scheduled_time and not (start_time_window and end_time_window):
-            raise ValueError(
-                "Must specify either scheduled_time or both start_time_window and end_time_window"
-            )
+        return check_call_timing(values)
 
-        if scheduled_time and (start_time_window or end_time_window):
-            raise ValueError(
-                "Cannot specify both scheduled_time and time windows"
-            )
+class ScheduledCallBulkCreate(BaseModel):
+    """Одни настройки звонка для многих контактов: список id, группа или фильтр — ровно что-то одно"""
+    contact_ids: Optional[List[int]] = Field(None, max_length=MAX_BULK_CALLS)
+    group_id: Optional[int] = None
+    filter: Optional[GroupRules] = None
+    scheduled_time: Optional[datetime] = None
+    start_time_window: Optional[datetime] = None
+    end_time_window: Optional[datetime] = None
+    retry_until_success: Optional[bool] = False
+    retry_interval: Optional[int] = settings.RETRY_DEFAULT_INTERVAL
+    script: Optional[str] = None
+    notes: Optional[str] = None
+    priority: Optional[int] = 0
+    skip_scheduled: bool = True  # Не планировать контактам, у которых уже есть ожидающий звонок
 
-        if start_time_window and end_time_window and start_time_window >= end_time_window:
-            raise ValueError("start_time_window must be before end_time_window")
+    @model_validator(mode="after")
+    @classmethod
+    def validate_targets(cls, values):
+        targets = [values.contact_ids is not None, values.group_id is not None, values.filter is not None]
+        if sum(targets) != 1:
+            raise ValueError("Specify exactly one of contact_ids, group_id or filter")
+        return check_call_timing(values)
 
-        return values
+class ScheduledCallBulkResult(BaseModel):
+    requested: int
+    scheduled: int
+    not_found: int = 0          # Чужие, удалённые или несуществующие контакты (для группы — удалённые участники)
+    already_scheduled: int = 0  # Пропущены из-за skip_scheduled
+    expired: int = 0            # Созданы, но в окне нет разрешённых часов — набраны не будут
+    seconds: float = 0.0
 
 class ScheduledCallUpdate(BaseModel):
     # Делаем все поля необязательными для обновления
@@ -46,16 +87,21 @@ class ScheduledCallUpdate(BaseModel):
     start_time_window: Optional[datetime] = None
     end_time_window: Optional[datetime] = None
     retry_until_success: Optional[bool] = None
+    retry_interval: Optional[int] = None
     script: Optional[str] = None
     notes: Optional[str] = None
     status: Optional[str] = None
+    priority: Optional[int] = None
 
 class ScheduledCall(ScheduledCallBase):
     id: int
     user_id: int
+    group_call_id: Optional[int] = None  # Если звонок создан из группового
     call_attempts: int = 0  # Количество попыток звонка
     last_attempt_at: Optional[datetime] = None  # Время последней попытки
     next_retry_at: Optional[datetime] = None    # Время следующей попытки
+    last_outcome: Optional[str] = None          # Исход последней попытки
+    next_eligible_at: Optional[datetime] = None # Когда звонок можно набирать (часы контакта)
     created_at: datetime
     updated_at: datetime
     
@@ -68,4 +114,12 @@ class ScheduledCallResponse(ScheduledCall):
     contact_company: Optional[str] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DispatchQueueItem(BaseModel):
+    call_id: int
+    contact_id: int
+    priority: int = 0
+    deadline: datetime
+    planned_start: datetime
+    at_risk: bool = False  # Не успевает в окно при текущей ёмкости
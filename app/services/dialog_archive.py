@@ -0,0 +1,190 @@
+# app/services/dialog_archive.py
+"""
+Архив старых диалогов в сегментных файлах.
+
+Диалог с сообщениями — одна запись: заголовок (id диалога, длина, CRC32) и
+сжатый zlib JSON. Записи только дописываются в конец текущего сегмента;
+сегмент больше DIALOG_ARCHIVE_SEGMENT_SIZE закрывается и начинается следующий.
+Где лежит диалог, знает таблица archived_dialogs (сегмент, смещение, длина),
+поэтому чтение — один seek и одна распаковка. Записанное не меняется, так что
+прочитанные диалоги можно кэшировать без сброса; записи неизменяемые
+(frozen, сообщения — кортеж), и общий объект из кэша никто не испортит. Перенос из горячих таблиц —
+app/crud/dialog.py:archive_old_dialogs. Запуск из консоли:
+
+    python -m app.services.dialog_archive [--older-than-days 180]
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+from app.core.config import settings
+
+HEADER = struct.Struct("<QII")  # id диалога, длина сжатых данных, CRC32 сжатых данных
+SEGMENT_PREFIX = "dialogs-"
+SEGMENT_SUFFIX = ".seg"
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveCorrupted(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class MessageRecord:
+    id: int
+    role: str
+    text: str
+    timestamp: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class DialogRecord:
+    """Диалог из архива; атрибуты как у ContactDialog, чтобы ответы API собирались так же"""
+    id: int
+    contact_id: int
+    date: datetime
+    transcript: Optional[str] = None
+    messages: Tuple[MessageRecord, ...] = ()
+    archived: bool = True
+
+
+def _datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def encode_dialog(dialog, messages) -> bytes:
+    """Диалог и его сообщения (строки с id, role, text, timestamp) -> сжатая запись без заголовка"""
+    payload = {
+        "id": dialog.id,
+        "contact_id": dialog.contact_id,
+        "date": dialog.date.isoformat() if dialog.date else None,
+        "transcript": dialog.transcript,
+        "messages": [
+            [m.id, m.role, m.text, m.timestamp.isoformat() if m.timestamp else None] for m in messages
+        ],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, settings.TEXT_COMPRESSION_LEVEL)
+
+
+def decode_dialog(data: bytes) -> DialogRecord:
+    payload = json.loads(zlib.decompress(data))
+    return DialogRecord(
+        id=payload["id"],
+        contact_id=payload["contact_id"],
+        date=_datetime(payload["date"]),
+        transcript=payload["transcript"],
+        messages=tuple(
+            MessageRecord(id=m_id, role=role, text=text, timestamp=_datetime(timestamp))
+            for m_id, role, text, timestamp in payload["messages"]
+        ),
+    )
+
+
+class DialogArchive:
+    def __init__(self, directory: str, segment_size: int):
+        self.directory = directory
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+
+    def _segments(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _current_segment(self) -> str:
+        segments = self._segments()
+        if segments and os.path.getsize(os.path.join(self.directory, segments[-1])) < self.segment_size:
+            return segments[-1]
+        number = int(segments[-1][len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if segments else 1
+        return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    def append(self, records: List[Tuple[int, bytes]]) -> List[Tuple[str, int, int]]:
+        """
+        Дописывает записи (id диалога, данные из encode_dialog) и сбрасывает их на диск.
+        Возвращает (сегмент, смещение, длина) для каждой записи в том же порядке.
+        Вызывающий держит транзакцию писателя базы, поэтому процессы не пишут в сегмент одновременно.
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            segment = self._current_segment()
+            locations = []
+            with open(os.path.join(self.directory, segment), "ab") as f:
+                offset = f.tell()
+                for dialog_id, data in records:
+                    f.write(HEADER.pack(dialog_id, len(data), zlib.crc32(data)))
+                    f.write(data)
+                    locations.append((segment, offset, len(data)))
+                    offset += HEADER.size + len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            return locations
+
+    def read(self, dialog_id: int, segment: str, offset: int, length: int) -> DialogRecord:
+        return _read_record(self.directory, dialog_id, segment, offset, length)
+
+
+@lru_cache(maxsize=256)
+def _read_record(directory: str, dialog_id: int, segment: str, offset: int, length: int) -> DialogRecord:
+    with open(os.path.join(directory, segment), "rb") as f:
+        f.seek(offset)
+        header = f.read(HEADER.size)
+        data = f.read(length)
+    if len(header) < HEADER.size or len(data) < length:
+        raise ArchiveCorrupted(f"Archived dialog {dialog_id} is truncated in {segment}")
+    stored_id, stored_length, checksum = HEADER.unpack(header)
+    if stored_id != dialog_id or stored_length != length or zlib.crc32(data) != checksum:
+        raise ArchiveCorrupted(f"Archived dialog {dialog_id} does not match its record in {segment}")
+    return decode_dialog(data)
+
+
+dialog_archive = DialogArchive(settings.DIALOG_ARCHIVE_DIR, settings.DIALOG_ARCHIVE_SEGMENT_SIZE)
+
+
+def archive_periodically(interval_hours: float):
+    """Фоновый цикл: раз в interval_hours переносит в архив диалоги старше DIALOG_ARCHIVE_AFTER_DAYS"""
+    from app.database import SessionLocal
+    from app.crud.dialog import archive_old_dialogs
+
+    while True:
+        try:
+            with SessionLocal() as db:
+                archived = archive_old_dialogs(db)
+            if archived:
+                logger.info(f"📦 Archived {archived} dialogs")
+        except Exception:
+            logger.exception("❌ Dialog archival failed")
+        time.sleep(interval_hours * 3600)
+
+
+def main():
+    from app.database import SessionLocal, configure_database
+    from app.crud.dialog import archive_old_dialogs
+
+    parser = argparse.ArgumentParser(description="Перенос старых диалогов в архив")
+    parser.add_argument("--older-than-days", type=int, default=settings.DIALOG_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    configure_database()
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        archived = archive_old_dialogs(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    print(json.dumps({"archived": archived, "seconds": round(time.perf_counter() - started, 3)}))
+
+
+if __name__ == "__main__":
+    main()
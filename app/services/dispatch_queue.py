@@ -0,0 +1,135 @@
+# app/services/dispatch_queue.py
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+import heapq
+import itertools
+import logging
+import time
+
+from app.core.clock import clock
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def call_ready_at(call) -> Optional[datetime]:
+    """Время, с которого звонок можно набирать"""
+    if call.status == "retrying":
+        return call.next_retry_at
+    return call.scheduled_time or call.start_time_window
+
+
+def call_deadline(call) -> Optional[datetime]:
+    """Крайний срок звонка: конец временного окна, иначе время готовности + допустимая задержка"""
+    if call.end_time_window:
+        return call.end_time_window
+    ready_at = call_ready_at(call)
+    if ready_at:
+        return ready_at + timedelta(minutes=settings.DISPATCH_DEFAULT_SLACK)
+    return None
+
+
+@dataclass(order=True)
+class QueueEntry:
+    sort_key: float
+    seq: int
+    call: object = field(compare=False)
+    deadline: datetime = field(compare=False)
+
+
+@dataclass
+class AdmissionResult:
+    """Результат проверки: ожидаемое время старта каждого звонка и звонки, которые не успевают"""
+    planned_starts: dict = field(default_factory=dict)  # call_id -> datetime
+    at_risk: List[int] = field(default_factory=list)
+
+
+class DispatchQueue:
+    """
+    Очередь звонков по принципу Earliest Deadline First.
+
+    Ключ сортировки — крайний срок (end_time_window), сдвинутый на приоритет
+    и на время ожидания (aging), чтобы низкоприоритетные звонки не голодали.
+    При перегрузке первыми уходят звонки, ближе всего к концу окна.
+    """
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or clock.now()
+        self._heap: List[QueueEntry] = []
+        self._seq = itertools.count()
+
+    def sort_key(self, call, deadline: datetime) -> float:
+        key = (deadline - self.now).total_seconds()
+        key -= (getattr(call, "priority", 0) or 0) * settings.DISPATCH_PRIORITY_STEP
+        ready_at = call_ready_at(call)
+        if ready_at and ready_at < self.now:
+            key -= (self.now - ready_at).total_seconds() * settings.DISPATCH_AGING_FACTOR
+        return key
+
+    def push(self, call):
+        deadline = call_deadline(call) or self.now
+        heapq.heappush(self._heap, QueueEntry(self.sort_key(call, deadline), next(self._seq), call, deadline))
+
+    def extend(self, calls: Iterable):
+        for call in calls:
+            self.push(call)
+
+    def pop(self):
+        return heapq.heappop(self._heap).call
+
+    def __len__(self):
+        return len(self._heap)
+
+    def ordered(self) -> List[QueueEntry]:
+        """Все элементы в порядке отправки (без изменения очереди)"""
+        return sorted(self._heap)
+
+    def admission_check(
+        self,
+        max_concurrency: int = None,
+        call_duration: int = None,
+        cps_limit: float = None
+    ) -> AdmissionResult:
+        """
+        Проверяет, успевают ли звонки в свои окна при текущей ёмкости дозвонщика.
+        Звонки отправляются в порядке очереди: max_concurrency линий, каждая занята
+        call_duration секунд, не чаще cps_limit звонков в секунду.
+        """
+        max_concurrency = max_concurrency or settings.DIALER_MAX_CONCURRENCY
+        call_duration = call_duration or settings.EXPECTED_CALL_DURATION
+        cps_limit = cps_limit or settings.TWILIO_CPS_LIMIT
+
+        result = AdmissionResult()
+        lines = [0.0] * max_concurrency  # Через сколько секунд освободится линия
+        heapq.heapify(lines)
+        next_start = 0.0
+        for entry in self.ordered():
+            start = max(heapq.heappop(lines), next_start)
+            ready_at = getattr(entry.call, "next_eligible_at", None) or call_ready_at(entry.call)
+            if ready_at and ready_at > self.now:
+                start = max(start, (ready_at - self.now).total_seconds())
+            heapq.heappush(lines, start + call_duration)
+            next_start = start + 1.0 / cps_limit
+
+            planned_start = self.now + timedelta(seconds=start)
+            result.planned_starts[entry.call.id] = planned_start
+            if planned_start > entry.deadline:
+                result.at_risk.append(entry.call.id)
+        return result
+
+
+def release_stuck_calls_periodically(interval_minutes: float):
+    """Фоновый цикл: раз в interval_minutes возвращает звонки, зависшие в dialing дольше DIALING_TIMEOUT"""
+    from app.database import SessionLocal
+    from app.crud.scheduled_call import release_stuck_calls
+
+    while True:
+        try:
+            with SessionLocal() as db:
+                released = release_stuck_calls(db)
+            if released:
+                logger.info(f"📞 Released {len(released)} calls stuck in dialing")
+        except Exception:
+            logger.exception("❌ Releasing stuck calls failed")
+        time.sleep(interval_minutes * 60)
@@ -0,0 +1,78 @@
+# app/services/eligibility.py
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from functools import lru_cache
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=None)
+def get_zone(tz_name: Optional[str]) -> ZoneInfo:
+    """ZoneInfo по имени; неизвестные и пустые имена — часовой пояс по умолчанию"""
+    try:
+        return ZoneInfo(tz_name or settings.DEFAULT_CONTACT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.DEFAULT_CONTACT_TIMEZONE)
+
+
+def is_valid_timezone(tz_name: str) -> bool:
+    try:
+        ZoneInfo(tz_name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+@dataclass(frozen=True)
+class CallingHours:
+    """Разрешённые часы звонков в местном времени контакта"""
+    start: time
+    end: time
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4, 5, 6)  # 0 = понедельник
+
+    def next_eligible(
+        self, ready_at: datetime, tz_name: Optional[str], not_after: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        Ближайший момент >= ready_at, попадающий в разрешённые часы контакта.
+        not_after — конец окна звонка: если до него разрешённых часов нет, возвращает None.
+        Вход и выход — naive UTC, как и все даты в базе.
+        """
+        zone = get_zone(tz_name)
+        local = ready_at.replace(tzinfo=timezone.utc).astimezone(zone)
+        eligible = ready_at  # Нет ни одного разрешённого дня — не ограничиваем
+
+        for _ in range(8):
+            if local.weekday() in self.weekdays:
+                day_start = datetime.combine(local.date(), self.start, tzinfo=zone)
+                day_end = datetime.combine(local.date(), self.end, tzinfo=zone)
+                if local < day_start:
+                    local = day_start
+                if local < day_end:
+                    eligible = local.astimezone(timezone.utc).replace(tzinfo=None)
+                    break
+            # Переходим к началу следующего дня
+            local = datetime.combine(local.date() + timedelta(days=1), time(0), tzinfo=zone)
+
+        if not_after is not None and eligible >= not_after:
+            return None
+        return eligible
+
+    def fingerprint(self) -> str:
+        """Отпечаток правил: при его смене рассчитанные next_eligible_at устаревают"""
+        days = ",".join(str(day) for day in self.weekdays)
+        return f"{self.start.isoformat()}-{self.end.isoformat()};{days};{settings.DEFAULT_CONTACT_TIMEZONE}"
+
+
+def calling_hours_from_settings() -> CallingHours:
+    return CallingHours(
+        start=time.fromisoformat(settings.CALLING_HOURS_START),
+        end=time.fromisoformat(settings.CALLING_HOURS_END),
+        weekdays=tuple(int(day) for day in settings.CALLING_DAYS.split(",") if day.strip())
+    )
+
+
+# Глобальные правила разрешённых часов
+calling_hours = calling_hours_from_settings()
@@ -0,0 +1,71 @@
+# app/services/export.py
+"""
+Сериализация выгрузок в CSV или NDJSON потоком.
+
+Строки приходят генератором словарей и превращаются в текст кусками примерно
+по BUFFER_SIZE символов: в памяти — только текущий кусок, а StreamingResponse
+не дёргается на каждой строке.
+"""
+from datetime import datetime
+from typing import Iterable, Iterator, Sequence
+import csv
+import io
+import json
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON)
+MEDIA_TYPES = {FORMAT_CSV: "text/csv; charset=utf-8", FORMAT_NDJSON: "application/x-ndjson"}
+
+BUFFER_SIZE = 64 * 1024
+LIST_SEPARATOR = ";"  # Списки в CSV — через ";", как их читает импорт контактов
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATOR.join(str(item) for item in value)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_csv(columns: Sequence[str], rows: Iterable[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(row.get(column)) for column in columns])
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(columns: Sequence[str], rows: Iterable[dict]) -> Iterator[str]:
+    chunk, size = [], 0
+    for row in rows:
+        line = json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False, default=_json_default)
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= BUFFER_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk, size = [], 0
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def serialize(fmt: str, columns: Sequence[str], rows: Iterable[dict]) -> Iterator[str]:
+    if fmt == FORMAT_CSV:
+        return iter_csv(columns, rows)
+    if fmt == FORMAT_NDJSON:
+        return iter_ndjson(columns, rows)
+    raise ValueError(f"Unsupported format: {fmt}")
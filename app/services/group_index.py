@@ -0,0 +1,100 @@
+# app/services/group_index.py
+"""
+Кэш битмапов участников групп в памяти процесса.
+
+Битмап группы строится лениво, при первом обращении, и хранится вместе с
+Group.members_version, прочитанной перед загрузкой. Вызывающий передаёт
+текущие версии из базы, и битмап другой версии не используется — так кэш
+видит изменения, сделанные другими процессами (несколько воркеров uvicorn).
+Свои коммиты сбрасывают битмап сразу, не дожидаясь сверки версии:
+ORM-изменения GroupMember видит after_flush, Core-вставки и удаления
+отмечаются через mark_group_changed. Загрузка, начатая до сброса, в кэш не
+попадает (сверка поколения).
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Tuple
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.bitmap import ContactBitmap
+
+# group_id -> id контактов; загрузчик получает только группы, которых нет в кэше
+Loader = Callable[[list], Dict[int, Iterable[int]]]
+
+_CHANGED_GROUPS = "changed_group_ids"
+
+
+class GroupMembershipIndex:
+    def __init__(self, max_groups: int = 1000):
+        self.max_groups = max_groups
+        self._bitmaps: "OrderedDict[int, Tuple[int, ContactBitmap]]" = OrderedDict()  # group_id -> (версия, битмап)
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, versions: Dict[int, int], load: Loader) -> Dict[int, ContactBitmap]:
+        """Битмапы групп; versions — group_id -> members_version из базы"""
+        with self._lock:
+            found = {}
+            for group_id, version in versions.items():
+                cached = self._bitmaps.get(group_id)
+                if cached and cached[0] == version:
+                    self._bitmaps.move_to_end(group_id)
+                    found[group_id] = cached[1]
+            missing = [group_id for group_id in versions if group_id not in found]
+            generations = {group_id: self._generations.get(group_id, 0) for group_id in missing}
+        if not missing:
+            return found
+
+        loaded = {group_id: ContactBitmap.from_ids(ids) for group_id, ids in load(missing).items()}
+        with self._lock:
+            for group_id in missing:
+                bitmap = loaded.get(group_id, ContactBitmap())
+                found[group_id] = bitmap
+                if self._generations.get(group_id, 0) == generations[group_id]:
+                    self._bitmaps[group_id] = (versions[group_id], bitmap)
+                    self._bitmaps.move_to_end(group_id)
+            while len(self._bitmaps) > self.max_groups:
+                self._bitmaps.popitem(last=False)
+        return found
+
+    def invalidate(self, group_ids: Iterable[int]):
+        with self._lock:
+            for group_id in group_ids:
+                self._bitmaps.pop(group_id, None)
+                self._generations[group_id] = self._generations.get(group_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._bitmaps.clear()
+            self._generations.clear()
+
+
+group_index = GroupMembershipIndex(max_groups=settings.GROUP_INDEX_MAX_GROUPS)
+
+
+def mark_group_changed(session: Session, group_ids: Iterable[int]):
+    """Отмечает группы, участников которых меняет текущая транзакция (Core-запросы мимо ORM)"""
+    session.info.setdefault(_CHANGED_GROUPS, set()).update(group_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_member_changes(session, flush_context):
+    from app.models.group import GroupMember
+    changed = [obj.group_id for obj in (*session.new, *session.deleted) if isinstance(obj, GroupMember)]
+    if changed:
+        mark_group_changed(session, changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_groups(session):
+    changed = session.info.pop(_CHANGED_GROUPS, None)
+    if changed:
+        group_index.invalidate(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_groups(session, previous_transaction):
+    session.info.pop(_CHANGED_GROUPS, None)
@@ -0,0 +1,128 @@
+# app/services/pacing.py
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+import math
+
+from app.core.config import settings
+
+
+@dataclass
+class PacingPlan:
+    """Результат планирования: (id, время звонка) и то, что не поместилось в окно"""
+    slots: List[Tuple[int, datetime]] = field(default_factory=list)
+    unplaced: List[int] = field(default_factory=list)
+    capacity: float = 0.0          # Сколько звонков ещё помещается в окно
+    peak_concurrency: float = 0.0  # Пиковая ожидаемая нагрузка (с учётом уже забронированных звонков)
+
+
+class PacingPlanner:
+    """
+    Распределяет звонки группы равномерно по временному окну.
+
+    Окно делится на корзины по bucket_seconds. Для каждой корзины считается,
+    сколько звонков ещё можно начать с учётом:
+      - максимальной конкурентности дозвонщика (max_concurrency),
+      - лимита Twilio на звонки в секунду (cps_limit),
+      - уже забронированных звонков других кампаний,
+      - ожидаемой длительности звонка.
+    Звонки раскладываются пропорционально свободной ёмкости, поэтому профиль
+    нагрузки получается гладким, без пика в начале окна.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        cps_limit: float = None,
+        call_duration: int = None,
+        bucket_seconds: int = 60
+    ):
+        self.max_concurrency = max_concurrency or settings.DIALER_MAX_CONCURRENCY
+        self.cps_limit = cps_limit or settings.TWILIO_CPS_LIMIT
+        self.call_duration = call_duration or settings.EXPECTED_CALL_DURATION
+        self.bucket_seconds = bucket_seconds
+
+    def _booked_load(self, start: datetime, buckets: int, booked: Sequence[datetime]) -> Tuple[List[float], List[int]]:
+        """Средняя занятость линий и число стартов в каждой корзине от уже забронированных звонков"""
+        load = [0.0] * buckets
+        starts = [0] * buckets
+        step = self.bucket_seconds
+        for booked_at in booked:
+            offset = (booked_at - start).total_seconds()
+            end_offset = offset + self.call_duration
+            if end_offset <= 0 or offset >= buckets * step:
+                continue
+            if offset >= 0:
+                starts[int(offset // step)] += 1
+            first = max(0, int(offset // step))
+            last = min(buckets - 1, int(end_offset // step))
+            for b in range(first, last + 1):
+                overlap = min(end_offset, (b + 1) * step) - max(offset, b * step)
+                if overlap > 0:
+                    load[b] += overlap / step
+        return load, starts
+
+    def bucket_capacity(self, start: datetime, end: datetime, booked: Sequence[datetime] = ()) -> List[float]:
+        """Сколько новых звонков можно начать в каждой корзине окна"""
+        step = self.bucket_seconds
+        buckets = max(1, math.ceil((end - start).total_seconds() / step))
+        load, starts = self._booked_load(start, buckets, booked)
+
+        capacity = []
+        for b in range(buckets):
+            free_lines = max(0.0, self.max_concurrency - load[b])
+            by_lines = free_lines * step / self.call_duration
+            by_cps = max(0.0, self.cps_limit * step - starts[b])
+            capacity.append(min(by_lines, by_cps))
+
+        # Последняя корзина может быть неполной
+        tail = (end - start).total_seconds() - (buckets - 1) * step
+        if 0 < tail < step:
+            capacity[-1] *= tail / step
+        return capacity
+
+    def plan(
+        self,
+        item_ids: Sequence[int],
+        start: datetime,
+        end: datetime,
+        booked: Sequence[datetime] = ()
+    ) -> PacingPlan:
+        """Планирует время звонка для каждого id в окне [start, end)"""
+        if not item_ids or end <= start:
+            return PacingPlan(unplaced=list(item_ids))
+
+        capacity = self.bucket_capacity(start, end, booked)
+        cumulative = []
+        total = 0.0
+        for cap in capacity:
+            total += cap
+            cumulative.append(total)
+
+        placed_count = min(len(item_ids), int(total))
+        plan = PacingPlan(capacity=total, unplaced=list(item_ids[placed_count:]))
+        if placed_count == 0:
+            return plan
+
+        # Равномерно раскладываем по кумулятивной ёмкости
+        step = self.bucket_seconds
+        per_bucket = [0] * len(capacity)
+        for i, item_id in enumerate(item_ids[:placed_count]):
+            target = (i + 0.5) * total / placed_count
+            b = min(bisect_left(cumulative, target), len(capacity) - 1)
+            previous = cumulative[b - 1] if b > 0 else 0.0
+            fraction = (target - previous) / capacity[b] if capacity[b] else 0.0
+            planned_at = start + timedelta(seconds=(b + fraction) * step)
+            plan.slots.append((item_id, planned_at.replace(microsecond=0)))
+            per_bucket[b] += 1
+
+        load, _ = self._booked_load(start, len(capacity), booked)
+        plan.peak_concurrency = max(
+            load[b] + per_bucket[b] * self.call_duration / step for b in range(len(capacity))
+        )
+        return plan
+
+
+# Глобальный экземпляр планировщика
+pacing_planner = PacingPlanner()
@@ -0,0 +1,43 @@
+# app/services/phone.py
+"""
+Приведение телефонов к E.164 ("+" и до 15 цифр, код страны не с нуля).
+
+Номер с "+" или международным префиксом 00 уже содержит код страны.
+Национальный номер с ведущим 0 ("0900 123 456") получает код страны по
+умолчанию (DEFAULT_PHONE_COUNTRY_CODE) вместо нуля. Остальные цифры
+считаются номером с кодом страны без "+", как их часто пишут в таблицах.
+"""
+from typing import Optional
+import re
+
+from app.core.config import settings
+
+_NON_DIGITS = re.compile(r"\D")
+
+E164_MIN_DIGITS = 8
+E164_MAX_DIGITS = 15
+
+
+def normalize_phone(raw: str, default_country_code: Optional[str] = None) -> str:
+    """Номер в E.164; номер, который нельзя привести, — ValueError"""
+    value = (raw or "").strip()
+    digits = _NON_DIGITS.sub("", value)
+
+    if value.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("0"):
+        digits = (default_country_code or settings.DEFAULT_PHONE_COUNTRY_CODE) + digits[1:]
+
+    if not E164_MIN_DIGITS <= len(digits) <= E164_MAX_DIGITS or digits.startswith("0"):
+        raise ValueError(f"Invalid phone number: {raw!r}")
+    return "+" + digits
+
+
+def try_normalize_phone(raw: Optional[str]) -> Optional[str]:
+    """То же, но None вместо ошибки — для старых данных и номеров из вебхуков"""
+    try:
+        return normalize_phone(raw)
+    except ValueError:
+        return None
@@ -0,0 +1,166 @@
+# app/services/retry_policy.py
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import random
+import logging
+
+from app.core.clock import clock
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Исходы попытки звонка (совпадают со статусами Twilio)
+OUTCOME_COMPLETED = "completed"
+OUTCOME_BUSY = "busy"
+OUTCOME_NO_ANSWER = "no-answer"
+OUTCOME_FAILED = "failed"
+
+
+class RetryStrategy:
+    """Базовая стратегия расчёта задержки перед следующей попыткой"""
+
+    def delay(self, attempt: int, base: timedelta, previous: Optional[timedelta], rng: random.Random) -> timedelta:
+        raise NotImplementedError
+
+
+class FixedStrategy(RetryStrategy):
+    """Фиксированный интервал с небольшим разбросом (jitter)"""
+
+    def __init__(self, jitter: float = 0.1):
+        self.jitter = jitter
+
+    def delay(self, attempt, base, previous, rng):
+        spread = base.total_seconds() * self.jitter
+        return base + timedelta(seconds=rng.uniform(-spread, spread))
+
+
+class ExponentialStrategy(RetryStrategy):
+    """Экспоненциальный рост интервала: base * factor^(attempt-1), с ограничением cap"""
+
+    def __init__(self, factor: float = 2.0, cap: timedelta = timedelta(hours=12), jitter: float = 0.1):
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+
+    def delay(self, attempt, base, previous, rng):
+        seconds = base.total_seconds() * (self.factor ** max(attempt - 1, 0))
+        seconds = min(seconds, self.cap.total_seconds())
+        spread = seconds * self.jitter
+        return timedelta(seconds=seconds + rng.uniform(-spread, spread))
+
+
+class DecorrelatedJitterStrategy(RetryStrategy):
+    """
+    Decorrelated jitter: delay = min(cap, uniform(base, previous * 3)).
+    Разносит повторы равномерно по времени, чтобы они не попадали в одну минуту.
+    """
+
+    def __init__(self, cap: timedelta = timedelta(hours=12)):
+        self.cap = cap
+
+    def delay(self, attempt, base, previous, rng):
+        low = base.total_seconds()
+        high = max(low, (previous.total_seconds() if previous else low) * 3)
+        return timedelta(seconds=min(self.cap.total_seconds(), rng.uniform(low, high)))
+
+
+STRATEGIES = {
+    "fixed": FixedStrategy,
+    "exponential": ExponentialStrategy,
+    "decorrelated_jitter": DecorrelatedJitterStrategy,
+}
+
+
+@dataclass
+class OutcomeRule:
+    """Правило повтора для конкретного исхода звонка"""
+    strategy: RetryStrategy
+    max_attempts: int
+    interval_factor: float = 1.0  # Множитель к retry_interval звонка
+
+
+@dataclass
+class RetryDecision:
+    """Результат расчёта: статус и время следующей попытки"""
+    status: str
+    next_retry_at: Optional[datetime] = None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Политика повторов звонков.
+
+    Базовый интервал берётся из retry_interval звонка (в минутах), правило
+    выбирается по исходу попытки (busy / no-answer / failed). Время следующей
+    попытки всегда попадает во временное окно звонка.
+    """
+    rules: Dict[str, OutcomeRule] = field(default_factory=dict)
+    default_interval: int = settings.RETRY_DEFAULT_INTERVAL
+    max_attempts: int = 10
+    rng: random.Random = field(default_factory=random.Random)
+
+    def rule_for(self, outcome: Optional[str]) -> OutcomeRule:
+        return self.rules.get(outcome or OUTCOME_FAILED) or self.rules[OUTCOME_FAILED]
+
+    def decide(self, call, outcome: Optional[str], now: Optional[datetime] = None) -> RetryDecision:
+        """
+        Рассчитывает новый статус звонка после попытки.
+        Ожидается, что call.call_attempts уже увеличен на текущую попытку.
+        """
+        now = now or clock.now()
+
+        if outcome == OUTCOME_COMPLETED:
+            return RetryDecision(status="completed")
+
+        if not call.retry_until_success:
+            return RetryDecision(status="failed")
+
+        rule = self.rule_for(outcome)
+        attempts = call.call_attempts or 0
+        if attempts >= min(rule.max_attempts, self.max_attempts):
+            return RetryDecision(status="failed")
+
+        interval = getattr(call, "retry_interval", None) or self.default_interval
+        base = timedelta(minutes=interval * rule.interval_factor)
+
+        # Предыдущая задержка нужна для decorrelated jitter
+        previous = None
+        if call.next_retry_at and call.last_attempt_at and call.next_retry_at > call.last_attempt_at:
+            previous = call.next_retry_at - call.last_attempt_at
+
+        next_retry_at = now + rule.strategy.delay(attempts, base, previous, self.rng)
+
+        # Учитываем временное окно звонка
+        if call.start_time_window and next_retry_at < call.start_time_window:
+            next_retry_at = call.start_time_window
+        if call.end_time_window and next_retry_at > call.end_time_window:
+            return RetryDecision(status="failed")
+
+        return RetryDecision(status="retrying", next_retry_at=next_retry_at)
+
+
+def build_retry_policy(rng: Optional[random.Random] = None) -> RetryPolicy:
+    """Создаёт политику повторов из настроек"""
+    strategy_cls = STRATEGIES.get(settings.RETRY_STRATEGY, DecorrelatedJitterStrategy)
+    max_attempts = settings.RETRY_MAX_ATTEMPTS
+
+    rules = {
+        # Занято — абонент рядом с телефоном, пробуем раньше
+        OUTCOME_BUSY: OutcomeRule(strategy_cls(), max_attempts, interval_factor=0.25),
+        # Не ответил — обычный интервал
+        OUTCOME_NO_ANSWER: OutcomeRule(strategy_cls(), max_attempts),
+        # Ошибка — экспоненциально и меньше попыток
+        OUTCOME_FAILED: OutcomeRule(ExponentialStrategy(), max(1, max_attempts // 2)),
+    }
+    return RetryPolicy(
+        rules=rules,
+        default_interval=settings.RETRY_DEFAULT_INTERVAL,
+        max_attempts=max_attempts,
+        rng=rng or random.Random(),
+    )
+
+
+# Глобальный экземпляр политики
+retry_policy = build_retry_policy()
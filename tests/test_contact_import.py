@@ -0,0 +1,89 @@
+import io
+
+import pytest
+
+from app.crud.contact import import_contacts
+from app.crud.group import create_group
+from app.models.contact import Contact
+from app.models.group import GroupMember
+from app.schemas.group import GroupCreate
+from app.services.contact_import import detect_format, iter_records, validate_record
+
+CSV = (
+    "name,phone,email,tags\n"
+    "Anna,+421 911 000 001,anna@example.com,vip;lead\n"
+    "Boris,+421911000002,,\n"
+    ",+421911000003,,\n"
+    "Anna again,00421911000001,,\n"
+).encode()
+
+
+def test_csv_and_ndjson_are_parsed_line_by_line():
+    records = list(iter_records(io.BytesIO(CSV), "csv"))
+    assert [line for line, _ in records] == [2, 3, 4, 5]
+    ndjson = b'{"name": "A", "phone": "+421911000009"}\n\nnot json\n[1]\n'
+    parsed = list(iter_records(io.BytesIO(ndjson), detect_format("list.ndjson")))
+    assert parsed[0] == (1, {"name": "A", "phone": "+421911000009"})
+    assert [str(record) for _, record in parsed[1:]] == ["Invalid JSON", "Expected a JSON object"]
+
+
+def test_validate_record_normalizes_and_rejects():
+    values = validate_record({"name": " Anna ", "phone": "+421 911 000 001", "tags": "vip|lead"})
+    assert values["name"] == "Anna"
+    assert values["tags"] == ["vip", "lead"]
+    for record, message in [
+        ({"phone": "+421911000001"}, "name is required"),
+        ({"name": "A", "phone": "+421911000001", "timezone": "Mars/Base"}, "Unknown timezone"),
+        ({"name": "A", "phone": "+421911000001", "email": "nope"}, "Invalid email"),
+        ({"name": 5, "phone": "+421911000001"}, "name must be a string"),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            validate_record(record)
+
+
+def test_import_dedups_reports_errors_and_fills_group(db, user, make_contact):
+    make_contact(phone="+421911000002")
+    group = create_group(db, GroupCreate(name="Imported"), user.id)
+    progress = []
+    report = import_contacts(
+        db, iter_records(io.BytesIO(CSV), "csv"), user.id, group_id=group.id,
+        chunk_size=1, on_progress=lambda r: progress.append(r.inserted)
+    )
+    assert (report.processed, report.inserted, report.duplicates, report.failed) == (4, 1, 2, 1)
+    assert report.errors == [(4, "name is required")]
+    assert progress == [1, 1, 1]  # отчёт после каждой пачки
+
+    anna = db.query(Contact).filter(Contact.name == "Anna").one()
+    assert anna.phone_e164 == "+421911000001"
+    assert sorted(anna.get_tags()) == ["lead", "vip"]
+    assert db.query(GroupMember).filter(GroupMember.group_id == group.id).count() == report.added_to_group == 1
+    db.refresh(group)
+    assert group.member_count == 1
+
+
+def test_import_into_unknown_group_fails(db, user):
+    with pytest.raises(ValueError):
+        import_contacts(db, iter_records(io.BytesIO(CSV), "csv"), user.id, group_id=999)
+
+
+def test_import_endpoint(client):
+    response = client.post("/api/contacts/import", files={"file": ("contacts.csv", CSV, "text/csv")})
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["inserted"], report["duplicates"], report["failed"]) == (2, 1, 1)
+    assert report["errors"] == [{"line": 4, "error": "name is required"}]
+    assert client.post("/api/contacts/import", params={"format": "xml"},
+                       files={"file": ("contacts.csv", CSV)}).status_code == 400
+
+
+def test_import_endpoint_rejects_non_utf8_files(client):
+    data = "name,phone\nJán,+421913000090\n".encode("cp1250")
+    response = client.post("/api/contacts/import", files={"file": ("contacts.csv", data)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File must be UTF-8 encoded"
+
+
+def test_ndjson_row_with_bad_name_is_reported_not_fatal(db, user):
+    ndjson = b'{"name": 5, "phone": "+421911000060"}\n{"name": "Ok", "phone": "+421911000061"}\n'
+    report = import_contacts(db, iter_records(io.BytesIO(ndjson), "ndjson"), user.id)
+    assert (report.inserted, report.errors) == (1, [(1, "name must be a string")])
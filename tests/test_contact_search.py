@@ -0,0 +1,43 @@
+from app.crud.contact import delete_contact, search_contacts
+from app.crud.pagination import NEXT_CURSOR_HEADER
+from app.crud.tag import add_contact_tags
+from app.models.search import match_query
+
+
+def test_match_query_quotes_prefixes_and_drops_operators():
+    assert match_query('Pet* OR "nov') == '"Pet"* "OR"* "nov"*'
+    assert match_query("  -- ") is None
+
+
+def _ids(db, user, q, **kwargs):
+    return [hit.id for hit in search_contacts(db, user.id, q, **kwargs)]
+
+
+def test_search_by_prefix_across_columns_and_tags(db, user, make_contact):
+    peter = make_contact(name="Peter Novák", company="Acme")
+    make_contact(name="Paula", email="paula@novum.sk")
+    add_contact_tags(db, user.id, {peter.id: ["vip"]})
+    assert _ids(db, user, "pet") == [peter.id]
+    assert _ids(db, user, "novak") == [peter.id]  # диакритика не мешает
+    assert _ids(db, user, "acme vi") == [peter.id]
+    assert len(_ids(db, user, "nov")) == 2
+
+
+def test_search_skips_deleted_and_foreign_contacts(db, user, make_contact):
+    gone = make_contact(name="Gone Person")
+    delete_contact(db, gone.id, user.id)
+    assert _ids(db, user, "gone") == []
+    assert search_contacts(db, user.id + 1, "person") == []
+
+
+def test_search_endpoint_pages_by_rank(client):
+    for n in range(3):
+        client.post("/api/contacts/", json={"name": f"Searchable {n}", "phone": f"+42191300010{n}", "tags": ["lead"]})
+    first = client.get("/api/contacts/search", params={"q": "search", "limit": 2})
+    assert first.status_code == 200
+    assert all(hit["tags"] == ["lead"] for hit in first.json())
+    second = client.get("/api/contacts/search", params={
+        "q": "search", "limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]
+    })
+    names = [hit["name"] for hit in first.json() + second.json()]
+    assert sorted(names) == ["Searchable 0", "Searchable 1", "Searchable 2"]
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import column, func, insert, select, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db_bootstrap import READER, WRITER, RoutingSession, create_engines, is_file_sqlite, sqlite_pragmas
+
+
+def test_only_file_sqlite_gets_separate_pools():
+    assert is_file_sqlite("sqlite:///./app.db")
+    assert not is_file_sqlite("sqlite://")
+    assert not is_file_sqlite("sqlite:///:memory:")
+    assert not is_file_sqlite("postgresql://localhost/app")
+
+
+def test_reader_connections_are_read_only():
+    assert "PRAGMA query_only=ON" in sqlite_pragmas(READER)
+    assert "PRAGMA query_only=ON" not in sqlite_pragmas(WRITER)
+
+
+@pytest.fixture
+def engines(tmp_path):
+    writer, reader = create_engines(f"sqlite:///{tmp_path}/pools.db")
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+    yield writer, reader
+    writer.dispose()
+    reader.dispose()
+
+
+def test_wal_and_read_only_reader(engines):
+    writer, reader = engines
+    with writer.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    with reader.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO items (name) VALUES ('x')"))
+
+
+def test_session_routes_reads_and_sticks_to_writer_after_a_write(engines):
+    writer, reader = engines
+    items = table("items", column("id"), column("name"))
+    count = select(func.count()).select_from(items)
+    session = sessionmaker(class_=RoutingSession, writer=writer, reader=reader)()
+    assert session.get_bind(clause=count) is reader
+    assert session.execute(count).scalar() == 0
+    session.commit()
+
+    session.execute(insert(items).values(name="x"))
+    # Чтение в той же транзакции видит незакоммиченную строку — оно идёт через писателя
+    assert session.get_bind(clause=count) is writer
+    assert session.execute(count).scalar() == 1
+    session.commit()
+
+    assert session.get_bind(clause=count) is reader
+    assert session.execute(count).scalar() == 1
+    session.close()
+
+
+def test_raw_sql_goes_to_writer(engines):
+    writer, reader = engines
+    session = sessionmaker(class_=RoutingSession, writer=writer, reader=reader)()
+    # Сырой SQL может писать, поэтому всегда идёт через писателя
+    assert session.get_bind(clause=text("SELECT 1")) is writer
+    session.close()
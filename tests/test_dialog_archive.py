@@ -0,0 +1,98 @@
+import dataclasses
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.crud.dialog import (
+    get_dialog_messages, get_dialog_summaries, get_dialogs, iter_dialogs_for_export, load_archived_dialog,
+    archive_old_dialogs
+)
+from app.models.contact import ArchivedDialog, ContactDialog
+from app.schemas.contact import ContactDialog as ContactDialogSchema
+from app.services import dialog_archive as archive_module
+from app.services.dialog_archive import ArchiveCorrupted, DialogArchive
+
+NOW = datetime(2026, 9, 1, 12, 0)
+OLD = datetime(2025, 1, 1, 9, 0)
+
+
+def _archive(db, make_contact, make_dialog):
+    contact = make_contact()
+    old = [make_dialog(contact, messages=3, date=OLD + timedelta(days=day)).id for day in range(2)]
+    recent = make_dialog(contact, messages=1, date=NOW - timedelta(days=1)).id
+    assert archive_old_dialogs(db, older_than_days=180, now=NOW) == 2
+    return contact, old, recent
+
+
+def test_old_dialogs_move_to_segments_and_stay_readable(db, make_contact, make_dialog):
+    contact, old, recent = _archive(db, make_contact, make_dialog)
+    assert db.query(ContactDialog.id).all() == [(recent,)]
+    dialogs = get_dialogs(db, contact.id)
+    assert [d.id for d in dialogs] == [recent, old[1], old[0]]
+    response = ContactDialogSchema.model_validate(dialogs[1])
+    assert response.archived and [m.text for m in response.messages] == ["Message 0", "Message 1", "Message 2"]
+    summaries = get_dialog_summaries(db, contact.id, limit=2)
+    assert [(s.id, s.message_count) for s in summaries] == [(recent, 1), (old[1], 3)]
+    page = get_dialog_messages(db, old[0], limit=2, newest_first=True)
+    assert [m.text for m in page] == ["Message 2", "Message 1"]
+    exported = [row["dialog_id"] for row in iter_dialogs_for_export(db, contact.user_id)]
+    assert exported == [recent, old[0], old[0], old[0], old[1], old[1], old[1]]
+
+
+def test_undated_dialogs_merge_after_archived_ones(db, make_contact, make_dialog):
+    contact, old, recent = _archive(db, make_contact, make_dialog)
+    undated = make_dialog(contact).id
+    db.query(ContactDialog).filter(ContactDialog.id == undated).update({"date": None})
+    db.commit()
+    assert [d.id for d in get_dialogs(db, contact.id)] == [recent, old[1], old[0], undated]
+
+def test_cached_records_cannot_be_changed(db, make_contact, make_dialog):
+    _, old, _ = _archive(db, make_contact, make_dialog)
+    entry = db.get(ArchivedDialog, old[0])
+    record = load_archived_dialog(entry)
+    assert load_archived_dialog(entry) is record  # из кэша
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        record.transcript = "changed"
+    with pytest.raises(AttributeError):
+        record.messages.append(None)
+
+
+def test_damaged_segment_is_detected(db, make_contact, make_dialog, tmp_path):
+    archive = DialogArchive(str(tmp_path), segment_size=1024 * 1024)
+    contact = make_contact()
+    for day in range(2):
+        make_dialog(contact, messages=2, date=OLD + timedelta(days=day))
+    assert archive_old_dialogs(db, older_than_days=180, now=NOW, archive=archive) == 1
+    entry = db.query(ArchivedDialog).one()
+    assert len(load_archived_dialog(entry, archive).messages) == 2
+    with open(os.path.join(archive.directory, entry.segment), "r+b") as f:
+        f.seek(entry.segment_offset + entry.segment_length)
+        f.write(b"\x00")
+    archive_module._read_record.cache_clear()
+    with pytest.raises(ArchiveCorrupted):
+        load_archived_dialog(entry, archive)
+
+
+def test_segments_roll_over_at_the_size_limit(tmp_path):
+    archive = DialogArchive(str(tmp_path), segment_size=100)
+    first = archive.append([(1, b"x" * 120)])
+    second = archive.append([(2, b"y" * 10)])
+    assert first[0][0] != second[0][0] and second[0][1] == 0
+
+
+class StopLoop(Exception):
+    pass
+
+
+def test_archive_loop_logs_failures_with_traceback(monkeypatch, caplog):
+    import app.crud.dialog as crud_dialog
+
+    def stop(seconds):
+        raise StopLoop
+
+    monkeypatch.setattr(crud_dialog, "archive_old_dialogs", lambda db: 1 / 0)
+    monkeypatch.setattr(archive_module.time, "sleep", stop)
+    with pytest.raises(StopLoop):
+        archive_module.archive_periodically(1)
+    assert caplog.records[-1].exc_info[0] is ZeroDivisionError
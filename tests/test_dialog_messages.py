@@ -0,0 +1,51 @@
+import json
+
+from app.crud.dialog import get_dialog_messages, iter_dialog_messages
+from app.crud.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+
+def test_message_pages_in_both_directions(db, make_contact, make_dialog):
+    dialog = make_dialog(make_contact(), messages=7)
+    first = get_dialog_messages(db, dialog.id, limit=3)
+    second = get_dialog_messages(db, dialog.id, limit=3, cursor=encode_cursor([first[-1].timestamp, first[-1].id]))
+    assert [m.text for m in first + second] == [f"Message {n}" for n in range(6)]
+    newest = get_dialog_messages(db, dialog.id, limit=2, newest_first=True)
+    assert [m.text for m in newest] == ["Message 6", "Message 5"]
+
+
+def test_streamed_messages_are_rows_not_orm_objects(db, make_contact, make_dialog):
+    dialog_id = make_dialog(make_contact(), messages=5).id
+    db.expunge_all()
+    rows = list(iter_dialog_messages(db, dialog_id, batch_size=2))
+    assert [row.text for row in rows] == [f"Message {n}" for n in range(5)]
+    assert not list(db.identity_map.values())
+
+
+def _dialog_with_messages(client, count):
+    contact = client.post("/api/contacts/", json={"name": "Long talk", "phone": "+421913000003"}).json()
+    messages = [{"role": "agent", "text": f"Line {n}"} for n in range(count)]
+    dialog = client.post(f"/api/contacts/{contact['id']}/dialogs", json=messages).json()
+    return f"/api/contacts/{contact['id']}/dialogs/{dialog['id']}/messages"
+
+
+def test_messages_endpoint_pages_with_cursor_header(client):
+    url = _dialog_with_messages(client, 5)
+    texts, cursor = [], None
+    while True:
+        response = client.get(url, params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        texts += [message["text"] for message in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert texts == [f"Line {n}" for n in range(5)]
+    assert client.get(url, params={"cursor": "broken"}).status_code == 400
+    assert client.get(url.replace("/dialogs/", "/dialogs/9999", 1)).status_code == 404
+
+
+def test_messages_stream_as_ndjson(client):
+    url = _dialog_with_messages(client, 3)
+    response = client.get(f"{url}/stream")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["text"] for line in lines] == ["Line 0", "Line 1", "Line 2"]
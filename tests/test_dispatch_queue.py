@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.crud.scheduled_call import create_scheduled_call, get_dispatch_queue, get_shared_dispatch_queue
+from app.models.contact import Contact
+from app.models.user import User
+from app.schemas.scheduled_call import ScheduledCallCreate
+from app.services.dispatch_queue import DispatchQueue, call_deadline, call_ready_at
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+
+def make_call(call_id, **values):
+    defaults = dict(
+        id=call_id, status="pending", priority=0, scheduled_time=None, next_retry_at=None,
+        start_time_window=NOW - timedelta(minutes=1), end_time_window=NOW + timedelta(hours=1), next_eligible_at=None
+    )
+    return SimpleNamespace(**{**defaults, **values})
+
+
+def test_ready_at_and_deadline():
+    retrying = make_call(1, status="retrying", next_retry_at=NOW + timedelta(minutes=5))
+    assert call_ready_at(retrying) == NOW + timedelta(minutes=5)
+    fixed = make_call(2, scheduled_time=NOW, start_time_window=None, end_time_window=None)
+    assert call_deadline(fixed) == NOW + timedelta(minutes=settings.DISPATCH_DEFAULT_SLACK)
+
+
+def test_earliest_deadline_goes_first():
+    queue = DispatchQueue(now=NOW)
+    queue.extend([
+        make_call(1, end_time_window=NOW + timedelta(hours=3)),
+        make_call(2, end_time_window=NOW + timedelta(minutes=30)),
+        make_call(3, end_time_window=NOW + timedelta(hours=1)),
+    ])
+    assert [queue.pop().id for _ in range(3)] == [2, 3, 1]
+
+
+def test_priority_moves_call_ahead():
+    queue = DispatchQueue(now=NOW)
+    queue.push(make_call(1, end_time_window=NOW + timedelta(minutes=30)))
+    queue.push(make_call(2, end_time_window=NOW + timedelta(minutes=35), priority=1))
+    assert queue.pop().id == 2
+
+
+def test_aging_keeps_old_low_priority_calls_from_starving():
+    queue = DispatchQueue(now=NOW)
+    waiting = make_call(1, start_time_window=NOW - timedelta(hours=10), end_time_window=NOW + timedelta(hours=2))
+    fresh = make_call(2, start_time_window=NOW, end_time_window=NOW + timedelta(hours=1))
+    queue.extend([fresh, waiting])
+    assert queue.pop().id == 1
+
+
+def test_admission_check_flags_calls_that_miss_their_window():
+    queue = DispatchQueue(now=NOW)
+    queue.extend([make_call(call_id, end_time_window=NOW + timedelta(minutes=2)) for call_id in range(1, 11)])
+    result = queue.admission_check(max_concurrency=2, call_duration=60, cps_limit=1)
+    assert len(result.planned_starts) == 10
+    assert result.planned_starts[1] == NOW
+    # Две линии по минуте: старты 0, 1, 60, 61, 120 с — шестой звонок уже после срока
+    assert result.at_risk == [6, 7, 8, 9, 10]
+
+
+def test_admission_check_waits_for_eligibility():
+    queue = DispatchQueue(now=NOW)
+    queue.push(make_call(1, next_eligible_at=NOW + timedelta(minutes=10)))
+    assert queue.admission_check(max_concurrency=1).planned_starts[1] == NOW + timedelta(minutes=10)
+
+
+def test_dispatch_queue_reads_ready_calls(db, make_contact, frozen_clock):
+    contact = make_contact()
+    late = create_scheduled_call(db, ScheduledCallCreate(
+        contact_id=contact.id, start_time_window=NOW - timedelta(minutes=5), end_time_window=NOW + timedelta(hours=2)
+    ), contact.user_id)
+    urgent = create_scheduled_call(db, ScheduledCallCreate(
+        contact_id=contact.id, start_time_window=NOW - timedelta(minutes=5), end_time_window=NOW + timedelta(minutes=20)
+    ), contact.user_id)
+    create_scheduled_call(db, ScheduledCallCreate(
+        contact_id=contact.id, scheduled_time=NOW + timedelta(days=1)
+    ), contact.user_id)
+    queue = get_dispatch_queue(db, now=NOW)
+    assert [entry.call.id for entry in queue.ordered()] == [urgent.id, late.id]
+
+
+def test_admission_counts_calls_of_every_user(db, make_contact, frozen_clock):
+    mine = make_contact()
+    other = User(email="other@example.com", password_hash="-", first_name="Other", last_name="User")
+    db.add(other)
+    db.commit()
+    theirs = Contact(user_id=other.id, name="Theirs", phone="+421900009999")
+    db.add(theirs)
+    db.commit()
+    window = dict(start_time_window=NOW - timedelta(minutes=5), end_time_window=NOW + timedelta(minutes=1))
+    busy = create_scheduled_call(db, ScheduledCallCreate(contact_id=theirs.id, **window), other.id)
+    own = create_scheduled_call(db, ScheduledCallCreate(
+        contact_id=mine.id, start_time_window=window["start_time_window"], end_time_window=NOW + timedelta(minutes=2)
+    ), mine.user_id)
+
+    # Одна линия: звонок другого пользователя с более ранним сроком занимает её первым
+    alone = get_dispatch_queue(db, now=NOW, user_id=mine.user_id).admission_check(max_concurrency=1, call_duration=600)
+    assert alone.at_risk == []
+    queue = get_shared_dispatch_queue(db, mine.user_id, now=NOW)
+    assert [entry.call.id for entry in queue.ordered()] == [busy.id, own.id]
+    assert queue.admission_check(max_concurrency=1, call_duration=600).at_risk == [own.id]
@@ -0,0 +1,61 @@
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.crud.contact import DynamicGroupMembers, import_contacts
+from app.crud.group import create_group, sync_dynamic_groups
+from app.crud.tag import add_contact_tags
+from app.models.group import GroupMember
+from app.schemas.group import GroupCreate, GroupRules
+from app.services.contact_import import iter_records
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+
+def _members(db, group):
+    return {contact_id for (contact_id,) in db.query(GroupMember.contact_id).filter(GroupMember.group_id == group.id)}
+
+
+def test_rules_are_materialized_and_kept_in_sync(db, user, make_contact):
+    acme, other = make_contact(company="Acme"), make_contact(company="Other")
+    add_contact_tags(db, user.id, {acme.id: ["vip"], other.id: ["vip"]})
+    db.commit()
+    group = create_group(db, GroupCreate(name="Acme VIP", rules=GroupRules(tags=["vip"], company="Acme")), user.id)
+    assert _members(db, group) == {acme.id}
+
+    # Изменения контактов попадают в очередь триггерами; синхронизация проверяет только их
+    other.company = "Acme"
+    acme.is_active = False
+    db.commit()
+    change = sync_dynamic_groups(db, user.id, now=NOW)
+    assert (change.added, change.removed) == (1, 1)
+    assert _members(db, group) == {other.id}
+    assert sync_dynamic_groups(db, user.id, now=NOW).added == 0
+
+
+def test_no_dialog_days_ages_contacts_in(db, user, make_contact, make_dialog, frozen_clock):
+    contact = make_contact()
+    make_dialog(contact, date=NOW - timedelta(days=5))
+    group = create_group(db, GroupCreate(name="Quiet", rules=GroupRules(no_dialog_days=7)), user.id)
+    sync_dynamic_groups(db, user.id, now=NOW)
+    assert _members(db, group) == set()
+    sync_dynamic_groups(db, user.id, now=NOW + timedelta(days=3))
+    assert _members(db, group) == {contact.id}
+
+
+def test_import_into_dynamic_group_is_rejected(db, user, make_contact):
+    group = create_group(db, GroupCreate(name="Rules", rules=GroupRules(company="Acme")), user.id)
+    csv = io.BytesIO(b"name,phone,company\nNew,+421911000050,Acme\n")
+    with pytest.raises(DynamicGroupMembers):
+        import_contacts(db, iter_records(csv, "csv"), user.id, group_id=group.id)
+
+
+def test_dynamic_group_members_cannot_be_edited_through_the_api(client):
+    group = client.post("/api/groups/groups/", json={"name": "Rules", "rules": {"company": "Acme"}}).json()
+    contact = client.post("/api/contacts/", json={"name": "A", "phone": "+421913000401", "company": "Acme"}).json()
+    url = f"/api/groups/groups/{group['id']}/members"
+    assert client.post(f"{url}/bulk", json={"contact_ids": [contact["id"]]}).status_code == 409
+    response = client.post("/api/contacts/import", params={"group_id": group["id"]},
+                           files={"file": ("contacts.csv", b"name,phone\nB,+421913000402\n")})
+    assert response.status_code == 409
@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+
+from app.crud.scheduled_call import (
+    STATUS_EXPIRED, create_scheduled_call, get_ready_calls, recompute_eligibility_on_startup
+)
+from app.models.scheduled_call import ScheduledCall
+from app.schemas.scheduled_call import ScheduledCallCreate
+from app.services.eligibility import CallingHours, calling_hours
+
+HOURS = CallingHours(start=time(9), end=time(20), weekdays=(0, 1, 2, 3, 4, 5))
+MONDAY = datetime(2026, 1, 5)
+
+
+def test_ready_time_is_moved_into_local_calling_hours():
+    # 05:00 UTC = 06:00 в Братиславе, звонить можно с 09:00 местного = 08:00 UTC
+    assert HOURS.next_eligible(MONDAY.replace(hour=5), "Europe/Bratislava") == MONDAY.replace(hour=8)
+    assert HOURS.next_eligible(MONDAY.replace(hour=12), "Europe/Bratislava") == MONDAY.replace(hour=12)
+
+
+def test_sunday_is_skipped():
+    saturday_evening = datetime(2026, 1, 10, 19, 30)  # 20:30 местного
+    assert HOURS.next_eligible(saturday_evening, "Europe/Bratislava") == datetime(2026, 1, 12, 8, 0)
+
+
+def test_no_eligible_moment_before_window_end():
+    ready_at = MONDAY.replace(hour=5)
+    assert HOURS.next_eligible(ready_at, "Europe/Bratislava", not_after=MONDAY.replace(hour=7, minute=30)) is None
+    assert HOURS.next_eligible(ready_at, "Europe/Bratislava", not_after=MONDAY.replace(hour=9)) == MONDAY.replace(hour=8)
+
+
+def test_call_whose_window_misses_calling_hours_expires(db, make_contact, frozen_clock):
+    contact = make_contact(timezone="Europe/Bratislava")
+    # 20:00–21:00 UTC — после 20:00 местного, а следующий разрешённый момент уже за концом окна
+    call = create_scheduled_call(db, ScheduledCallCreate(
+        contact_id=contact.id, start_time_window=MONDAY.replace(hour=20), end_time_window=MONDAY.replace(hour=21)
+    ), contact.user_id)
+    assert call.status == STATUS_EXPIRED
+    assert call.next_eligible_at is None
+    assert get_ready_calls(db, now=MONDAY + timedelta(days=7)) == []
+
+
+def test_changed_calling_hours_recompute_every_call_on_startup(db, make_contact, frozen_clock):
+    contact = make_contact(timezone="Europe/Bratislava")
+    call = create_scheduled_call(db, ScheduledCallCreate(
+        contact_id=contact.id, scheduled_time=MONDAY.replace(hour=9)
+    ), contact.user_id)
+    assert call.next_eligible_at == MONDAY.replace(hour=9)
+    recompute_eligibility_on_startup(db, hours=calling_hours)
+
+    # Правила не менялись — рассчитанные значения не трогаем
+    later = CallingHours(start=time(13), end=time(20), weekdays=HOURS.weekdays)
+    assert later.fingerprint() != calling_hours.fingerprint()
+    assert recompute_eligibility_on_startup(db, hours=calling_hours) == 0
+
+    # Начало дня сдвинулось на 13:00 местного — пересчитываются и уже заполненные значения
+    assert recompute_eligibility_on_startup(db, hours=later) == 1
+    assert db.get(ScheduledCall, call.id).next_eligible_at == MONDAY.replace(hour=12)
+    assert recompute_eligibility_on_startup(db, hours=later) == 0
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.crud.contact import iter_contacts_for_export
+from app.crud.dialog import iter_dialogs_for_export
+from app.crud.group import add_group_members, create_group
+from app.crud.tag import add_contact_tags
+from app.schemas.group import GroupCreate
+from app.services import export
+from app.services.export import serialize
+
+
+def test_serializers_write_in_buffered_chunks(monkeypatch):
+    monkeypatch.setattr(export, "BUFFER_SIZE", 50)
+    rows = [{"id": n, "tags": ["a", "b"], "at": datetime(2026, 1, 1)} for n in range(10)]
+    chunks = list(serialize("csv", ("id", "tags", "at"), rows))
+    assert len(chunks) > 1
+    parsed = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert parsed[0] == {"id": "0", "tags": "a;b", "at": "2026-01-01T00:00:00"}
+    lines = "".join(serialize("ndjson", ("id", "at"), rows)).splitlines()
+    assert json.loads(lines[-1]) == {"id": 9, "at": "2026-01-01T00:00:00"}
+    with pytest.raises(ValueError):
+        serialize("xml", ("id",), rows)
+
+
+def test_contact_export_batches_tags_and_groups(db, user, make_contact, queries):
+    contacts = [make_contact() for _ in range(5)]
+    make_contact(is_active=False)
+    add_contact_tags(db, user.id, {contacts[0].id: ["vip"]})
+    group = create_group(db, GroupCreate(name="Export"), user.id)
+    add_group_members(db, group.id, [contacts[1].id], user.id)
+    user_id, ids, group_id = user.id, [c.id for c in contacts], group.id
+    db.commit()
+    queries.clear()
+    rows = list(iter_contacts_for_export(db, user_id, batch_size=2))
+    assert [row["id"] for row in rows] == ids
+    assert rows[0]["tags"] == ["vip"] and rows[1]["group_ids"] == [group_id]
+    # Выборка контактов и по запросу тегов и групп на каждую из трёх пачек
+    assert len(queries) == 1 + 3 * 2
+
+
+def test_dialog_export_has_a_row_per_message(db, user, make_contact, make_dialog):
+    contact = make_contact()
+    make_dialog(contact, messages=2)
+    make_dialog(contact, date=datetime(2026, 1, 2))
+    rows = list(iter_dialogs_for_export(db, user.id))
+    assert [row["text"] for row in rows] == ["Message 0", "Message 1", None]
+
+
+def test_export_endpoints_stream_files(client):
+    client.post("/api/contacts/", json={"name": "Exported", "phone": "+421913000004", "tags": ["vip"]})
+    response = client.get("/api/contacts/export")
+    assert response.status_code == 200
+    assert 'filename="contacts.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["name"], row["tags"]) for row in rows] == [("Exported", "vip")]
+    dialogs = client.get("/api/contacts/dialogs/export", params={"format": "ndjson"})
+    assert dialogs.status_code == 200 and dialogs.text == ""
+    assert client.get("/api/contacts/export", params={"format": "xml"}).status_code == 400
+    assert client.get("/api/contacts/dialogs/export", params={"contact_id": 9999}).status_code == 404
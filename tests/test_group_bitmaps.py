@@ -0,0 +1,68 @@
+from app.crud.contact import delete_contact
+from app.crud.group import (
+    SET_DIFFERENCE, SET_INTERSECTION, SET_UNION, add_group_members, combine_groups, create_group,
+    reconcile_group_counters
+)
+from app.models.group import GroupMember
+from app.schemas.group import GroupCreate
+from app.services.bitmap import ContactBitmap
+from app.services.group_index import group_index
+
+
+def test_bitmap_set_operations_across_blocks():
+    a = ContactBitmap.from_ids([1, 5, 70000, 200000])
+    b = ContactBitmap.from_ids([5, 200000, 300000])
+    assert list(a | b) == [1, 5, 70000, 200000, 300000]
+    assert list(a & b) == [5, 200000]
+    assert list(a - b) == [1, 70000]
+    assert len(ContactBitmap.union_all([a, b])) == 5
+
+
+def _groups(db, user, *members):
+    groups = []
+    for number, contact_ids in enumerate(members):
+        group = create_group(db, GroupCreate(name=f"G{number}"), user.id)
+        add_group_members(db, group.id, contact_ids, user.id)
+        groups.append(group.id)
+    return groups
+
+
+def test_combine_groups(db, user, make_contact):
+    ids = [make_contact().id for _ in range(4)]
+    first, second = _groups(db, user, ids[:3], ids[2:])
+    assert list(combine_groups(db, user.id, SET_UNION, [first, second])) == ids
+    assert list(combine_groups(db, user.id, SET_INTERSECTION, [first, second])) == [ids[2]]
+    assert list(combine_groups(db, user.id, SET_DIFFERENCE, [first, second])) == ids[:2]
+    assert combine_groups(db, user.id, SET_UNION, [first, 9999]) is None
+
+
+def test_deleted_contacts_drop_out_of_cached_bitmaps(db, user, make_contact):
+    ids = [make_contact().id for _ in range(3)]
+    (group,) = _groups(db, user, ids)
+    assert len(combine_groups(db, user.id, SET_UNION, [group])) == 3
+    delete_contact(db, ids[0], user.id)
+    assert list(combine_groups(db, user.id, SET_UNION, [group])) == ids[1:]
+
+
+def test_changes_from_another_worker_are_seen(db, user, make_contact, monkeypatch):
+    ids = [make_contact().id for _ in range(3)]
+    (group,) = _groups(db, user, ids[:2])
+    assert len(combine_groups(db, user.id, SET_UNION, [group])) == 2
+    # Другой процесс: его коммиты до кэша этого процесса не доходят, видна только версия в базе
+    with monkeypatch.context() as patched:
+        patched.setattr(group_index, "invalidate", lambda group_ids: None)
+        add_group_members(db, group, ids[2:], user.id)
+    assert list(combine_groups(db, user.id, SET_UNION, [group])) == ids
+
+
+def test_reconcile_bumps_version_of_groups_changed_behind_counters(db, user, make_contact, monkeypatch):
+    ids = [make_contact().id for _ in range(2)]
+    (group,) = _groups(db, user, ids[:1])
+    assert len(combine_groups(db, user.id, SET_UNION, [group])) == 1
+    with monkeypatch.context() as patched:
+        patched.setattr(group_index, "invalidate", lambda group_ids: None)
+        db.add(GroupMember(group_id=group, contact_id=ids[1]))  # мимо счётчиков
+        db.commit()
+    assert len(combine_groups(db, user.id, SET_UNION, [group])) == 1
+    assert reconcile_group_counters(db, user.id) == 1
+    assert list(combine_groups(db, user.id, SET_UNION, [group])) == ids
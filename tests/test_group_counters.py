@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from app.crud.contact import delete_contact
+from app.crud.group import (
+    add_group_members, create_group, create_scheduled_group_call, mark_group_call_as_attempted,
+    reconcile_group_counters, remove_group_members
+)
+from app.models.group import Group
+from app.schemas.group import GroupCreate, ScheduledGroupCallCreate
+
+
+def _counters(db, group_id):
+    group = db.get(Group, group_id)
+    db.refresh(group)
+    return group.member_count, group.active_member_count, group.scheduled_calls_count, group.completed_calls_count
+
+
+def test_counters_follow_members_and_calls(db, user, make_contact, frozen_clock):
+    ids = [make_contact().id for _ in range(4)]
+    group = create_group(db, GroupCreate(name="Counted", contact_ids=ids), user.id)
+    assert _counters(db, group.id) == (4, 4, 0, 0)
+    delete_contact(db, ids[0], user.id)
+    remove_group_members(db, group.id, ids[1:2])
+    assert _counters(db, group.id) == (3, 2, 0, 0)
+
+    now = frozen_clock.now()
+    call = create_scheduled_group_call(db, ScheduledGroupCallCreate(
+        group_id=group.id, start_time_window=now, end_time_window=now + timedelta(hours=1)
+    ), user.id)
+    mark_group_call_as_attempted(db, call.id, success=True)
+    assert _counters(db, group.id) == (3, 2, 1, 1)
+    assert reconcile_group_counters(db, user.id) == 0
+
+
+def test_reconcile_repairs_drift(db, user, make_contact):
+    group = create_group(db, GroupCreate(name="Drifted"), user.id)
+    add_group_members(db, group.id, [make_contact().id for _ in range(2)], user.id)
+    group.member_count, group.active_member_count = 10, 0
+    db.commit()
+    assert reconcile_group_counters(db, user.id) == 1
+    assert _counters(db, group.id)[:2] == (2, 2)
+
+
+def test_group_list_includes_members_unless_opted_out(client):
+    contact = client.post("/api/contacts/", json={"name": "Member", "phone": "+421913000501"}).json()
+    client.post("/api/groups/groups/", json={"name": "Listed", "contact_ids": [contact["id"]]})
+    listed = client.get("/api/groups/groups/").json()
+    assert [c["id"] for c in listed[0]["contacts"]] == [contact["id"]]
+    light = client.get("/api/groups/groups/", params={"include_members": False}).json()
+    assert (light[0]["members"], light[0]["member_count"]) == ([], 1)
@@ -0,0 +1,46 @@
+from app.crud.group import add_group_members, create_group, load_group_details
+from app.schemas.group import GroupCreate
+
+
+def _groups(db, user, make_contact, groups, members):
+    group_ids = []
+    for number in range(groups):
+        group = create_group(db, GroupCreate(name=f"Group {number}"), user.id)
+        add_group_members(db, group.id, [make_contact().id for _ in range(members)], user.id)
+        group_ids.append(group.id)
+    return group_ids
+
+
+def test_details_take_two_queries_for_any_number_of_groups(db, user, make_contact, queries):
+    user_id = user.id
+    small = _groups(db, user, make_contact, groups=1, members=2)
+    queries.clear()
+    load_group_details(db, small, user_id)
+    small_count = len(queries)
+
+    large = _groups(db, user, make_contact, groups=5, members=10)
+    queries.clear()
+    details = load_group_details(db, large, user_id)
+    assert len(queries) == small_count == 2
+    assert all(len(details[group_id].members) == len(details[group_id].contacts) == 10 for group_id in large)
+
+
+def test_inactive_contacts_are_members_but_not_contacts(db, user, make_contact):
+    group_id, = _groups(db, user, make_contact, groups=1, members=3)
+    contact = load_group_details(db, [group_id], user.id)[group_id].contacts[0]
+    contact.is_active = False
+    db.commit()
+    details = load_group_details(db, [group_id], user.id)[group_id]
+    assert len(details.members) == 3
+    assert contact.id not in [c.id for c in details.contacts]
+
+
+def test_groups_endpoint_returns_members(client):
+    contact_ids = [
+        client.post("/api/contacts/", json={"name": f"Member {n}", "phone": f"+42191200000{n}"}).json()["id"]
+        for n in range(3)
+    ]
+    group_id = client.post("/api/groups/groups/", json={"name": "Team", "contact_ids": contact_ids}).json()["id"]
+    group = client.get(f"/api/groups/groups/{group_id}").json()
+    assert sorted(c["id"] for c in group["contacts"]) == sorted(contact_ids)
+    assert group["member_count"] == 3
@@ -0,0 +1,49 @@
+from app.crud import group as crud_group
+from app.crud.group import (
+    MembershipChange, add_group_members, create_group, remove_group_members, replace_group_members
+)
+from app.models.group import GroupMember
+from app.schemas.group import GroupCreate
+
+
+def _members(db, group_id):
+    return {contact_id for (contact_id,) in db.query(GroupMember.contact_id).filter(GroupMember.group_id == group_id)}
+
+
+def test_bulk_add_skips_foreign_deleted_and_existing(db, user, make_contact):
+    group = create_group(db, GroupCreate(name="Bulk"), user.id)
+    mine = [make_contact().id for _ in range(3)]
+    deleted = make_contact(is_active=False).id
+    assert add_group_members(db, group.id, mine[:2], user.id) == MembershipChange(added=2)
+    change = add_group_members(db, group.id, mine + [deleted, 9999], user.id)
+    assert change == MembershipChange(added=1, skipped=4)
+    assert _members(db, group.id) == set(mine)
+    db.refresh(group)
+    assert (group.member_count, group.active_member_count) == (3, 3)
+
+
+def test_replace_touches_only_the_difference(db, user, make_contact, monkeypatch):
+    group = create_group(db, GroupCreate(name="Replace"), user.id)
+    ids = [make_contact().id for _ in range(4)]
+    add_group_members(db, group.id, ids[:3], user.id)
+    monkeypatch.setattr(crud_group, "MEMBERS_BATCH_SIZE", 1)  # удаление пачками тоже проходит
+    change = replace_group_members(db, group.id, ids[1:], user.id)
+    assert (change.added, change.removed, change.skipped) == (1, 1, 0)
+    assert _members(db, group.id) == set(ids[1:])
+    assert remove_group_members(db, group.id, [ids[1], ids[0]]) == MembershipChange(removed=1, skipped=1)
+    db.refresh(group)
+    assert group.member_count == 2
+
+
+def test_bulk_member_endpoints(client):
+    group = client.post("/api/groups/groups/", json={"name": "Team"}).json()
+    ids = [client.post("/api/contacts/", json={"name": f"M{n}", "phone": f"+42191300030{n}"}).json()["id"]
+           for n in range(3)]
+    url = f"/api/groups/groups/{group['id']}/members"
+    added = client.post(f"{url}/bulk", json={"contact_ids": ids + [ids[0]]}).json()
+    assert (added["added"], added["skipped"]) == (3, 0)
+    removed = client.post(f"{url}/bulk-remove", json={"contact_ids": ids[:1]}).json()
+    assert removed["removed"] == 1
+    replaced = client.put(url, json={"contact_ids": ids[:1]}).json()
+    assert (replaced["added"], replaced["removed"]) == (1, 2)
+    assert client.post("/api/groups/groups/9999/members/bulk", json={"contact_ids": ids}).status_code == 404
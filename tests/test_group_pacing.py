@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.crud.group import (
+    STATUS_UNPLACED, NoTimeWindow, add_group_members, create_group, create_scheduled_group_call,
+    get_booked_call_times, plan_group_call
+)
+from app.database import SessionLocal
+from app.models.group import ScheduledGroupCall
+from app.crud.scheduled_call import get_ready_calls, recompute_eligibility
+from app.models.scheduled_call import ScheduledCall
+from app.schemas.group import GroupCreate, ScheduledGroupCallCreate
+from app.services.pacing import PacingPlanner
+
+START = datetime(2026, 1, 5, 12, 0)
+
+
+def test_planner_spreads_calls_evenly_over_window():
+    planner = PacingPlanner(max_concurrency=10, cps_limit=1, call_duration=60)
+    plan = planner.plan(list(range(100)), START, START + timedelta(hours=1))
+    assert not plan.unplaced
+    times = [planned_at for _, planned_at in plan.slots]
+    assert times == sorted(times)
+    assert times[0] < START + timedelta(minutes=1)
+    assert times[-1] > START + timedelta(minutes=58)
+    assert plan.peak_concurrency <= 10
+
+
+def test_planner_reports_what_does_not_fit():
+    planner = PacingPlanner(max_concurrency=2, cps_limit=1, call_duration=60)
+    plan = planner.plan(list(range(50)), START, START + timedelta(minutes=10))
+    assert len(plan.slots) == 20
+    assert plan.unplaced == list(range(20, 50))
+
+
+def test_planner_leaves_room_for_booked_calls():
+    planner = PacingPlanner(max_concurrency=2, cps_limit=1, call_duration=60)
+    booked = [START + timedelta(minutes=minute) for minute in range(10)]
+    plan = planner.plan(list(range(50)), START, START + timedelta(minutes=10), booked)
+    assert len(plan.slots) == 10
+
+
+def _group_call(db, user, contacts, end):
+    group = create_group(db, GroupCreate(name="Campaign"), user.id)
+    add_group_members(db, group.id, [contact.id for contact in contacts], user.id)
+    return create_scheduled_group_call(db, ScheduledGroupCallCreate(
+        group_id=group.id, start_time_window=START, end_time_window=end
+    ), user.id)
+
+
+def test_unplaced_calls_never_become_ready(db, user, make_contact, frozen_clock):
+    contacts = [make_contact() for _ in range(40)]
+    group_call = _group_call(db, user, contacts, START + timedelta(days=1))
+    assert not plan_group_call(db, group_call.id, user.id).unplaced
+
+    # Окно сузилось: часть уже созданных звонков больше не помещается
+    group_call.end_time_window = START + timedelta(minutes=2)
+    db.commit()
+    plan = plan_group_call(db, group_call.id, user.id)
+    assert plan.unplaced
+
+    recompute_eligibility(db, only_missing=True)
+    recompute_eligibility(db)
+    unplaced = db.query(ScheduledCall).filter(ScheduledCall.status == STATUS_UNPLACED).all()
+    assert {call.contact_id for call in unplaced} == set(plan.unplaced)
+    assert all(call.next_eligible_at is None for call in unplaced)
+
+    ready = get_ready_calls(db, now=START + timedelta(days=2))
+    assert not {call.contact_id for call in ready} & set(plan.unplaced)
+
+
+def test_replanning_places_unplaced_calls_again(db, user, make_contact, frozen_clock):
+    contacts = [make_contact() for _ in range(40)]
+    group_call = _group_call(db, user, contacts, START + timedelta(minutes=2))
+    plan_group_call(db, group_call.id, user.id)
+    group_call.end_time_window = START + timedelta(minutes=2)
+    db.commit()
+    first = plan_group_call(db, group_call.id, user.id)
+    assert first.unplaced
+
+    group_call.end_time_window = START + timedelta(days=1)
+    db.commit()
+    second = plan_group_call(db, group_call.id, user.id)
+    assert not second.unplaced
+    assert db.query(ScheduledCall).filter(ScheduledCall.status == STATUS_UNPLACED).count() == 0
+
+
+def test_booked_times_include_every_call_holding_the_dialer(db, user, make_contact):
+    for minute, status in enumerate(("pending", "retrying", "dialing", "completed", "failed", STATUS_UNPLACED)):
+        db.add(ScheduledCall(
+            user_id=user.id, contact_id=make_contact().id, status=status,
+            scheduled_time=START + timedelta(minutes=minute)
+        ))
+    db.commit()
+    booked = get_booked_call_times(db, START, START + timedelta(hours=1))
+    assert sorted(booked) == [START + timedelta(minutes=minute) for minute in range(3)]
+
+
+def test_planning_a_call_without_window_is_rejected(db, user, make_contact, frozen_clock, client):
+    group_call = _group_call(db, user, [make_contact()], START + timedelta(hours=1))
+    group_call.start_time_window = group_call.end_time_window = None
+    db.commit()
+    with pytest.raises(NoTimeWindow):
+        plan_group_call(db, group_call.id, user.id)
+    assert plan_group_call(db, group_call.id + 1, user.id) is None
+
+    group = client.post("/api/groups/groups/", json={"name": "No window"}).json()
+    call = client.post("/api/scheduled-group-calls/scheduled-group-calls/", json={
+        "group_id": group["id"], "start_time_window": START.isoformat(), "end_time_window": START.isoformat()
+    }).json()
+    with SessionLocal() as session:
+        session.execute(update(ScheduledGroupCall).where(ScheduledGroupCall.id == call["id"]).values(
+            start_time_window=None, end_time_window=None
+        ))
+        session.commit()
+    response = client.post(f"/api/scheduled-group-calls/scheduled-group-calls/{call['id']}/plan")
+    assert response.status_code == 400
+    assert "no time window" in response.json()["detail"]
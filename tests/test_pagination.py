@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from app.crud.contact import get_contacts
+from app.crud.pagination import InvalidCursor, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.models.contact import ContactDialog
+
+
+def test_cursor_round_trip_restores_column_types():
+    columns = (ContactDialog.date, ContactDialog.id)
+    when = datetime(2026, 1, 5, 12, 30)
+    assert decode_cursor(encode_cursor([when, 7]), columns) == [when, 7]
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor([1, 2]), encode_cursor(["yesterday", 1])])
+def test_bad_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, (ContactDialog.date, ContactDialog.id))
+
+
+def test_keyset_pages_cover_every_contact_once(db, user, make_contact):
+    ids = [make_contact().id for _ in range(7)]
+    seen, cursor = [], None
+    while True:
+        page = get_contacts(db, user_id=user.id, limit=3, cursor=cursor)
+        seen.extend(contact.id for contact in page)
+        if len(page) < 3:
+            break
+        cursor = encode_cursor([page[-1].id])
+    assert seen == ids
+
+
+def test_contacts_endpoint_returns_next_cursor_header(client):
+    for number in range(5):
+        client.post("/api/contacts/", json={"name": f"Page {number}", "phone": f"+42191100000{number}"})
+    first = client.get("/api/contacts/", params={"limit": 3})
+    assert len(first.json()) == 3
+    second = client.get("/api/contacts/", params={"limit": 3, "cursor": first.headers[NEXT_CURSOR_HEADER]})
+    assert [c["id"] for c in second.json()] == sorted(c["id"] for c in second.json())
+    assert {c["id"] for c in first.json()}.isdisjoint(c["id"] for c in second.json())
+    assert len(first.json()) + len(second.json()) == 5
+    assert NEXT_CURSOR_HEADER not in second.headers
+
+
+def test_invalid_cursor_is_a_bad_request(client):
+    assert client.get("/api/contacts/", params={"cursor": "%%%"}).status_code == 400
@@ -0,0 +1,48 @@
+import pytest
+
+from app.crud.contact import DuplicatePhone, create_contact, get_contact_by_phone
+from app.database import SessionLocal
+from app.models.contact import Contact
+from app.schemas.contact import ContactCreate
+from app.services.phone import normalize_phone, try_normalize_phone
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+421 911 000 001", "+421911000001"),
+    ("00421911000001", "+421911000001"),
+    ("0911 000 001", "+421911000001"),
+    ("421911000001", "+421911000001"),
+])
+def test_phones_are_normalized_to_e164(raw, expected):
+    assert normalize_phone(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["ext. 12", "+0911000001", "12345", "+1234567890123456"])
+def test_unparseable_phones_are_rejected(raw):
+    with pytest.raises(ValueError):
+        normalize_phone(raw)
+    assert try_normalize_phone(raw) is None
+
+
+def test_duplicate_number_in_another_format_is_rejected(db, user):
+    create_contact(db, ContactCreate(name="First", phone="+421 911 000 001"), user.id)
+    with pytest.raises(DuplicatePhone):
+        create_contact(db, ContactCreate(name="Second", phone="0911000001"), user.id)
+    assert get_contact_by_phone(db, user.id, "00421911000001").name == "First"
+
+
+def test_api_validates_input_but_lists_legacy_numbers(client):
+    assert client.post("/api/contacts/", json={"name": "Bad", "phone": "ext. 12"}).status_code == 422
+    assert client.post("/api/contacts/", json={
+        "name": "Bad", "phone": "+421911000001", "timezone": "Mars/Base"
+    }).status_code == 422
+    assert client.post("/api/contacts/", json={"name": "A", "phone": "+421911000001"}).status_code == 201
+    assert client.post("/api/contacts/", json={"name": "B", "phone": "0911 000 001"}).status_code == 409
+
+    # Запись из времени до проверки номеров: номер не разбирается, часовой пояс неизвестен
+    with SessionLocal() as db:
+        db.add(Contact(user_id=client.user_id, name="Legacy", phone="ext. 12", timezone="Mars/Base"))
+        db.commit()
+    response = client.get("/api/contacts/")
+    assert response.status_code == 200, response.text
+    assert {contact["phone"] for contact in response.json()} == {"+421911000001", "ext. 12"}
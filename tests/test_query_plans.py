@@ -0,0 +1,26 @@
+from sqlalchemy import inspect
+
+from app.query_plans import check_query_plans, full_scan_tables
+
+
+def test_full_scan_detection():
+    plan = [
+        (2, 0, 0, "SCAN contacts"),
+        (3, 0, 0, "SCAN tags USING COVERING INDEX ix_tags_user_id_name"),
+        (4, 0, 0, "SEARCH scheduled_calls USING INTEGER PRIMARY KEY (rowid=?)"),
+        (5, 0, 0, "SCAN CONSTANT ROW"),
+    ]
+    assert full_scan_tables(plan, {"contacts", "tags", "scheduled_calls"}) == ["contacts"]
+
+
+def test_partial_and_composite_indexes_exist(engine):
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("contacts")}
+    assert indexes["uq_contacts_user_id_phone_e164"]["unique"]
+    assert indexes["ix_contacts_user_id_active"]["column_names"] == ["user_id", "id"]
+
+
+def test_crud_queries_do_not_scan_tables():
+    report = check_query_plans()
+    assert report.errors == []
+    assert report.full_scans == []
+    assert report.statements > 100
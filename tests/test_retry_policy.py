@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.crud.scheduled_call import create_scheduled_call, mark_call_as_attempted
+from app.models.scheduled_call import ScheduledCall
+from app.schemas.scheduled_call import ScheduledCallCreate
+from app.services.retry_policy import (
+    DecorrelatedJitterStrategy, ExponentialStrategy, FixedStrategy, OUTCOME_BUSY, OUTCOME_COMPLETED,
+    OUTCOME_NO_ANSWER, build_retry_policy
+)
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+
+def make_call(**values):
+    defaults = dict(
+        retry_until_success=True, retry_interval=60, call_attempts=1, next_retry_at=None, last_attempt_at=None,
+        start_time_window=None, end_time_window=None
+    )
+    return SimpleNamespace(**{**defaults, **values})
+
+
+def test_fixed_strategy_stays_within_jitter():
+    rng = random.Random(1)
+    for attempt in range(1, 5):
+        delay = FixedStrategy(jitter=0.1).delay(attempt, timedelta(minutes=60), None, rng)
+        assert timedelta(minutes=54) <= delay <= timedelta(minutes=66)
+
+
+def test_exponential_strategy_grows_and_is_capped():
+    strategy = ExponentialStrategy(factor=2, cap=timedelta(hours=3), jitter=0)
+    delays = [strategy.delay(attempt, timedelta(minutes=30), None, random.Random()) for attempt in range(1, 6)]
+    assert delays[:3] == [timedelta(minutes=30), timedelta(minutes=60), timedelta(minutes=120)]
+    assert delays[-1] == timedelta(hours=3)
+
+
+def test_decorrelated_jitter_is_between_base_and_three_previous():
+    strategy = DecorrelatedJitterStrategy(cap=timedelta(hours=12))
+    rng = random.Random(7)
+    for _ in range(100):
+        delay = strategy.delay(2, timedelta(minutes=10), timedelta(minutes=20), rng)
+        assert timedelta(minutes=10) <= delay <= timedelta(minutes=60)
+
+
+def test_completed_and_no_retry_end_the_call():
+    policy = build_retry_policy(random.Random(0))
+    assert policy.decide(make_call(), OUTCOME_COMPLETED, now=NOW).status == "completed"
+    assert policy.decide(make_call(retry_until_success=False), OUTCOME_BUSY, now=NOW).status == "failed"
+
+
+def test_busy_retries_sooner_than_no_answer():
+    policy = build_retry_policy(random.Random(0))
+    busy = policy.decide(make_call(), OUTCOME_BUSY, now=NOW)
+    no_answer = policy.decide(make_call(), OUTCOME_NO_ANSWER, now=NOW)
+    assert busy.status == no_answer.status == "retrying"
+    assert busy.next_retry_at < no_answer.next_retry_at
+
+
+def test_retry_outside_window_fails_and_before_window_is_moved_to_start():
+    policy = build_retry_policy(random.Random(0))
+    closing = make_call(end_time_window=NOW + timedelta(minutes=5))
+    assert policy.decide(closing, OUTCOME_NO_ANSWER, now=NOW).status == "failed"
+    opening = make_call(retry_interval=1, start_time_window=NOW + timedelta(days=1))
+    decision = policy.decide(opening, OUTCOME_BUSY, now=NOW)
+    assert decision.next_retry_at == NOW + timedelta(days=1)
+
+
+def test_attempts_are_limited():
+    policy = build_retry_policy(random.Random(0))
+    call = make_call(call_attempts=settings.RETRY_MAX_ATTEMPTS)
+    assert policy.decide(call, OUTCOME_NO_ANSWER, now=NOW).status == "failed"
+
+
+def test_missing_retry_interval_uses_configured_default(db, make_contact, monkeypatch, frozen_clock):
+    contact = make_contact()
+    call = ScheduledCallCreate(contact_id=contact.id, scheduled_time=NOW + timedelta(hours=1), retry_interval=None)
+    assert create_scheduled_call(db, call, contact.user_id).retry_interval == settings.RETRY_DEFAULT_INTERVAL
+    assert ScheduledCallCreate(contact_id=1, scheduled_time=NOW).retry_interval == settings.RETRY_DEFAULT_INTERVAL
+
+
+def test_mark_call_as_attempted_schedules_retry(db, make_contact, frozen_clock):
+    contact = make_contact()
+    call = create_scheduled_call(db, ScheduledCallCreate(
+        contact_id=contact.id, scheduled_time=NOW, retry_until_success=True
+    ), contact.user_id)
+    updated = mark_call_as_attempted(db, call.id, outcome=OUTCOME_BUSY)
+    assert updated.call_attempts == 1
+    assert updated.status == "retrying"
+    assert updated.next_retry_at > NOW
+
+
+def test_column_default_uses_configured_interval(db, make_contact):
+    contact = make_contact()
+    call = ScheduledCall(user_id=contact.user_id, contact_id=contact.id, scheduled_time=NOW, status="pending")
+    db.add(call)
+    db.commit()
+    assert call.retry_interval == settings.RETRY_DEFAULT_INTERVAL
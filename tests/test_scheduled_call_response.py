@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.api.v1.endpoints import scheduled_calls as endpoints
+from app.crud.scheduled_call import create_scheduled_call, get_scheduled_call_responses
+from app.models.scheduled_call import ScheduledCall
+from app.schemas.scheduled_call import ScheduledCallCreate, ScheduledCallResponse
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+
+def test_responses_are_one_query_with_contact_fields(db, user, make_contact, queries, frozen_clock):
+    user_id = user.id
+    for number in range(5):
+        contact = make_contact(company=f"Company {number}")
+        create_scheduled_call(db, ScheduledCallCreate(contact_id=contact.id, scheduled_time=NOW), user_id)
+    queries.clear()
+    rows = get_scheduled_call_responses(db, user_id)
+    responses = [ScheduledCallResponse.model_validate(row) for row in rows]
+    assert len(queries) == 1
+    assert [r.contact_company for r in responses] == [f"Company {n}" for n in range(5)]
+    assert all(r.contact_name and r.contact_phone for r in responses)
+
+
+def test_call_without_contact_row_gets_placeholders(db, user, frozen_clock):
+    db.add(ScheduledCall(user_id=user.id, contact_id=999, scheduled_time=NOW, status="pending"))
+    db.commit()
+    response = ScheduledCallResponse.model_validate(get_scheduled_call_responses(db, user.id)[0])
+    assert (response.contact_name, response.contact_phone, response.contact_company) == ("Unknown", "", "")
+
+
+def test_created_call_is_returned_with_contact(client):
+    contact = client.post("/api/contacts/", json={"name": "Callee", "phone": "+421913000001"}).json()
+    response = client.post("/api/scheduled-calls/", json={
+        "contact_id": contact["id"], "scheduled_time": (datetime.utcnow() + timedelta(days=1)).isoformat()
+    })
+    assert response.status_code == 201, response.text
+    assert response.json()["contact_name"] == "Callee"
+    listed = client.get("/api/scheduled-calls/").json()
+    assert [call["contact_phone"] for call in listed] == [contact["phone"]]
+
+
+def test_create_errors_map_to_client_statuses(client, monkeypatch):
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    missing = client.post("/api/scheduled-calls/", json={"contact_id": 9999, "scheduled_time": tomorrow})
+    assert missing.status_code == 404
+
+    def conflict(**kwargs):
+        raise IntegrityError("INSERT", {}, Exception("FOREIGN KEY constraint failed"))
+
+    monkeypatch.setattr(endpoints, "create_scheduled_call", conflict)
+    assert client.post("/api/scheduled-calls/", json={"contact_id": 1, "scheduled_time": tomorrow}).status_code == 409
+
+    def broken(**kwargs):
+        raise RuntimeError("bug")
+
+    # Прочие ошибки не превращаются в 500 с текстом исключения, а доходят до обработчика приложения
+    monkeypatch.setattr(endpoints, "create_scheduled_call", broken)
+    with pytest.raises(RuntimeError):
+        client.post("/api/scheduled-calls/", json={"contact_id": 1, "scheduled_time": tomorrow})
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app.crud.scheduled_call import (
+    create_scheduled_call, mark_calls_as_dispatched, release_stuck_calls, update_scheduled_call
+)
+from app.models.scheduled_call import ScheduledCall
+from app.schemas.scheduled_call import ScheduledCallCreate, ScheduledCallUpdate
+from app.simulation.scheduler import SchedulerSimulation, SimulationConfig
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+
+def _calls(db, make_contact, count):
+    contact = make_contact()
+    return [
+        create_scheduled_call(db, ScheduledCallCreate(contact_id=contact.id, scheduled_time=NOW), contact.user_id)
+        for _ in range(count)
+    ]
+
+
+def test_only_waiting_calls_are_dispatched(db, make_contact, frozen_clock):
+    waiting, cancelled = _calls(db, make_contact, 2)
+    update_scheduled_call(db, cancelled.id, ScheduledCallUpdate(status="cancelled"), cancelled.user_id)
+
+    assert mark_calls_as_dispatched(db, [waiting.id, cancelled.id], now=NOW) == [waiting.id]
+    # Второй диспетчер с той же выборкой ничего не получает
+    assert mark_calls_as_dispatched(db, [waiting.id], now=NOW) == []
+    db.expire_all()
+    assert db.get(ScheduledCall, waiting.id).status == "dialing"
+    assert db.get(ScheduledCall, cancelled.id).status == "cancelled"
+
+
+def test_calls_stuck_in_dialing_are_released(db, make_contact, frozen_clock):
+    call, = _calls(db, make_contact, 1)
+    mark_calls_as_dispatched(db, [call.id], now=NOW)
+
+    assert release_stuck_calls(db, now=NOW + timedelta(minutes=10), timeout_minutes=30) == []
+    released = release_stuck_calls(db, now=NOW + timedelta(minutes=31), timeout_minutes=30)
+    assert [released_call.id for released_call in released] == [call.id]
+
+    db.expire_all()
+    stored = db.get(ScheduledCall, call.id)
+    assert stored.status != "dialing"
+    assert stored.call_attempts == 1
+    assert stored.last_outcome == "failed"
+
+
+def test_simulation_finishes_every_call():
+    simulation = SchedulerSimulation(SimulationConfig(calls=300, contacts=100, days=1, seed=1))
+    report = simulation.run()
+    assert report.dispatched >= report.completed + report.failed > 0
+    assert min(report.lags) >= 0
+    with simulation.Session() as db:
+        assert db.query(ScheduledCall).filter(ScheduledCall.status == "dialing").count() == 0
@@ -0,0 +1,54 @@
+from app.crud.contact import delete_contact
+from app.crud.tag import (
+    MATCH_ALL, add_contact_tags, clean_tag_names, get_contacts_by_tags, get_tag_counts, get_tag_names,
+    set_contact_tags
+)
+from app.models.tag import Tag
+
+
+def test_clean_tag_names_keeps_order_and_drops_repeats():
+    assert clean_tag_names([" vip", "lead", "", "vip"]) == ["vip", "lead"]
+
+
+def test_tags_are_shared_per_user(db, user, make_contact):
+    first, second = make_contact(), make_contact()
+    set_contact_tags(db, first, ["vip", "lead"])
+    db.commit()
+    add_contact_tags(db, user.id, {second.id: ["lead", "new"]})
+    db.commit()
+    assert sorted(tag.name for tag in db.query(Tag).filter(Tag.user_id == user.id)) == ["lead", "new", "vip"]
+    names = get_tag_names(db, [first.id, second.id])
+    assert names[first.id] == ["lead", "vip"] and names[second.id] == ["lead", "new"]
+
+    set_contact_tags(db, first, ["vip"])
+    db.commit()
+    assert get_tag_names(db, [first.id])[first.id] == ["vip"]
+
+
+def test_filter_by_any_or_all_tags(db, user, make_contact):
+    both, only_vip, untagged = make_contact(), make_contact(), make_contact()
+    add_contact_tags(db, user.id, {both.id: ["vip", "lead"], only_vip.id: ["vip"]})
+    db.commit()
+    ids = lambda contacts: [contact.id for contact in contacts]
+    assert ids(get_contacts_by_tags(db, user.id, ["vip", "lead"])) == [both.id, only_vip.id]
+    assert ids(get_contacts_by_tags(db, user.id, ["vip", "lead"], match=MATCH_ALL)) == [both.id]
+    assert get_contacts_by_tags(db, user.id, ["vip", "unknown"], match=MATCH_ALL) == []
+    assert untagged.id not in ids(get_contacts_by_tags(db, user.id, ["vip"]))
+
+
+def test_tag_counts_skip_deleted_contacts(db, user, make_contact):
+    kept, deleted = make_contact(), make_contact()
+    add_contact_tags(db, user.id, {kept.id: ["vip"], deleted.id: ["vip", "old"]})
+    db.commit()
+    delete_contact(db, deleted.id, user.id)
+    assert [(row.name, row.contact_count) for row in get_tag_counts(db, user.id)] == [("old", 0), ("vip", 1)]
+
+
+def test_tag_filter_and_counts_through_the_api(client):
+    client.post("/api/contacts/", json={"name": "Tagged", "phone": "+421913000201", "tags": ["vip", "lead"]})
+    client.post("/api/contacts/", json={"name": "Plain", "phone": "+421913000202"})
+    listed = client.get("/api/contacts/", params=[("tag", "vip"), ("tag", "lead"), ("tag_match", "all")]).json()
+    assert [(contact["name"], contact["tags"]) for contact in listed] == [("Tagged", ["lead", "vip"])]
+    assert client.get("/api/contacts/", params={"tag": "vip", "tag_match": "some"}).status_code == 400
+    counts = client.get("/api/contacts/tags").json()
+    assert [(row["name"], row["contact_count"]) for row in counts] == [("lead", 1), ("vip", 1)]
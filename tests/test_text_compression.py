@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.crud.contact import contact_exists, get_contact
+from app.crud.dialog import dialog_exists, get_dialogs
+from app.crud.group import get_contacts_by_ids
+from app.migrations import compress_existing_text
+from app.models.contact import Contact, ContactDialog
+from app.models.types import compress_text, decompress_text
+
+LONG = "Dobrý deň, volám ohľadom vašej objednávky. " * 100
+
+
+def test_only_long_compressible_text_is_packed(monkeypatch):
+    assert compress_text("short") == "short"
+    packed = compress_text(LONG)
+    assert isinstance(packed, bytes) and len(packed) < len(LONG) // 5
+    assert decompress_text(packed) == LONG
+    monkeypatch.setattr(settings, "TEXT_COMPRESSION_MIN_SAVING", 0.99)
+    assert compress_text(LONG) == LONG
+    with pytest.raises(ValueError):
+        decompress_text(b"?data")
+
+
+def test_columns_round_trip_and_are_stored_as_blobs(db, make_contact, make_dialog):
+    contact = make_contact(script=LONG)
+    dialog_id = make_dialog(contact, transcript=LONG).id
+    stored = db.execute(text("SELECT typeof(transcript) FROM contact_dialogs WHERE id = :id"), {"id": dialog_id})
+    assert stored.scalar() == "blob"
+    db.expire_all()
+    assert db.get(ContactDialog, dialog_id).transcript == LONG
+    assert db.get(type(contact), contact.id).script == LONG
+
+
+def test_existence_checks_skip_compressed_columns(db, make_contact, make_dialog, queries):
+    contact = make_contact(script=LONG)
+    dialog_id, contact_id, user_id = make_dialog(contact, transcript=LONG).id, contact.id, contact.user_id
+    queries.clear()
+    assert contact_exists(db, contact_id, user_id) and not contact_exists(db, contact_id, user_id + 1)
+    assert dialog_exists(db, dialog_id, contact_id) and not dialog_exists(db, dialog_id + 1, contact_id)
+    assert not any("script" in q or "transcript" in q for q in queries)
+
+
+def test_compressed_columns_load_only_when_read(db, make_contact, make_dialog, queries):
+    contact = make_contact(script=LONG)
+    dialog_id, contact_id, user_id = make_dialog(contact, transcript=LONG).id, contact.id, contact.user_id
+    db.expunge_all()
+    queries.clear()
+    planned = get_contacts_by_ids(db, user_id, [contact_id])[0]
+    dialog = db.get(ContactDialog, dialog_id)
+    assert not any("contacts.script" in q or "contact_dialogs.transcript" in q for q in queries)
+    assert planned.script == LONG and dialog.transcript == LONG
+    assert sum("contacts.script" in q for q in queries) == 1
+    assert sum("contact_dialogs.transcript" in q for q in queries) == 1
+
+
+def test_paths_that_return_text_load_it_with_the_row(db, make_contact, make_dialog, queries):
+    contact = make_contact(script=LONG)
+    contact_id, user_id = contact.id, contact.user_id
+    make_dialog(contact, transcript=LONG)
+    db.expunge_all()
+    queries.clear()
+    assert get_contact(db, contact_id, user_id).script == LONG
+    assert get_dialogs(db, contact_id)[0].transcript == LONG
+    assert len(queries) == 5  # контакт + теги, диалоги + сообщения + архив; отдельных догрузок текста нет
+    assert sum("contacts.script" in q for q in queries) == 1
+
+
+def test_existing_plain_text_is_compressed_in_place(engine, db, make_contact):
+    contact = make_contact()
+    db.execute(text("UPDATE contacts SET script = :value WHERE id = :id"), {"value": LONG, "id": contact.id})
+    db.commit()
+    assert compress_existing_text(engine, pause=0) == 1
+    assert compress_existing_text(engine, pause=0) == 0
+    db.expire_all()
+    assert contact.script == LONG
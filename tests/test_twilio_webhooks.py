@@ -0,0 +1,33 @@
+from app.api.v1.endpoints.twilio_calls import active_calls
+
+
+def _contact(client, phone="+421900111222"):
+    response = client.post("/api/contacts/", json={"name": "Caller", "phone": phone})
+    assert response.status_code in (200, 201), response.text
+    return response.json()["id"]
+
+
+def test_gather_restores_call_from_query_contact(client):
+    contact_id = _contact(client)
+    response = client.post(
+        f"/api/twilio-calls/dialog/gather?contact_id={contact_id}&user_id={client.user_id}&script=Hi",
+        # Номер в To другой: контакт берётся из параметров вебхука, а не по телефону
+        data={"CallSid": "CA-restore", "To": "+421955000000"}
+    )
+    assert response.status_code == 200
+    assert active_calls.pop("CA-restore") == {"contact_id": contact_id, "user_id": client.user_id, "script": "Hi"}
+
+
+def test_gather_ignores_contact_of_another_user(client):
+    contact_id = _contact(client, phone="+421900111333")
+    response = client.post(
+        f"/api/twilio-calls/dialog/gather?contact_id={contact_id}&user_id={client.user_id + 1000}",
+        data={"CallSid": "CA-foreign"}
+    )
+    assert response.status_code == 200
+    assert "CA-foreign" not in active_calls
+
+
+def test_status_webhook_needs_no_database(client):
+    response = client.post("/api/twilio-calls/status", data={"CallSid": "CA1", "CallStatus": "completed"})
+    assert response.status_code == 200